@@ -0,0 +1,200 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from panel import PricePanel, compact, panel_sma, panel_ema, panel_rsi, MACD_FAST, MACD_SLOW, MACD_SIGNAL
+
+# Vectorised golden-cross backtest: buy on a golden cross (optionally only if
+# RSI/MACD agree), sell on the next death cross or after `max_hold` bars.
+# Signals act on the next bar's return, so there's no look-ahead. Every
+# (short, long) pair is simulated for the whole universe at once; pairs are
+# spread over a process pool for big sweeps.
+
+FEE_BPS = 5          # per side, in basis points
+SWEEP_WORKERS = None  # None = one per CPU, 0 = run in this process
+
+
+def _last_event(events):
+    """For each bar, the most recent non-zero event code and the row it happened on."""
+    rows = np.arange(events.shape[0])[:, None]
+    last_row = np.maximum.accumulate(np.where(events != 0, rows, -1), axis=0)
+    kind = np.take_along_axis(events, np.maximum(last_row, 0), axis=0)
+    kind[last_row < 0] = 0
+    return kind, last_row
+
+
+def bar_returns(close, own_bar):
+    """Close-to-close returns on each symbol's own bars (0 elsewhere)."""
+    returns = np.zeros(close.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = close[1:] / close[:-1] - 1
+    returns[~own_bar] = 0.0
+    return np.nan_to_num(returns, copy=False)
+
+
+def backtest_pair(returns, own_bar, sma_short, sma_long, fee=FEE_BPS / 10_000, max_hold=None, entry_filter=None):
+    """
+    Simulate one window pair on compacted bars (rows x symbols), given
+    bar_returns() for the same panel. Returns per-symbol arrays:
+    total_return, max_drawdown, trades, wins.
+    """
+    spread = sma_short - sma_long
+    prev, curr = spread[:-1], spread[1:]
+    events = np.zeros(returns.shape, dtype=np.int8)
+    golden = (prev < 0) & (curr >= 0)
+    if entry_filter is not None:
+        golden &= entry_filter[1:]
+    events[1:][golden] = 1
+    events[1:][(prev > 0) & (curr <= 0)] = -1
+
+    kind, last_row = _last_event(events)
+    position = (kind == 1) & own_bar
+    if max_hold is not None:
+        position &= (np.arange(returns.shape[0])[:, None] - last_row) < max_hold
+
+    # Trades fill at the signal bar's close, so a position earns from the
+    # next bar on. Past a symbol's last bar it's marked to market, not sold.
+    held = np.zeros(returns.shape, dtype=bool)
+    held[1:] = position[:-1]
+    held &= own_bar
+    changed = np.zeros(returns.shape, dtype=bool)
+    changed[0] = position[0]
+    changed[1:] = position[1:] != position[:-1]
+    changed &= own_bar
+
+    log_growth = np.log1p(np.where(held, returns, 0.0))
+    log_growth[changed] += np.log1p(-fee)
+
+    # Prefix sums give the equity curve; drawdown from its running peak
+    log_equity = np.cumsum(log_growth, axis=0)
+    total_return = np.expm1(log_equity[-1])
+    running_peak = np.maximum.accumulate(np.maximum(log_equity, 0.0), axis=0)
+    max_drawdown = -np.expm1((log_equity - running_peak).min(axis=0))
+
+    # Per-trade returns: number trades down each column, sum log growth per id
+    entries = changed & position
+    trade_id = np.cumsum(entries, axis=0)
+    in_trade = (position | held) & own_bar
+    trades = entries.sum(axis=0)
+    n_trades = int(trades.max()) + 1 if trades.size else 1
+    keys = (np.arange(returns.shape[1]) * n_trades + trade_id)[in_trade]
+    trade_log = np.bincount(keys, weights=log_growth[in_trade], minlength=returns.shape[1] * n_trades)
+    wins = (trade_log.reshape(returns.shape[1], n_trades)[:, 1:] > 0).sum(axis=1)
+
+    return {"total_return": total_return, "max_drawdown": max_drawdown, "trades": trades, "wins": wins}
+
+
+def _entry_filter(close, rsi_max=None, macd_confirm=False):
+    if rsi_max is None and not macd_confirm:
+        return None
+    allowed = np.ones(close.shape, dtype=bool)
+    if rsi_max is not None:
+        with np.errstate(invalid="ignore"):
+            allowed &= panel_rsi(close) < rsi_max
+    if macd_confirm:
+        macd = panel_ema(close, MACD_FAST) - panel_ema(close, MACD_SLOW)
+        allowed &= macd > panel_ema(macd, MACD_SIGNAL)
+    return allowed
+
+
+def _run_pairs(close, counts, pairs, fee, max_hold, rsi_max, macd_confirm):
+    """Backtest several pairs on one compacted panel (one process-pool task)."""
+    own_bar = np.arange(close.shape[0])[:, None] < counts
+    returns = bar_returns(close, own_bar)
+    entry_filter = _entry_filter(close, rsi_max, macd_confirm)
+    smas = {window: panel_sma(close, window) for window in {w for pair in pairs for w in pair}}
+    return [(pair, backtest_pair(returns, own_bar, smas[pair[0]], smas[pair[1]], fee, max_hold, entry_filter))
+            for pair in pairs]
+
+
+def run_backtest(panel, pairs=((50, 200),), fee_bps=FEE_BPS, max_hold=None, rsi_max=None, macd_confirm=False,
+                 workers=SWEEP_WORKERS):
+    """
+    Backtest every (short, long) pair over every symbol in `panel`.
+
+    Returns (summary, per_symbol): summary has one row per pair with mean and
+    median total return, mean max drawdown, trade count and hit rate;
+    per_symbol has one row per (pair, symbol).
+    """
+    pairs = [tuple(pair) for pair in pairs if pair[0] < pair[1]]
+    close, _, counts = compact(panel.close)
+    fee = fee_bps / 10_000
+    args = (fee, max_hold, rsi_max, macd_confirm)
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(pairs))
+    if workers and workers > 1 and len(pairs) > 1:
+        chunk = -(-len(pairs) // workers)
+        groups = [pairs[i:i + chunk] for i in range(0, len(pairs), chunk)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_pairs, close, counts, group, *args) for group in groups]
+            outcomes = [item for future in futures for item in future.result()]
+    else:
+        outcomes = _run_pairs(close, counts, pairs, *args)
+
+    rows, summary = [], []
+    for (short, long), result in outcomes:
+        trades, wins = result["trades"], result["wins"]
+        for col, symbol in enumerate(panel.symbols):
+            rows.append((short, long, symbol, result["total_return"][col], result["max_drawdown"][col],
+                         int(trades[col]), int(wins[col])))
+        summary.append({
+            "short": short,
+            "long": long,
+            "mean_return": float(np.mean(result["total_return"])),
+            "median_return": float(np.median(result["total_return"])),
+            "mean_max_drawdown": float(np.mean(result["max_drawdown"])),
+            "trades": int(trades.sum()),
+            "hit_rate": float(wins.sum() / trades.sum()) if trades.sum() else float("nan"),
+        })
+
+    per_symbol = pd.DataFrame(rows, columns=["short", "long", "symbol", "total_return", "max_drawdown",
+                                             "trades", "wins"])
+    summary = pd.DataFrame(summary).set_index(["short", "long"]).sort_values("mean_return", ascending=False)
+    return summary, per_symbol
+
+
+def parameter_grid(shorts, longs):
+    return [(short, long) for short in shorts for long in longs if short < long]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest golden-cross window pairs over a universe.")
+    parser.add_argument("--symbols", nargs="*", help="tickers to fetch (default: trending list)")
+    parser.add_argument("--synthetic", type=int, help="use N synthetic symbols instead of fetching")
+    parser.add_argument("--start", default="2015-01-01")
+    parser.add_argument("--end", default=pd.Timestamp.today().strftime("%Y-%m-%d"))
+    parser.add_argument("--short", type=int, nargs="+", default=[20, 50])
+    parser.add_argument("--long", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--fee-bps", type=float, default=FEE_BPS)
+    parser.add_argument("--max-hold", type=int, help="force an exit after this many bars")
+    parser.add_argument("--rsi-max", type=float, help="only enter when RSI is below this")
+    parser.add_argument("--macd-confirm", action="store_true", help="only enter when MACD is above its signal")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--output", help="write per-symbol results to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        from synthetic_data import SyntheticProvider, synthetic_universe
+        provider = SyntheticProvider(years=(pd.Timestamp(args.end) - pd.Timestamp(args.start)).days / 365 + 1)
+        symbols = synthetic_universe(args.synthetic)
+        frames = provider(symbols, args.start, args.end)
+    else:
+        import golden_cross
+        symbols = args.symbols or golden_cross.get_trending_symbols()
+        frames = golden_cross.fetch_historical_data_batch(symbols, args.start, args.end)
+
+    panel = PricePanel.from_frames(frames)
+    summary, per_symbol = run_backtest(panel, parameter_grid(args.short, args.long), args.fee_bps, args.max_hold,
+                                       args.rsi_max, args.macd_confirm, args.workers)
+    print(summary.to_string())
+    if args.output:
+        per_symbol.to_csv(args.output, index=False)
+        print(f"\nPer-symbol results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import golden_cross
+import chart_renderer
+import indicator_engine
+from synthetic_data import SyntheticProvider, HISTORY_END, generate_ohlcv, synthetic_universe
+
+# Offline benchmarks on synthetic data. Each result is one JSON object per
+# line; pass --baseline with an earlier output file to flag regressions.
+#
+#   python benchmark.py                              # quick default grid
+#   python benchmark.py --universe 10 100 1000 5000 --years 1 5 10 30
+#   python benchmark.py --output new.jsonl --baseline baseline.jsonl
+
+COMPONENT_SYMBOLS = 20  # frames per component benchmark
+REGRESSION_TOLERANCE = 0.25  # 25% slower than baseline counts as a regression
+STARTUP_RUNS = 5  # best-of for the startup benchmarks
+STARTUP_TARGET = 0.1  # seconds the quick state commands may add over a bare interpreter
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fresh-interpreter commands; "python" is the bare-interpreter baseline
+STARTUP_COMMANDS = {
+    "python": ["-c", "pass"],
+    "cooldown": [os.path.join(PACKAGE_DIR, "scanner_state.py"), "cooldown", "BENCH", "--days", "1"],
+    "reset": [os.path.join(PACKAGE_DIR, "scanner_state.py"), "reset"],
+    "import_golden_cross": ["-c", "import golden_cross"],
+    "import_main_deps": ["-c", "import golden_cross, scan_cache, chart_renderer, metrics"],
+}
+
+
+def measure(fn, memory=True):
+    """
+    Run fn once for wall time, and again under tracemalloc for peak memory.
+    Only the first, untraced call is timed (tracing slows the second one
+    down), so fn must start from the same cold state both times.
+    """
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def record(name, universe, years, seconds, items, unit, peak):
+    return {
+        "benchmark": name,
+        "universe": universe,
+        "years": years,
+        "seconds": round(seconds, 6),
+        "throughput": round(items / seconds, 3) if seconds else None,
+        "unit": unit,
+        "peak_mb": round(peak / 2**20, 3) if peak is not None else None,
+    }
+
+
+def component_frames(years):
+    return [generate_ohlcv(symbol, years) for symbol in synthetic_universe(COMPONENT_SYMBOLS)]
+
+
+def bench_detect_crossovers(years, memory):
+    frames = [df for df in component_frames(years) if not df.empty]
+    seconds, peak = measure(lambda: [golden_cross.detect_crossovers(df) for df in frames], memory)
+    return record("detect_crossovers", len(frames), years, seconds, sum(map(len, frames)), "bars/s", peak)
+
+
+def bench_calculate_indicators(years, memory):
+    frames = [df for df in component_frames(years) if not df.empty]
+    seconds, peak = measure(lambda: [golden_cross.calculate_indicators(df.copy()) for df in frames], memory)
+    return record("calculate_indicators", len(frames), years, seconds, sum(map(len, frames)), "bars/s", peak)
+
+
+def bench_plot(years, memory, charts=3):
+    frames = []
+    for df in component_frames(years)[:charts]:
+        if not df.empty:
+            frames.append(golden_cross.add_moving_averages(df, "SYN"))
+
+    def run():
+        # Empty engine (and not the real state file), so every chart computes its indicators
+        indicator_engine._engine = indicator_engine.IndicatorEngine(state_file=None)
+        for df in frames:
+            fig = golden_cross.plot_stock_data_with_indicators(df, "SYN", [], [])
+            fig.savefig(io.BytesIO(), format=chart_renderer.CHART_FORMAT, dpi=chart_renderer.CHART_DPI)
+
+    try:
+        seconds, peak = measure(run, memory)
+    finally:
+        indicator_engine._engine = None
+    return record("plot_stock_data_with_indicators", len(frames), years, seconds, len(frames), "charts/s", peak)
+
+
+def bench_scan(universe, years, memory, use_panel=False, compact=False):
+    symbols = synthetic_universe(universe)
+    provider = SyntheticProvider(years=years)
+    end = datetime.strptime(HISTORY_END, "%Y-%m-%d")
+    start = (end - timedelta(days=int(years * 366))).strftime("%Y-%m-%d")
+    # Treat the last 30 synthetic days as "recent" so only real hits get charts
+    recent_days = (datetime.now() - end).days + 30
+
+    def run():
+        # Fresh working dir so state, skips and caches never carry over
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            # Cold in-memory caches too: the engine keeps ENGINE_FRAMES indicator histories
+            indicator_engine._engine = None
+            chart_renderer._renderer = chart_renderer.ChartRenderer(workers=0)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    golden_cross.check_stocks_for_crossovers(
+                        symbols, start, HISTORY_END, recent_only=True, recent_days=recent_days, use_panel=use_panel,
+                        compact=compact)
+            finally:
+                chart_renderer._renderer = None
+                indicator_engine._engine = None
+                golden_cross.state_store.close()
+                os.chdir(cwd)
+
+    # Generate every symbol's bars up front so only the scan is timed
+    for symbol in symbols:
+        provider.history(symbol)
+
+    # The synthetic provider runs without a rate limiter, so nothing is paced
+    previous = golden_cross.get_data_provider(), golden_cross.USE_PRICE_CACHE
+    golden_cross.set_data_provider(provider)
+    golden_cross.USE_PRICE_CACHE = False
+    try:
+        seconds, peak = measure(run, memory)
+    finally:
+        golden_cross.set_data_provider(previous[0])
+        golden_cross.USE_PRICE_CACHE = previous[1]
+
+    modes = [mode for mode, on in (("panel", use_panel), ("compact", compact)) if on]
+    name = "check_stocks_for_crossovers" + (f"[{','.join(modes)}]" if modes else "")
+    return record(name, universe, years, seconds, universe, "symbols/s", peak)
+
+
+def bench_startup(runs=STARTUP_RUNS):
+    """
+    Wall time of each STARTUP_COMMANDS entry in a new interpreter (best of
+    `runs`), run in a temp dir so the real state and caches are untouched.
+    `overhead_s` is the time over a bare interpreter; the quick state
+    commands are flagged when it exceeds STARTUP_TARGET.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_DIR, os.environ.get("PYTHONPATH")])))
+    timings = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, args in STARTUP_COMMANDS.items():
+            best = None
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, *args], cwd=workdir, env=env, check=True,
+                               stdout=subprocess.DEVNULL)
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            timings[name] = best
+
+    results = []
+    for name, seconds in timings.items():
+        result = record(f"startup[{name}]", 0, 0, seconds, 1, "runs/s", None)
+        result["overhead_s"] = round(seconds - timings["python"], 6)
+        if name in ("cooldown", "reset"):
+            result["over_target"] = result["overhead_s"] > STARTUP_TARGET
+        results.append(result)
+    return results
+
+
+def compare(results, baseline_path, tolerance=REGRESSION_TOLERANCE):
+    """Return the results that are more than `tolerance` slower than baseline."""
+    baseline = {}
+    with open(baseline_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                if "benchmark" in entry:
+                    baseline[(entry["benchmark"], entry["universe"], entry["years"])] = entry
+
+    regressions = []
+    for result in results:
+        base = baseline.get((result["benchmark"], result["universe"], result["years"]))
+        if base and base["seconds"] and result["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append({**result, "baseline_seconds": base["seconds"],
+                                "slowdown": round(result["seconds"] / base["seconds"], 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scanner on synthetic data.")
+    parser.add_argument("--universe", type=int, nargs="+", default=[10, 100], help="scan universe sizes")
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 5], help="history lengths in years")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["detect", "indicators", "plot", "scan", "panel", "compact", "startup"],
+                        help="benchmarks to leave out")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--output", help="write JSON lines here as well as stdout")
+    parser.add_argument("--baseline", help="earlier output to compare against")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+    memory = not args.no_memory
+
+    results = []
+
+    def emit(result):
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    if "startup" not in args.skip:
+        for result in bench_startup():
+            emit(result)
+
+    for years in args.years:
+        if "detect" not in args.skip:
+            emit(bench_detect_crossovers(years, memory))
+        if "indicators" not in args.skip:
+            emit(bench_calculate_indicators(years, memory))
+        if "plot" not in args.skip:
+            emit(bench_plot(years, memory))
+        for universe in args.universe:
+            if "scan" not in args.skip:
+                emit(bench_scan(universe, years, memory))
+            if "panel" not in args.skip:
+                emit(bench_scan(universe, years, memory, use_panel=True))
+            if "compact" not in args.skip:
+                emit(bench_scan(universe, years, memory, use_panel=True, compact=True))
+
+    if args.output:
+        meta = {"python": platform.python_version(), "machine": platform.machine(),
+                "timestamp": datetime.now().isoformat(timespec="seconds")}
+        with open(args.output, "w") as f:
+            f.write(json.dumps({"meta": meta}) + "\n")
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(json.dumps({"regression": regression}), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import hashlib
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# Change detection between scans. Each symbol's crosses are stored with the
+# last bar they were computed from and a fingerprint of its closes. A rerun
+# first asks "could a newer bar exist yet?" from the calendar alone; if not,
+# the stored result is served without fetching anything. Fetched symbols are
+# fingerprinted so unchanged data (holidays, late bars) isn't reported as new.
+MARKET_TZ = "America/New_York"
+MARKET_CLOSE = (16, 0)  # the day's bar is only final after the close
+
+
+def as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], "%Y-%m-%d").date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+def expected_last_bar(end, now=None, tz=MARKET_TZ):
+    """
+    Date of the newest complete daily bar that can exist for a scan ending at
+    `end` (exclusive, as yfinance treats it): the last weekday before `end`,
+    and no later than the last session that has closed by `now`.
+    Exchange holidays aren't known; the fingerprint check covers them.
+    """
+    local = (now or datetime.now().astimezone()).astimezone(ZoneInfo(tz))
+    closed = local.date() if (local.hour, local.minute) >= MARKET_CLOSE else local.date() - timedelta(days=1)
+    day = min(as_date(end) - timedelta(days=1), closed)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def fingerprint(df):
+    """Short hash of a frame's bar dates and closes (float32, so compact and full frames agree)."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(np.asarray(df.index.values, dtype="datetime64[D]").tobytes())
+    digest.update(np.asarray(df["Close"], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def last_bar(df):
+    return df.index[-1].strftime("%Y-%m-%d")
+
+
+def split_unchanged(symbols, stored, start, end, now=None):
+    """
+    ({symbol: stored result}, [symbols to scan]) given `stored`, from
+    state_store.load_symbol_results(). A stored result is reused when it was
+    computed over the same start date and already includes the newest bar
+    expected for `end`.
+    """
+    newest = expected_last_bar(end, now).strftime("%Y-%m-%d")
+    start = as_date(start).strftime("%Y-%m-%d")
+    unchanged, to_scan = {}, []
+    for symbol in symbols:
+        entry = stored.get(symbol)
+        if entry and entry["start_date"] == start and newest <= entry["last_bar"] < as_date(end).strftime("%Y-%m-%d"):
+            unchanged[symbol] = entry
+        else:
+            to_scan.append(symbol)
+    return unchanged, to_scan
+
+
+def new_crosses(dates, previous, key, start):
+    """
+    The dates in `dates` (YYYY-MM-DD) missing from previous[key], the
+    symbol's stored "golden_crosses" or "death_crosses". Only crosses on bars
+    the last run didn't have count, unless the window is unchanged (then
+    revised data counts too). A symbol seen for the first time has nothing
+    new; that run is its baseline.
+    """
+    if not previous:
+        return []
+    same_window = previous["start_date"] == as_date(start).strftime("%Y-%m-%d")
+    seen = set(previous[key])
+    return [d for d in dates if d > previous["last_bar"] or (same_window and d not in seen)]
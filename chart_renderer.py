@@ -0,0 +1,159 @@
+import hashlib
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import metrics
+
+# Charts are rendered off the main thread into image files, keyed by what
+# they show, so the scan never blocks on matplotlib and an unchanged chart is
+# never drawn twice.
+CHART_CACHE_DIR = "chart_cache"
+CHART_FORMAT = "png"    # or "svg"
+CHART_DPI = 80
+RENDER_WORKERS = 2
+CHART_CACHE_FILES = 5000   # charts kept; the least recently used go first
+CHART_CACHE_DAYS = 30      # charts not used for this long are deleted
+PRUNE_EVERY = 256          # renders between cache prunes
+
+# Bump when the chart layout or indicator settings change
+CHART_PARAMS = "ma50/200 rsi14 macd12/26/9 v2"
+
+PLOT_COLUMNS = ["Close", "50_MA", "200_MA", "RSI", "MACD", "Signal_Line"]
+
+
+def chart_key(historical_data, stock_symbol, golden_crosses=(), death_crosses=(), fmt=CHART_FORMAT, max_points=None):
+    """Symbol + the bars shown (and their closes) + marked crosses + downsampling + indicator params."""
+    import change_detect  # numpy; not needed to clear the cache
+    index = historical_data.index
+    parts = [
+        stock_symbol,
+        index[0].strftime("%Y-%m-%d"),
+        index[-1].strftime("%Y-%m-%d"),
+        str(len(index)),
+        # A revised last bar (same dates, new close) must not reuse the old chart
+        change_detect.fingerprint(historical_data),
+        ",".join(d.strftime("%Y-%m-%d") for d in golden_crosses),
+        ",".join(d.strftime("%Y-%m-%d") for d in death_crosses),
+        f"points={max_points or 'all'}",
+        CHART_PARAMS,
+        fmt,
+    ]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def chart_path(historical_data, stock_symbol, golden_crosses=(), death_crosses=(), fmt=CHART_FORMAT,
+               cache_dir=CHART_CACHE_DIR, max_points=None):
+    key = chart_key(historical_data, stock_symbol, golden_crosses, death_crosses, fmt, max_points)
+    safe = stock_symbol.replace("/", "_").replace("^", "_")
+    return os.path.join(cache_dir, f"{safe}_{key}.{fmt}")
+
+
+def render_chart(historical_data, stock_symbol, golden_crosses, death_crosses, path, fmt=CHART_FORMAT,
+                 max_points=None):
+    """Draw one chart to `path` (runs in a worker process) and return the path."""
+    import golden_cross  # pulls in pandas/matplotlib; not needed to clear the cache
+    fig = golden_cross.plot_stock_data_with_indicators(historical_data, stock_symbol, golden_crosses, death_crosses,
+                                                       max_points=max_points)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    fig.savefig(tmp, format=fmt, dpi=CHART_DPI)
+    os.replace(tmp, path)
+    return path
+
+
+class ChartRenderer:
+    """Worker pool that turns price frames into cached chart files."""
+
+    def __init__(self, workers=RENDER_WORKERS, cache_dir=CHART_CACHE_DIR, fmt=CHART_FORMAT):
+        self.cache_dir = cache_dir
+        self.fmt = fmt
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self.renders = 0
+        prune_chart_cache(cache_dir)
+
+    def submit(self, historical_data, stock_symbol, golden_crosses=(), death_crosses=(), max_points=None):
+        """
+        Return a Future for the chart's file path; cached charts resolve at once.
+        `max_points` defaults to golden_cross.CHART_MAX_POINTS (0 draws every bar).
+        """
+        if max_points is None:
+            import golden_cross  # already loaded by whoever is scanning
+            max_points = golden_cross.CHART_MAX_POINTS
+        golden_crosses, death_crosses = list(golden_crosses), list(death_crosses)
+        path = chart_path(historical_data, stock_symbol, golden_crosses, death_crosses, self.fmt, self.cache_dir,
+                          max_points)
+        if os.path.exists(path):
+            metrics.incr("chart_cache_hits")
+            os.utime(path)  # recently used, so pruning keeps it
+            done = Future()
+            done.set_result(path)
+            return done
+        metrics.incr("chart_cache_misses")
+        self.renders += 1
+        if self.renders % PRUNE_EVERY == 0:
+            prune_chart_cache(self.cache_dir)
+
+        # Only ship the columns the chart draws to the worker
+        data = historical_data[[c for c in PLOT_COLUMNS if c in historical_data.columns]]
+        started = time.perf_counter()
+        if self.pool is None:
+            done = Future()
+            try:
+                done.set_result(render_chart(data, stock_symbol, golden_crosses, death_crosses, path, self.fmt,
+                                             max_points))
+            except Exception as e:
+                done.set_exception(e)
+        else:
+            done = self.pool.submit(render_chart, data, stock_symbol, golden_crosses, death_crosses, path, self.fmt,
+                                    max_points)
+        if metrics.ENABLED:
+            done.add_done_callback(lambda _: metrics.record("plot", time.perf_counter() - started, stock_symbol))
+        return done
+
+    def render(self, historical_data, stock_symbol, golden_crosses=(), death_crosses=(), max_points=None):
+        """Blocking version of submit()."""
+        return self.submit(historical_data, stock_symbol, golden_crosses, death_crosses, max_points).result()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+
+_renderer = None
+
+
+def get_renderer():
+    """Shared renderer so the pool survives across scans / Streamlit reruns."""
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer()
+    return _renderer
+
+
+def prune_chart_cache(cache_dir=CHART_CACHE_DIR, max_files=CHART_CACHE_FILES, max_days=CHART_CACHE_DAYS):
+    """Delete charts unused for `max_days`, then the least recently used beyond `max_files`."""
+    if not os.path.isdir(cache_dir):
+        return 0
+    charts = []
+    for entry in os.scandir(cache_dir):
+        try:
+            charts.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            continue  # removed meanwhile
+    charts.sort(reverse=True)
+    cutoff = time.time() - max_days * 86400
+    stale = [path for i, (mtime, path) in enumerate(charts) if i >= max_files or mtime < cutoff]
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(stale)
+
+
+def clear_chart_cache():
+    if not os.path.isdir(CHART_CACHE_DIR):
+        return
+    for name in os.listdir(CHART_CACHE_DIR):
+        os.remove(os.path.join(CHART_CACHE_DIR, name))
@@ -1,25 +1,210 @@
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
-import time
-import json
 import os
+import threading
 from datetime import datetime, timedelta
-from update_stocks import load_stock_symbols  # Import the function that scrapes the stock symbols
+from price_cache import load_prices
+import chart_renderer
+import state_store
+import metrics
 import random
+from rate_limiter import RateLimitedError, TransientError, classify_message, get_limiter
+# State helpers live in the light scanner_state module; re-exported here.
+# NumPy/pandas, the scan modules, yfinance, matplotlib and the listing
+# scraper are imported on first use, so the cooldown/reset menu options
+# start without them.
+from scanner_state import (
+    SKIP_DAYS,
+    TRENDING_CACHE_DAYS,
+    load_skipped_symbols,
+    save_skipped_symbols,
+    filter_skipped_and_cooldown,
+    load_cached_trending,
+    save_cached_trending,
+    reset_cached_data,
+    load_cooldown,
+    update_cooldown,
+    is_in_cooldown,
+    filter_cooldown_symbols,
+    add_to_cooldown,
+)
+
+FETCH_BATCH_SIZE = 50   # tickers per grouped download (paced by rate_limiter, not a fixed pause)
+USE_PRICE_CACHE = True  # serve bars from price_cache/, fetch only the gaps
+COMPACT_PRICES = False  # keep only closes as float32 in one store (big universes)
+INCREMENTAL_SCANS = True  # reuse stored results for symbols with no new bar since the last scan
+INDEX_SIGNALS = True      # record each scanned symbol's crosses and RSI/MACD events in signal_index
+CHART_MAX_POINTS = 1500   # rows drawn per chart; longer histories are downsampled (None = all)
+
+
+def yahoo_provider(symbols, start, end):
+    """
+    Default data source: one grouped yf.download for the whole batch.
+    A provider takes (symbols, start, end) and returns either a DataFrame
+    with (symbol, field) MultiIndex columns or a {symbol: DataFrame} dict.
+    """
+    import yfinance as yf  # slow to import; only needed for real fetches
+    import yfinance.shared  # noqa: F401  (where download() leaves per-ticker errors)
+    raw = yf.download(symbols, start=start, end=end, group_by="ticker",
+                      progress=False, threads=True)
 
-def fetch_historical_data(symbol, start, end):
-    df = yf.download(symbol, start=start, end=end)
-    
-    if df is not None and not df.empty:
-        if len(df) >= 200:
-            df['50_MA'] = df['Close'].rolling(window=50).mean()
-            df['200_MA'] = df['Close'].rolling(window=200).mean()
+    # yf.download swallows per-ticker errors; raise the retryable ones so the
+    # limiter backs off, and leave "no such symbol" ones as missing data
+    errors = {symbol: str(yf.shared._ERRORS.get(symbol, "")) for symbol in symbols}
+    kinds = {symbol: classify_message(message) for symbol, message in errors.items() if message}
+    if "throttle" in kinds.values():
+        raise RateLimitedError(f"Yahoo rate limit hit for {len(kinds)} of {len(symbols)} symbols")
+    transient = [symbol for symbol, kind in kinds.items() if kind == "transient"]
+    if transient:
+        raise TransientError(f"transient errors for {transient}: {errors[transient[0]]}")
+    return raw
+
+
+# Swap this out (set_data_provider) to scan against a local/fake source.
+_data_provider = yahoo_provider
+_provider_limiter = None  # None = the shared "yahoo" limiter while using yahoo_provider
+
+
+def set_data_provider(provider, limiter=None):
+    """
+    Use `provider` for all following fetches. Pass None to restore Yahoo.
+    `limiter` (a rate_limiter.AdaptiveRateLimiter) paces and retries a custom
+    provider; without one it's called directly.
+    """
+    global _data_provider, _provider_limiter
+    _data_provider = provider or yahoo_provider
+    _provider_limiter = limiter
+
+
+def get_data_provider():
+    return _data_provider
+
+
+def _limiter_for(provider):
+    if provider is _data_provider and _provider_limiter is not None:
+        return _provider_limiter
+    return get_limiter("yahoo") if provider is yahoo_provider else None
+
+
+def split_batch_frame(raw, symbols):
+    """
+    Split a provider result into {symbol: DataFrame} with flat OHLCV columns.
+    Symbols the provider returned nothing (or only NaNs) for map to None.
+    """
+    import pandas as pd
+    frames = {}
+    if raw is None:
+        return {symbol: None for symbol in symbols}
+
+    if isinstance(raw, dict):
+        for symbol in symbols:
+            df = raw.get(symbol)
+            frames[symbol] = df.dropna(how="all") if df is not None else None
+        return frames
+
+    if not isinstance(raw.columns, pd.MultiIndex):
+        # A single ticker without grouping comes back flat
+        frames[symbols[0]] = raw.dropna(how="all")
+        for symbol in symbols[1:]:
+            frames[symbol] = None
+        return frames
+
+    # group_by="ticker" puts the symbol on level 0, the default on level 1
+    level = 0 if set(symbols) & set(raw.columns.get_level_values(0)) else 1
+    available = set(raw.columns.get_level_values(level))
+    for symbol in symbols:
+        if symbol not in available:
+            frames[symbol] = None
+            continue
+        df = raw.xs(symbol, axis=1, level=level).dropna(how="all").copy()
+        df.columns.name = None
+        frames[symbol] = df
+    return frames
+
+
+def add_moving_averages(df, symbol):
+    """Attach the 50/200-day SMAs used by the scanner (in place)."""
+    if len(df) >= 200:
+        df['50_MA'] = df['Close'].rolling(window=50).mean()
+        df['200_MA'] = df['Close'].rolling(window=200).mean()
+    else:
+        print(f"⚠️ Not enough data for 50/200 MA for {symbol} ({len(df)} rows)")
+    return df
+
+
+def _download_frames(symbols, start, end, provider, batch_size=FETCH_BATCH_SIZE, failures=None):
+    """
+    Raw OHLCV {symbol: DataFrame or None}, one provider call per batch.
+
+    A symbol maps to None when the provider answered but had no data for it.
+    Symbols whose batch failed (after the limiter's retries) are left out and
+    recorded in `failures` as {symbol: reason}, so they're retried next time
+    instead of being cached or skipped as if they didn't exist.
+    """
+    limiter = _limiter_for(provider)
+    frames = {}
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+        try:
+            with metrics.timed("fetch", symbols=len(batch)):
+                if limiter is not None:
+                    raw = limiter.call(provider, batch, start, end)
+                else:
+                    raw = provider(batch, start, end)
+            metrics.incr("fetch_requests")
+        except Exception as e:
+            print(f"❌ Batch download failed for {batch}: {e}")
+            metrics.incr("fetch_errors")
+            if failures is not None:
+                failures.update(dict.fromkeys(batch, f"{type(e).__name__}: {e}"))
+            continue
+
+        for symbol, df in split_batch_frame(raw, batch).items():
+            frames[symbol] = df if df is not None and not df.empty else None
+            if metrics.ENABLED and frames[symbol] is not None:
+                metrics.incr("rows_fetched", len(df))
+                metrics.incr("bytes_fetched", int(df.memory_usage(deep=False).sum()))
+    return frames
+
+
+def fetch_historical_data_batch(symbols, start, end, batch_size=FETCH_BATCH_SIZE, provider=None,
+                                use_cache=None, columns=None, failures=None):
+    """
+    Fetch many symbols with one grouped provider request per `batch_size`
+    tickers. Returns {symbol: DataFrame or None}, MAs already attached.
+    Symbols that couldn't be fetched at all (rather than having no data) are
+    also added to `failures` as {symbol: reason} when it's given.
+
+    With `use_cache` the on-disk price cache serves whatever it already has
+    and only the missing head/tail of the range goes to the provider.
+    With `columns` (e.g. price_store.SCAN_COLUMNS) frames are cut down to
+    those columns in narrow dtypes and no MAs are attached.
+    """
+    import price_store
+    provider = provider or _data_provider
+    use_cache = USE_PRICE_CACHE if use_cache is None else use_cache
+    symbols = list(dict.fromkeys(symbols))  # de-dupe, keep order
+
+    def download(batch, batch_start, batch_end):
+        return _download_frames(batch, batch_start, batch_end, provider, batch_size, failures)
+
+    if use_cache:
+        frames = load_prices(symbols, start, end, download)
+    else:
+        frames = download(symbols, start, end)
+
+    results = {}
+    for symbol in symbols:
+        df = frames.pop(symbol, None)
+        if df is None:
+            results[symbol] = None
+        elif columns is not None:
+            results[symbol] = price_store.compact_frame(df, columns)
         else:
-            print(f"⚠️ Not enough data for 50/200 MA for {symbol} ({len(df)} rows)")
-        return df
+            results[symbol] = add_moving_averages(df, symbol)
+    return results
 
-    return None
+
+def fetch_historical_data(symbol, start, end):
+    return fetch_historical_data_batch([symbol], start, end)[symbol]
 
 def calculate_indicators(historical_data):
     # Calculate RSI
@@ -43,21 +228,57 @@ def calculate_indicators(historical_data):
     
     return historical_data
 
-def plot_stock_data_with_indicators(historical_data, stock_symbol, golden_cross):
-    historical_data = calculate_indicators(historical_data)
+def with_chart_indicators(historical_data, stock_symbol):
+    """
+    The frame with the MAs/RSI/MACD a chart shows (compact frames carry only
+    closes). Missing columns come from the shared indicator engine, so a
+    symbol the scan already indexed isn't computed again.
+    """
+    import indicator_engine
+    missing = [column for column in indicator_engine.INDICATOR_COLUMNS if column not in historical_data.columns]
+    if len(historical_data) < 200:
+        missing = [column for column in missing if not column.endswith('_MA')]
+    if missing:
+        values = indicator_engine.get_engine().frame(stock_symbol, historical_data)
+        historical_data = historical_data.assign(**{column: values[column].to_numpy() for column in missing})
+    return historical_data
+
+
+def plot_stock_data_with_indicators(historical_data, stock_symbol, golden_cross, death_cross=(),
+                                    max_points=CHART_MAX_POINTS):
+    """
+    Build the 3-panel price/RSI/MACD chart and return the Figure.
+    Uses a bare Figure (no pyplot) so nothing blocks or pops up a window;
+    save it or hand it to st.pyplot. Longer histories are downsampled to
+    `max_points` rows (None draws every bar); cross dates are always kept.
+    """
+    historical_data = with_chart_indicators(historical_data, stock_symbol)
+    if max_points:
+        import light_charts
+        historical_data = light_charts.downsample_frame(historical_data, max_points,
+                                                        list(golden_cross) + list(death_cross))
+
+    from matplotlib.figure import Figure
 
     # Create the main plot for price and moving averages
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 12), gridspec_kw={'height_ratios': [2, 1, 1]})
+    fig = Figure(figsize=(12, 12))
+    ax1, ax2, ax3 = fig.subplots(3, 1, gridspec_kw={'height_ratios': [2, 1, 1]})
     fig.suptitle(f'{stock_symbol} Stock Analysis', fontsize=16)
 
     # Plot closing price and moving averages
     ax1.plot(historical_data.index, historical_data['Close'], label='Closing Price', color='blue', linewidth=1)
-    ax1.plot(historical_data.index, historical_data['50_MA'], label='50-Day MA', color='orange', linestyle='--')
-    ax1.plot(historical_data.index, historical_data['200_MA'], label='200-Day MA', color='green', linestyle='--')
-
-    # Plot golden crosses
-    for date in golden_cross:
-        ax1.scatter(date, historical_data.loc[date]['Close'], color='green', label="Golden Cross", zorder=5)
+    if '50_MA' in historical_data.columns:
+        ax1.plot(historical_data.index, historical_data['50_MA'], label='50-Day MA', color='orange', linestyle='--')
+    if '200_MA' in historical_data.columns:
+        ax1.plot(historical_data.index, historical_data['200_MA'], label='200-Day MA', color='green', linestyle='--')
+
+    # Plot golden and death crosses (label only the first of each for the legend)
+    for i, date in enumerate(golden_cross):
+        ax1.scatter(date, historical_data.loc[date]['Close'], color='green',
+                    label="Golden Cross" if i == 0 else None, zorder=5)
+    for i, date in enumerate(death_cross):
+        ax1.scatter(date, historical_data.loc[date]['Close'], color='red',
+                    label="Death Cross" if i == 0 else None, zorder=5)
 
     ax1.set_title('Price and Moving Averages')
     ax1.set_xlabel('Date')
@@ -78,243 +299,388 @@ def plot_stock_data_with_indicators(historical_data, stock_symbol, golden_cross)
     # Plot MACD
     ax3.plot(historical_data.index, historical_data['MACD'], label='MACD', color='blue', linewidth=1)
     ax3.plot(historical_data.index, historical_data['Signal_Line'], label='Signal Line', color='red', linewidth=0.8)
-    ax3.bar(historical_data.index, historical_data['MACD'] - historical_data['Signal_Line'], label='Histogram', color='gray', alpha=0.5)
+    # One filled polygon rather than an artist per bar
+    ax3.fill_between(historical_data.index, historical_data['MACD'] - historical_data['Signal_Line'], 0,
+                     label='Histogram', color='gray', alpha=0.5, step='mid', linewidth=0)
     ax3.set_title('MACD (Moving Average Convergence Divergence)')
     ax3.set_xlabel('Date')
     ax3.set_ylabel('MACD Value')
     ax3.legend()
     ax3.grid(True)
 
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.show()
-
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    fig = plt.gcf()
-    plt.close(fig)  # Prevent it from auto-displaying in some environments
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
     return fig
 
+def rolling_means(close, windows):
+    """
+    Simple moving averages for every window in `windows` from one cumulative
+    sum. Returns {window: ndarray}; NaN until the window is full and for any
+    window that spans a missing bar (same as pandas' rolling().mean()).
+    """
+    import numpy as np
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    missing = np.isnan(close)
+    # Centre the series first so the running sum doesn't lose precision
+    offset = close[~missing].mean() if n and not missing.all() else 0.0
+    csum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, close - offset))))
+    cmissing = np.concatenate(([0], np.cumsum(missing)))
+
+    means = {}
+    for window in set(windows):
+        sma = np.full(n, np.nan)
+        if 0 < window <= n:
+            values = (csum[window:] - csum[:-window]) / window + offset
+            values[(cmissing[window:] - cmissing[:-window]) > 0] = np.nan
+            sma[window - 1:] = values
+        means[window] = sma
+    return means
+
+
+def _cross_positions(sma_short, sma_long):
+    """Row positions where short crosses above (golden) / below (death) long."""
+    import numpy as np
+    valid = np.flatnonzero(~(np.isnan(sma_short) | np.isnan(sma_long)))
+    if len(valid) < 2:
+        return valid[:0], valid[:0]
+
+    spread = sma_short[valid] - sma_long[valid]
+    prev, curr = spread[:-1], spread[1:]
+    golden = valid[1:][(prev < 0) & (curr >= 0)]
+    death = valid[1:][(prev > 0) & (curr <= 0)]
+    return golden, death
+
+
+def detect_crossovers_multi(df, pairs=((50, 200),)):
+    """
+    Golden and death crosses for many (short, long) window pairs at once.
+    Each distinct window's SMA is computed once; existing '<n>_MA' columns
+    (e.g. from fetch_historical_data) are reused instead of recomputed.
+
+    Returns {(short, long): (golden_cross_dates, death_cross_dates)}.
+    """
+    import numpy as np
+    pairs = [tuple(pair) for pair in pairs]
+    close = df["Close"].to_numpy(dtype=np.float64)
+
+    windows = {w for pair in pairs for w in pair}
+    means = {}
+    for window in windows:
+        column = f"{window}_MA"
+        if column in df.columns:
+            means[window] = df[column].to_numpy(dtype=np.float64)
+    means.update(rolling_means(close, windows - means.keys()))
+
+    results = {}
+    for short, long in pairs:
+        golden, death = _cross_positions(means[short], means[long])
+        results[(short, long)] = (list(df.index[golden]), list(df.index[death]))
+    return results
+
+
 def detect_crossovers(df, short=50, long=200):
-    df = df.copy()
-    df["SMA_short"] = df["Close"].rolling(window=short).mean()
-    df["SMA_long"] = df["Close"].rolling(window=long).mean()
-    df.dropna(inplace=True)
+    """Return (golden_cross_dates, death_cross_dates) for one window pair."""
+    return detect_crossovers_multi(df, [(short, long)])[(short, long)]
+
+def _last_date(dates):
+    return dates[-1].strftime("%Y-%m-%d") if dates else None
+
+
+def _stored_entry(result, start_date):
+    """The symbol_results row for a scan result, for the next run's change check."""
+    import change_detect
+    data = result["data"]
+    return {
+        "symbol": result["symbol"],
+        "start_date": change_detect.as_date(start_date).strftime("%Y-%m-%d"),
+        "last_bar": change_detect.last_bar(data),
+        "fingerprint": change_detect.fingerprint(data),
+        "golden_crosses": [date.strftime("%Y-%m-%d") for date in result["golden_crosses"]],
+        "death_crosses": [date.strftime("%Y-%m-%d") for date in result["death_crosses"]],
+    }
+
+
+def _indexed(result):
+    """(signal events, indicator snapshot) for a scan result with data."""
+    import signal_index
+    if "events" in result:
+        # Panel scans derive these from the arrays they already hold
+        return result["events"], result["snapshot"]
+    indicators = signal_index.indicator_frame(result["data"], result["symbol"])
+    return (signal_index.symbol_events(indicators, result["golden_crosses"], result["death_crosses"]),
+            signal_index.snapshot(indicators))
+
+
+def record_results(results, start_date, end_date):
+    """
+    Store scan_pipeline results the way check_stocks_for_crossovers() does:
+    scan history, skips for symbols without data (not for failed fetches),
+    stored results for the change check and the signal index. For callers
+    that run the pipeline themselves, like the app's scan_cache.
+    """
+    import signal_index
+    today = datetime.today()
+    history, new_skips, processed, signal_events, snapshots = [], {}, [], {}, {}
+    for result in results:
+        stock_symbol, historical_data = result["symbol"], result["data"]
+        history.append({
+            "symbol": stock_symbol,
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "last_golden_cross": _last_date(result["golden_crosses"]),
+            "last_death_cross": _last_date(result["death_crosses"]),
+            "error": result["error"],
+        })
+        if historical_data is None or result["error"] is not None:
+            if not (result["error"] or "").startswith("fetch failed"):
+                new_skips[stock_symbol] = today
+            continue
+        if historical_data.empty:
+            continue
+        processed.append({**_stored_entry(result, start_date), "chart": None})
+        if INDEX_SIGNALS:
+            signal_events[stock_symbol], snapshots[stock_symbol] = _indexed(result)
 
-    if df.empty:
-        return [], []
+    save_skipped_symbols(new_skips)
+    state_store.record_scans(history)
+    signal_index.update(signal_events, snapshots)
+    if processed:
+        state_store.save_symbol_results(processed)
 
-    golden_crosses = []
-    prev_short = df["SMA_short"].iloc[0]
-    prev_long = df["SMA_long"].iloc[0]
 
-    for i in range(1, len(df)):
-        curr_short = df["SMA_short"].iloc[i]
-        curr_long = df["SMA_long"].iloc[i]
-        date = df.index[i]
+def check_stocks_for_crossovers(stock_symbols, start_date, end_date, recent_only=False, recent_days=30,
+                                use_panel=False, render_charts=True, compact=None, incremental=None, on_row=None,
+                                save_indicators=True):
+    """
+    Scan `stock_symbols` and print what was found. Returns one row per
+    symbol checked (last crosses, latest qualifying golden cross, chart path
+    and error) so callers can save the results.
 
-        if prev_short < prev_long and curr_short >= curr_long:
-            golden_crosses.append(date)
+    `compact` (default COMPACT_PRICES) keeps only float32 closes per symbol;
+    with `use_panel` they're packed into one price_store.PriceStore, which
+    large universes scan on every core through shared_panel.
 
-        prev_short = curr_short
-        prev_long = curr_long
+    With `incremental` (default INCREMENTAL_SCANS) symbols that can't have a
+    new bar since their stored result are answered from it without fetching.
+    Rows then also say whether they were `unchanged` and give the latest
+    `new_golden_cross` / `new_death_cross` found since the previous scan.
 
-    return golden_crosses
+    `on_row(row)` is called as soon as each symbol's row is final (after its
+    chart, if any), so callers can checkpoint without waiting for the batch.
 
-def check_stocks_for_crossovers(stock_symbols, start_date, end_date, recent_only=False, recent_days=30):
+    Indicator states are saved to indicator_engine.INDICATOR_STATE_FILE at
+    the end unless `save_indicators` is False (callers scanning many batches
+    call indicator_engine.save_engine() once instead).
+    """
+    import pandas as pd
+    import change_detect
+    import indicator_engine
+    import panel
+    import price_store
+    import scan_pipeline
+    import shared_panel
+    import signal_index
+    compact = COMPACT_PRICES if compact is None else compact
+    incremental = INCREMENTAL_SCANS if incremental is None else incremental
     valid_symbols = []
+    rows = {}
     skipped_symbols = load_skipped_symbols()
-    updated_skipped = skipped_symbols.copy()
+    new_skips = {}
+    failures = {}  # symbols that couldn't be fetched this time; not skipped
+    history = []
     today = datetime.today()
     recent_cutoff = today - timedelta(days=recent_days)
 
+    to_check = []
     for stock_symbol in stock_symbols:
         if stock_symbol in skipped_symbols:
             print(f"⏩ Skipping {stock_symbol} (recently checked)")
-            continue
+        else:
+            to_check.append(stock_symbol)
+
+    stored, unchanged = {}, {}
+    if incremental:
+        stored = state_store.load_symbol_results(to_check)
+        unchanged, to_check = change_detect.split_unchanged(to_check, stored, start_date, end_date)
+    for stock_symbol, entry in unchanged.items():
+        golden_crosses = [pd.Timestamp(date) for date in entry["golden_crosses"]]
+        if recent_only:
+            golden_crosses = signal_index.since(golden_crosses, recent_cutoff)
+        chart = entry["chart"] if entry["chart"] and os.path.exists(entry["chart"]) else None
+        print(f"♻️ {stock_symbol}: no new bar since {entry['last_bar']}, using the stored result")
+        history.append({
+            "symbol": stock_symbol,
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "last_golden_cross": entry["golden_crosses"][-1] if entry["golden_crosses"] else None,
+            "last_death_cross": entry["death_crosses"][-1] if entry["death_crosses"] else None,
+            "error": None,
+        })
+        rows[stock_symbol] = {**history[-1], "signal_date": _last_date(golden_crosses),
+                              "chart": chart if golden_crosses else None, "unchanged": True,
+                              "new_golden_cross": None, "new_death_cross": None}
+        valid_symbols.append(stock_symbol)
+        if on_row:
+            on_row(rows[stock_symbol])
+
+    renderer = chart_renderer.get_renderer() if render_charts else None
+    charts = {}
+    processed = {}  # symbol -> result to store for the next run's change check
+    signal_events = {}
+    snapshots = {}
+
+    if use_panel and compact:
+        # Fetch a chunk at a time straight into contiguous float32 arrays, so
+        # full frames never pile up, then scan the store block by block
+        store = price_store.PriceStore(price_store.SCAN_COLUMNS)
+        for i in range(0, len(to_check), price_store.STORE_CHUNK):
+            chunk = to_check[i:i + price_store.STORE_CHUNK]
+            store.add_frames(fetch_historical_data_batch(chunk, start_date, end_date,
+                                                         columns=price_store.SCAN_COLUMNS, failures=failures))
+        with metrics.timed("panel", symbols=len(store)):
+            # Big stores are shared with a process pool rather than pickled to it
+            results = list(shared_panel.scan_store(store, to_check, workers=shared_panel.PARALLEL_WORKERS,
+                                                   with_events=INDEX_SIGNALS))
+    elif use_panel:
+        # Fetch everything, then compute the whole universe as one matrix
+        frames = fetch_historical_data_batch(to_check, start_date, end_date, failures=failures)
+        with metrics.timed("panel", symbols=len(frames)):
+            results = list(panel.scan_panel(frames, with_events=INDEX_SIGNALS))
+    else:
+        # Fetches run concurrently and results stream back as each symbol is done
+        results = scan_pipeline.scan_symbols(
+            to_check, start_date, end_date, columns=price_store.SCAN_COLUMNS if compact else None,
+            workers=scan_pipeline.COMPUTE_WORKERS, failures=failures)
 
+    for result in results:
+        stock_symbol = result["symbol"]
         print(f"\n🔍 Checking {stock_symbol}...")
 
-        historical_data = fetch_historical_data(stock_symbol, start_date, end_date)
-        if historical_data is not None:
-            golden_crosses = detect_crossovers(historical_data)
+        historical_data = result["data"]
+        if historical_data is None and stock_symbol in failures:
+            result["error"] = f"fetch failed: {failures[stock_symbol]}"
+        history.append({
+            "symbol": stock_symbol,
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "last_golden_cross": _last_date(result["golden_crosses"]),
+            "last_death_cross": _last_date(result["death_crosses"]),
+            "error": result["error"],
+        })
+        rows[stock_symbol] = {**history[-1], "signal_date": None, "chart": None, "unchanged": False,
+                              "new_golden_cross": None, "new_death_cross": None}
+        if historical_data is not None and result["error"] is None:
+            golden_crosses = result["golden_crosses"]
+
+            if incremental and not historical_data.empty:
+                entry = _stored_entry(result, start_date)
+                previous = stored.get(stock_symbol)
+                if previous and previous["fingerprint"] == entry["fingerprint"]:
+                    # Fetched, but the bars are the same as last time (e.g. a holiday)
+                    rows[stock_symbol]["unchanged"] = True
+                for kind in ("golden", "death"):
+                    new = change_detect.new_crosses(entry[f"{kind}_crosses"], previous, f"{kind}_crosses", start_date)
+                    rows[stock_symbol][f"new_{kind}_cross"] = new[-1] if new else None
+                processed[stock_symbol] = entry
+            if INDEX_SIGNALS and not historical_data.empty:
+                signal_events[stock_symbol], snapshots[stock_symbol] = _indexed(result)
 
             if recent_only:
-                golden_crosses = [date for date in golden_crosses if date >= recent_cutoff]
+                golden_crosses = signal_index.since(golden_crosses, recent_cutoff)
 
             if golden_crosses:
                 print(f"\n📈 {stock_symbol}: Golden Cross on {golden_crosses[-1].strftime('%Y-%m-%d')}")
-                plot_stock_data_with_indicators(historical_data, stock_symbol, [golden_crosses[-1]], [])
+                rows[stock_symbol]["signal_date"] = golden_crosses[-1].strftime("%Y-%m-%d")
+                if render_charts:
+                    # Rendered to a file in the background; the scan keeps going
+                    charts[stock_symbol] = renderer.submit(historical_data, stock_symbol, [golden_crosses[-1]])
 
             else:
                 print(f"📉 No significant crossover found for {stock_symbol}.")
 
 
             valid_symbols.append(stock_symbol)
+        elif historical_data is None and stock_symbol in failures:
+            # Throttled or timed out: not the symbol's fault, so no skip
+            print(f"⏳ Couldn't fetch {stock_symbol} this time; it will be retried next scan.")
         else:
             print(f"❌ Skipping {stock_symbol} due to missing or invalid data.")
-            updated_skipped[stock_symbol] = today.strftime("%Y-%m-%d")
-
-        time.sleep(1.5)
-
-    save_skipped_symbols(updated_skipped)
-    print(f"\n✅ Finished checking stocks. {len(valid_symbols)} had valid data.")
-
-SKIPPED_FILE = "skipped_symbols.json"
-SKIP_DAYS = 3  # Number of days to temporarily skip symbols
+            new_skips[stock_symbol] = today
+        if on_row and stock_symbol not in charts:
+            on_row(rows[stock_symbol])
 
-TRENDING_CACHE_FILE = "trending_cache.json"
-TRENDING_CACHE_DAYS = 3  # days before refresh
-
-
-from datetime import datetime, timedelta
-
-def is_date_recent(date_str, days=1):
-    """Return True if the date string is within the last `days` days."""
-    try:
-        skipped_date = datetime.strptime(date_str, "%Y-%m-%d")
-        return datetime.now() - skipped_date < timedelta(days=days)
-    except ValueError:
-        return False
-
-def load_skipped_symbols():
-    file_path = 'skipped_stocks.json'
-    if not os.path.exists(file_path):
-        return {}
-
-    with open(file_path, 'r') as f:
+    for stock_symbol, chart in charts.items():
         try:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return {
-                    symbol: date_str for symbol, date_str in data.items()
-                    if not is_date_recent(date_str)
-                }
-            else:
-                return {}
-        except json.JSONDecodeError:
-            return {}
-
-
-def save_skipped_symbols(skipped):
-    with open(SKIPPED_FILE, "w") as f:
-        json.dump(skipped, f)
+            rows[stock_symbol]["chart"] = chart.result()
+            print(f"🖼️ {stock_symbol} chart: {rows[stock_symbol]['chart']}")
+        except Exception as e:
+            print(f"⚠️ Failed to render chart for {stock_symbol}: {e}")
+        if on_row:
+            on_row(rows[stock_symbol])
+
+    new_since_last_run = [(row["symbol"], kind, row[f"new_{kind}_cross"]) for row in rows.values()
+                          for kind in ("golden", "death") if row[f"new_{kind}_cross"]]
+    if new_since_last_run:
+        print("\n🆕 New since last run: " + ", ".join(f"{symbol} {kind} cross {date}"
+                                                    for symbol, kind, date in new_since_last_run))
+
+    save_skipped_symbols(new_skips)
+    state_store.record_scans(history)
+    signal_index.update(signal_events, snapshots)
+    if processed:
+        state_store.save_symbol_results(
+            [{**entry, "chart": rows[symbol]["chart"]} for symbol, entry in processed.items()])
+    if save_indicators:
+        indicator_engine.save_engine()
+    metrics.flush()
+    print(f"\n✅ Finished checking stocks. {len(valid_symbols)} had valid data"
+          f"{f' ({len(unchanged)} unchanged since the last scan)' if unchanged else ''}.")
+    return list(rows.values())
+
+# Cooldowns, skips, the trending list and scan history live in one SQLite
+# file (state_store.STATE_DB); the old JSON files are imported on first use.
+
+_trending_refresh = None
+
+
+def refresh_trending_in_background():
+    """Re-scrape the listings on a daemon thread unless a refresh is already running."""
+    global _trending_refresh
+    if _trending_refresh is not None and _trending_refresh.is_alive():
+        return _trending_refresh
+
+    def refresh():
+        from update_stocks import load_stock_symbols
+        symbols = load_stock_symbols()
+        if symbols:
+            save_cached_trending(symbols)
 
-def load_cached_trending():
-    if not os.path.exists(TRENDING_CACHE_FILE):
-        return None
+    _trending_refresh = threading.Thread(target=refresh, daemon=True)
+    _trending_refresh.start()
+    return _trending_refresh
 
-    with open(TRENDING_CACHE_FILE, "r") as f:
-        try:
-            data = json.load(f)
-            timestamp = data.get("timestamp", 0)
-            age_days = (time.time() - timestamp) / (60 * 60 * 24)
 
-            if age_days > TRENDING_CACHE_DAYS:
-                return None  # Too old, need to refresh
-            return data.get("symbols", [])
-        except Exception as e:
-            print(f"Failed to load trending cache: {e}")
-            return None
-        
-def save_cached_trending(symbols):
-    with open(TRENDING_CACHE_FILE, "w") as f:
-        json.dump({
-            "timestamp": time.time(),
-            "symbols": symbols
-        }, f)
-def get_trending_symbols():
-        cached = load_cached_trending()
+def get_trending_symbols(force_refresh=False):
+        cached = None if force_refresh else load_cached_trending()
         if cached:
             print("✅ Using cached trending stocks.")
             return cached
 
+        # Stale-while-revalidate: serve the old list now, refresh behind it
+        stale = None if force_refresh else state_store.load_trending(None)
+        if stale:
+            print("♻️ Using stale trending stocks; refreshing in the background.")
+            refresh_trending_in_background()
+            return stale
+
         print("🔄 Fetching fresh trending stocks...")
+        from update_stocks import load_stock_symbols
         symbols = load_stock_symbols()
         save_cached_trending(symbols)
         return symbols
-def reset_cached_data():
-    # Customize these paths if your JSON files are stored elsewhere
-    cache_files = ['trending_cache.json', 'skipped_symbols.json']
-    
-    for file in cache_files:
-        try:
-            with open(file, 'w') as f:
-                json.dump({}, f)
-            print(f"✅ Reset {file}")
-        except Exception as e:
-            print(f"❌ Failed to reset {file}: {e}")
-
-#logic for 'cooldown' stocks. for day trading.
-COOLDOWN_FILE = "cooldown.json"
 
-def load_cooldown():
-    """
-    Return {symbol: datetime} for every symbol still in the cooldown file.
-    Accepts both 'YYYY-MM-DD' and 'YYYY-MM-DD HH:MM:SS' strings.
-    """
-    if not os.path.exists(COOLDOWN_FILE):
-        return {}
-
-    # Read the raw JSON
-    try:
-        with open(COOLDOWN_FILE, "r") as f:
-            raw = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
-
-    # Parse with either format
-    parsed = {}
-    for symbol, date_str in raw.items():
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
-            try:
-                parsed[symbol] = datetime.strptime(date_str, fmt)
-                break
-            except ValueError:
-                continue  # try the next format
-
-    return parsed
-
-
-def save_cooldown(cooldown_dict):
-    with open(COOLDOWN_FILE, "w") as f:
-        data = {
-            symbol: date.strftime("%Y-%m-%d %H:%M:%S")
-            for symbol, date in cooldown_dict.items()
-        }
-        json.dump(data, f, indent=2)
-
-def update_cooldown(symbol):
-    cooldown = load_cooldown()
-    cooldown[symbol] = datetime.now()
-    save_cooldown(cooldown)
-
-def is_in_cooldown(symbol, cooldown_period_hours=24):
-    cooldown = load_cooldown()
-    if symbol not in cooldown:
-        return False
-    last_sold = cooldown[symbol]
-    return datetime.now() - last_sold < timedelta(hours=cooldown_period_hours)
-
-def filter_cooldown_symbols(symbols):
-    return [s for s in symbols if not is_in_cooldown(s)]
-
-def add_to_cooldown(symbols, days=2):
-    try:
-        with open(COOLDOWN_FILE, "r") as f:
-            cooldown_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        cooldown_data = {}
-
-    expiry_date = (datetime.today() + timedelta(days=days)).strftime("%Y-%m-%d")
-    for symbol in symbols:
-        cooldown_data[symbol] = expiry_date
-
-    with open(COOLDOWN_FILE, "w") as f:
-        json.dump(cooldown_data, f, indent=2)
-
-    print(f"✅ Added {len(symbols)} symbols to cooldown until {expiry_date}")
 
 MAX_STOCKS = 10      
-SKIP_DAYS   = 3         
 
 def main():
     # Prompt user for mode selection
@@ -331,11 +697,9 @@ def main():
             show_recent_only = input("Show only recent crosses? (y/n): ").strip().lower()
         show_recent_only = (show_recent_only == 'y')
         raw_symbols = get_trending_symbols()
-        skipped_dict = load_skipped_symbols()
 
-        # Exclude skipped
-        today_allowed = [s for s in raw_symbols if s not in skipped_dict]
-        today_allowed = filter_cooldown_symbols(today_allowed)
+        # Exclude skipped and cooling-down symbols in one lookup
+        today_allowed = filter_skipped_and_cooldown(raw_symbols)
 
         # Shuffle before slicing
         random.shuffle(today_allowed)
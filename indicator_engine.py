@@ -0,0 +1,422 @@
+import json
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Incremental version of golden_cross.calculate_indicators (+ the 50/200 MAs).
+# Each symbol keeps a small state (running sums, EMA values, ring buffers) so
+# appending N new bars costs O(N) instead of recomputing the whole history.
+INDICATOR_STATE_FILE = "indicator_state.json"
+
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WINDOW = 20
+MA_WINDOWS = (50, 200)
+
+INDICATOR_COLUMNS = ["50_MA", "200_MA", "RSI", "MACD", "Signal_Line", "Upper_Band", "Lower_Band"]
+ENGINE_FRAMES = 256  # symbols whose full indicator history frame() keeps in memory
+
+NAN = float("nan")
+
+
+class RollingWindow:
+    """
+    Ring buffer of the last `size` values with running sum / sum of squares.
+
+    Values are stored relative to the first one seen so the sums stay small,
+    and the sums are rebuilt from the buffer every `size` pushes to stop
+    floating-point drift from accumulating.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = [NAN] * size
+        self.pos = 0
+        self.count = 0        # values pushed so far, capped at size
+        self.nans = size      # NaNs currently in the buffer (empty slots count)
+        self.anchor = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.since_resync = 0
+
+    def push(self, value):
+        old = self.buffer[self.pos]
+        if old == old:
+            shifted = old - self.anchor
+            self.total -= shifted
+            self.total_sq -= shifted * shifted
+        else:
+            self.nans -= 1
+
+        if value == value:
+            if self.anchor is None:
+                self.anchor = value
+            shifted = value - self.anchor
+            self.total += shifted
+            self.total_sq += shifted * shifted
+        else:
+            self.nans += 1
+
+        self.buffer[self.pos] = value
+        self.pos = (self.pos + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+        self.since_resync += 1
+        if self.since_resync >= self.size:
+            self._resync()
+
+    def _resync(self):
+        shifted = [v - self.anchor for v in self.buffer if v == v] if self.anchor is not None else []
+        self.total = math.fsum(shifted)
+        self.total_sq = math.fsum(v * v for v in shifted)
+        self.since_resync = 0
+
+    def full(self):
+        return self.count == self.size and self.nans == 0
+
+    def mean(self):
+        if not self.full():
+            return NAN
+        return self.anchor + self.total / self.size
+
+    def std(self):
+        """Sample standard deviation (ddof=1), like pandas' rolling().std()."""
+        if not self.full() or self.size < 2:
+            return NAN
+        var = (self.total_sq - self.total * self.total / self.size) / (self.size - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in
+                ("size", "buffer", "pos", "count", "nans", "anchor", "total", "total_sq", "since_resync")}
+
+    @classmethod
+    def from_dict(cls, data):
+        window = cls(data["size"])
+        for key, value in data.items():
+            setattr(window, key, value)
+        return window
+
+
+class EMA:
+    """pandas' ewm(span=span, adjust=False).mean(), one value at a time."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+        self.old_weight = 1.0
+
+    def push(self, x):
+        # Ported from pandas' ewm kernel so NaN gaps are weighted the same way
+        if self.value == self.value:
+            self.old_weight *= 1.0 - self.alpha
+            if x == x:
+                if self.value != x:
+                    self.value = (self.old_weight * self.value + self.alpha * x) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        elif x == x:
+            self.value = x
+        return self.value
+
+    def to_dict(self):
+        return {"span": self.span, "value": self.value, "old_weight": self.old_weight}
+
+    @classmethod
+    def from_dict(cls, data):
+        ema = cls(data["span"])
+        ema.value = data["value"]
+        ema.old_weight = data["old_weight"]
+        return ema
+
+
+def batch_indicators(close):
+    """INDICATOR_COLUMNS for a whole close series at once (calculate_indicators plus the MAs)."""
+    import golden_cross  # golden_cross imports this module
+    close = close.astype("float64")
+    df = golden_cross.calculate_indicators(close.to_frame("Close"))
+    for window in MA_WINDOWS:
+        df[f"{window}_MA"] = close.rolling(window).mean()
+    return df[INDICATOR_COLUMNS]
+
+
+def _missing_weekdays(last, first):
+    """Whether a weekday falls strictly between bars `last` and `first` (holidays aren't known)."""
+    return np.busday_count((last + pd.Timedelta(days=1)).date(), first.date()) > 0
+
+
+def _trailing_nans(values):
+    valid = np.flatnonzero(~np.isnan(values))
+    return len(values) - 1 - valid[-1] if len(valid) else 0
+
+
+class IndicatorState:
+    """Everything needed to extend one symbol's indicators by one bar."""
+
+    def __init__(self):
+        self.last_date = None
+        self.prev_close = NAN
+        self.gains = RollingWindow(RSI_WINDOW)
+        self.losses = RollingWindow(RSI_WINDOW)
+        self.ema_fast = EMA(MACD_FAST)
+        self.ema_slow = EMA(MACD_SLOW)
+        self.signal = EMA(MACD_SIGNAL)
+        self.band = RollingWindow(BOLLINGER_WINDOW)
+        self.mas = {window: RollingWindow(window) for window in MA_WINDOWS}
+
+    def push(self, close):
+        """Add one close and return this bar's indicator values."""
+        delta = close - self.prev_close
+        # Like delta.where(delta > 0, 0): the NaN first delta counts as 0
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+        self.prev_close = close
+
+        gain, loss = self.gains.mean(), self.losses.mean()
+        if gain != gain or loss != loss or (gain == 0 and loss == 0):
+            rsi = NAN
+        elif loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + gain / loss))
+
+        macd = self.ema_fast.push(close) - self.ema_slow.push(close)
+        signal = self.signal.push(macd)
+
+        self.band.push(close)
+        band_mean, band_std = self.band.mean(), self.band.std()
+
+        row = {}
+        for window, ma in self.mas.items():
+            ma.push(close)
+            row[f"{window}_MA"] = ma.mean()
+        row.update({
+            "RSI": rsi,
+            "MACD": macd,
+            "Signal_Line": signal,
+            "Upper_Band": band_mean + band_std * 2,
+            "Lower_Band": band_mean - band_std * 2,
+        })
+        return row
+
+    @classmethod
+    def from_history(cls, close):
+        """
+        The state after pushing every value of `close` (a Series), built from
+        vectorised EMAs and the last window's worth of values instead.
+        """
+        state = cls()
+        values = close.to_numpy(dtype=float)
+        if not len(values):
+            return state
+        state.prev_close = float(values[-1])
+        deltas = np.diff(values, prepend=NAN)
+        for delta in deltas[-RSI_WINDOW:]:
+            state.gains.push(delta if delta > 0 else 0.0)
+            state.losses.push(-delta if delta < 0 else 0.0)
+
+        def seed(ema, series):
+            ema.value = float(series.ewm(span=ema.span, adjust=False).mean().iloc[-1])
+            # Bars since the last valid input each discount the old value once more
+            ema.old_weight = (1.0 - ema.alpha) ** _trailing_nans(series.to_numpy(dtype=float))
+
+        close = close.astype("float64")
+        seed(state.ema_fast, close)
+        seed(state.ema_slow, close)
+        macd = close.ewm(span=MACD_FAST, adjust=False).mean() - close.ewm(span=MACD_SLOW, adjust=False).mean()
+        seed(state.signal, macd)
+        for window in [state.band, *state.mas.values()]:
+            for value in values[-window.size:]:
+                window.push(float(value))
+        state.last_date = close.index[-1].strftime("%Y-%m-%d")
+        return state
+
+    def to_dict(self):
+        return {
+            "last_date": self.last_date,
+            "prev_close": self.prev_close,
+            "gains": self.gains.to_dict(),
+            "losses": self.losses.to_dict(),
+            "ema_fast": self.ema_fast.to_dict(),
+            "ema_slow": self.ema_slow.to_dict(),
+            "signal": self.signal.to_dict(),
+            "band": self.band.to_dict(),
+            "mas": {str(window): ma.to_dict() for window, ma in self.mas.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.last_date = data["last_date"]
+        state.prev_close = data["prev_close"]
+        for key in ("gains", "losses", "band"):
+            setattr(state, key, RollingWindow.from_dict(data[key]))
+        for key in ("ema_fast", "ema_slow", "signal"):
+            setattr(state, key, EMA.from_dict(data[key]))
+        state.mas = {int(window): RollingWindow.from_dict(ma) for window, ma in data["mas"].items()}
+        return state
+
+
+class IndicatorEngine:
+    """
+    Per-symbol incremental indicators, persisted to `state_file`.
+
+    update() only processes bars newer than the last one seen for that
+    symbol. Values match calculate_indicators() run over the same history
+    (EMAs depend on where the history starts, so the first update decides).
+    """
+
+    def __init__(self, state_file=INDICATOR_STATE_FILE, max_frames=ENGINE_FRAMES):
+        self.state_file = state_file
+        self.states = {}
+        self.max_frames = max_frames
+        self._frames = {}   # symbol -> (closes, indicator frame) last returned by frame()
+        self._dropped = set()  # reset since load(); not merged back from the file on save()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                raw = json.load(f)
+            self.states = {symbol: IndicatorState.from_dict(data) for symbol, data in raw.items()}
+        except (json.JSONDecodeError, KeyError, OSError) as e:
+            print(f"⚠️ Discarding unreadable indicator state: {e}")
+            self.states = {}
+
+    def save(self):
+        """
+        Write every state atomically. States other processes saved since
+        load() (e.g. other shard workers) are kept unless this engine has
+        its own for that symbol or reset it.
+        """
+        if not self.state_file:
+            return
+        with self._lock:
+            states = {symbol: state.to_dict() for symbol, state in self.states.items()}
+            dropped = set(self._dropped)
+        try:
+            with open(self.state_file, "r") as f:
+                saved = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            saved = {}
+        saved = {symbol: data for symbol, data in saved.items() if symbol not in dropped}
+        saved.update(states)
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp, self.state_file)
+
+    def reset(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._dropped.update(self.states)
+                self.states = {}
+                self._frames = {}
+            else:
+                self._dropped.add(symbol)
+                self.states.pop(symbol, None)
+                self._frames.pop(symbol, None)
+
+    def update(self, symbol, df):
+        """
+        Feed `df` (needs a 'Close' column, date index) and return a DataFrame
+        of indicator values for the bars that were new to the engine.
+        """
+        state = self.states.get(symbol)
+        new_rows = df
+        if state is not None and state.last_date is not None and len(df):
+            last = pd.Timestamp(state.last_date)
+            if df.index[-1] < last:
+                # Older than what the state has already seen: start over
+                state = None
+            elif df.index[0] > last and _missing_weekdays(last, df.index[0]):
+                # Bars between the state's last one and this frame are missing: start over
+                state = None
+            else:
+                # Just the new bars (or a longer window that includes them)
+                new_rows = df[df.index > last]
+        if state is None:
+            state = IndicatorState()
+            new_rows = df
+            self.states[symbol] = state
+
+        closes = new_rows["Close"].to_numpy(dtype=float)
+        rows = [state.push(float(close)) for close in closes]
+        if len(new_rows):
+            state.last_date = new_rows.index[-1].strftime("%Y-%m-%d")
+        return pd.DataFrame(rows, index=new_rows.index, columns=INDICATOR_COLUMNS)
+
+    def frame(self, symbol, df):
+        """
+        Indicator values (INDICATOR_COLUMNS) for every row of `df`, the same
+        as batch_indicators(df["Close"]). When `df` is the history frame()
+        last saw for `symbol` plus newer bars, only those bars are computed;
+        otherwise the whole history is, vectorised, and the state is seeded
+        from it. The returned frame is shared: don't modify it.
+        """
+        close = df["Close"].to_numpy(dtype=float)
+        with self._lock:
+            cached = self._frames.pop(symbol, None)
+            state = self.states.get(symbol)
+            n = 0 if cached is None else len(cached[0])
+            if (state is not None and 0 < n <= len(close) and cached[1].index.equals(df.index[:n])
+                    and np.array_equal(cached[0], close[:n], equal_nan=True)):
+                values = cached[1]
+                if n < len(close):
+                    rows = [state.push(float(value)) for value in close[n:]]
+                    state.last_date = df.index[-1].strftime("%Y-%m-%d")
+                    values = pd.concat([values, pd.DataFrame(rows, index=df.index[n:], columns=INDICATOR_COLUMNS)])
+            else:
+                values = batch_indicators(df["Close"])
+                self.states[symbol] = IndicatorState.from_history(df["Close"])
+            self._frames[symbol] = (close, values)
+            while len(self._frames) > self.max_frames:
+                self._frames.pop(next(iter(self._frames)))
+        return values
+
+    def snapshot(self, symbol):
+        """Latest indicator values for `symbol` without touching any prices."""
+        state = self.states.get(symbol)
+        if state is None:
+            return None
+        gain, loss = state.gains.mean(), state.losses.mean()
+        band_mean, band_std = state.band.mean(), state.band.std()
+        snapshot = {f"{window}_MA": ma.mean() for window, ma in state.mas.items()}
+        snapshot.update({
+            "Date": state.last_date,
+            "Close": state.prev_close,
+            "RSI": 100 - (100 / (1 + gain / loss)) if loss else (100.0 if gain else NAN),
+            "MACD": state.ema_fast.value - state.ema_slow.value,
+            "Signal_Line": state.signal.value,
+            "Upper_Band": band_mean + band_std * 2,
+            "Lower_Band": band_mean - band_std * 2,
+        })
+        return snapshot
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Process-wide engine shared by the scan, the signal index and charts,
+    loaded from INDICATOR_STATE_FILE; save_engine() writes it back.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IndicatorEngine(INDICATOR_STATE_FILE)
+        return _engine
+
+
+def save_engine():
+    """Persist the process-wide engine's states, if this process used it."""
+    if _engine is not None:
+        _engine.save()
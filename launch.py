@@ -1,3 +1,11 @@
 # launch.py
 import os
-os.system("streamlit run main.py")
+import subprocess
+import sys
+
+# Run the Streamlit app with this interpreter (no shell); extra arguments are
+# passed through, e.g. `python launch.py --server.port 8502`.
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+if __name__ == "__main__":
+    sys.exit(subprocess.call([sys.executable, "-m", "streamlit", "run", APP, *sys.argv[1:]]))
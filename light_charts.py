@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+
+# Lightweight charts for long date ranges. Every series is cut down to about
+# the number of points the display can show before anything is drawn:
+# largest-triangle-three-buckets (LTTB) for the price line, min/max per bucket
+# for RSI and the MACD histogram, so peaks and troughs survive. Cross dates are
+# always kept exactly. The result is drawn either as a Vega-Lite spec
+# (interactive, a few tens of KB, rendered by the browser) or by the usual
+# matplotlib chart with far fewer artists.
+DISPLAY_POINTS = 800     # roughly the chart's width in pixels
+PRICE_SERIES = ["Close", "50_MA", "200_MA"]
+MACD_SERIES = ["MACD", "Signal_Line"]
+VEGA_LITE_SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+CHART_WIDTH = 600
+
+
+def _filled(values):
+    """Values with NaNs replaced by the series minimum (so bucketing still works)."""
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if missing.all():
+        return np.zeros_like(values)
+    return np.where(missing, np.nanmin(values), values)
+
+
+def lttb(x, y, n_out):
+    """Indices of the `n_out` points LTTB keeps from (x, y); all of them if there are fewer."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = _filled(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 middle buckets
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, n_buckets):
+    """Index of the lowest and highest value in each of `n_buckets` equal buckets."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((_filled(y), bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.union1d(order[starts], order[ends])
+
+
+def downsample_indices(df, max_points=DISPLAY_POINTS, keep_dates=()):
+    """
+    Sorted row positions to draw from `df`: LTTB on Close, min/max buckets on
+    RSI and the MACD histogram (when present), plus the rows of `keep_dates`.
+    """
+    n = len(df)
+    if n <= max_points:
+        return np.arange(n)
+    days = df.index.values.astype("datetime64[D]").astype(np.int64)
+    # Most of the budget goes to the price line; the extremes of the others ride along
+    buckets = max(max_points // 10, 1)
+    picked = [lttb(days, df["Close"].to_numpy(), max_points - 2 * buckets),
+              minmax_indices(df["Close"].to_numpy(), 1)]
+    if "RSI" in df.columns:
+        picked.append(minmax_indices(df["RSI"].to_numpy(), buckets // 2))
+    if "MACD" in df.columns and "Signal_Line" in df.columns:
+        picked.append(minmax_indices((df["MACD"] - df["Signal_Line"]).to_numpy(), buckets // 2))
+    if len(keep_dates):
+        positions = df.index.get_indexer(list(keep_dates))
+        picked.append(positions[positions >= 0])
+    return np.unique(np.concatenate(picked))
+
+
+def downsample_frame(df, max_points=DISPLAY_POINTS, keep_dates=()):
+    """`df` cut down to the rows downsample_indices() picks (returned as is if already small)."""
+    if len(df) <= max_points:
+        return df
+    return df.iloc[downsample_indices(df, max_points, keep_dates)]
+
+
+def _records(df, columns):
+    rows = []
+    dates = df.index.strftime("%Y-%m-%d")
+    values = {column: df[column].to_numpy(dtype=np.float64) for column in columns if column in df.columns}
+    for i, date in enumerate(dates):
+        row = {"date": date}
+        for column, series in values.items():
+            value = series[i]
+            row[column] = None if np.isnan(value) else float(f"{value:.5g}")
+        rows.append(row)
+    return rows
+
+
+def chart_spec(historical_data, stock_symbol, golden_crosses=(), death_crosses=(), max_points=DISPLAY_POINTS):
+    """
+    Vega-Lite spec (a plain dict; st.vega_lite_chart draws it) with the same
+    three panels as plot_stock_data_with_indicators, downsampled to
+    `max_points` with the cross points kept exact. Drag to pan, scroll to zoom.
+    """
+    import golden_cross  # indicator maths; only needed when the frame lacks them
+
+    df = golden_cross.with_chart_indicators(historical_data, stock_symbol)
+    golden_crosses, death_crosses = list(golden_crosses), list(death_crosses)
+    df = downsample_frame(df, max_points, golden_crosses + death_crosses)
+    price_series = [column for column in PRICE_SERIES if column in df.columns]
+    data = _records(df, price_series + ["RSI"] + MACD_SERIES)
+
+    crosses = [{"date": date.strftime("%Y-%m-%d"), "Close": float(df.loc[date, "Close"]), "kind": kind}
+               for kind, dates in (("Golden Cross", golden_crosses), ("Death Cross", death_crosses))
+               for date in dates if date in df.index]
+    x = {"field": "date", "type": "temporal", "title": None}
+    zoom = [{"name": "zoom", "select": {"type": "interval", "encodings": ["x"]}, "bind": "scales"}]
+
+    def lines(series, title, colors):
+        return {
+            "transform": [{"fold": series, "as": ["series", "value"]}],
+            "mark": {"type": "line", "strokeWidth": 1},
+            "encoding": {
+                "x": x,
+                "y": {"field": "value", "type": "quantitative", "title": title, "scale": {"zero": False}},
+                "color": {"field": "series", "type": "nominal", "title": None,
+                          "scale": {"domain": series, "range": colors}},
+            },
+        }
+
+    price = {
+        "title": "Price and Moving Averages",
+        "width": CHART_WIDTH,
+        "height": 260,
+        "layer": [
+            {**lines(price_series, "Price (USD)", ["blue", "orange", "green"][:len(price_series)]), "params": zoom},
+            {
+                "data": {"values": crosses},
+                "mark": {"type": "point", "filled": True, "size": 70},
+                "encoding": {
+                    "x": x,
+                    "y": {"field": "Close", "type": "quantitative"},
+                    "color": {"field": "kind", "type": "nominal", "title": None,
+                              "scale": {"domain": ["Golden Cross", "Death Cross"], "range": ["green", "red"]}},
+                    "tooltip": [{"field": "kind"}, {"field": "date", "type": "temporal"}, {"field": "Close"}],
+                },
+            },
+        ],
+    }
+    rsi = {
+        "title": "Relative Strength Index (RSI)",
+        "width": CHART_WIDTH,
+        "height": 120,
+        "layer": [
+            {"mark": {"type": "line", "color": "purple", "strokeWidth": 1},
+             "encoding": {"x": x, "y": {"field": "RSI", "type": "quantitative", "scale": {"domain": [0, 100]}}}},
+            {"data": {"values": [{"level": 70, "color": "red"}, {"level": 30, "color": "green"}]},
+             "mark": {"type": "rule", "strokeDash": [4, 4]},
+             "encoding": {"y": {"field": "level", "type": "quantitative"},
+                          "color": {"field": "color", "type": "nominal", "scale": None}}},
+        ],
+    }
+    macd = {
+        "title": "MACD (Moving Average Convergence Divergence)",
+        "width": CHART_WIDTH,
+        "height": 120,
+        "layer": [
+            {"transform": [{"calculate": "datum.MACD - datum.Signal_Line", "as": "Histogram"}],
+             "mark": {"type": "area", "color": "gray", "opacity": 0.5},
+             "encoding": {"x": x, "y": {"field": "Histogram", "type": "quantitative", "title": "MACD Value"}}},
+            lines(MACD_SERIES, "MACD Value", ["blue", "red"]),
+        ],
+    }
+    return {
+        "$schema": VEGA_LITE_SCHEMA,
+        "title": f"{stock_symbol} Stock Analysis",
+        "data": {"values": data},
+        "vconcat": [price, rsi, macd],
+        "resolve": {"scale": {"x": "shared", "color": "independent"}},
+    }
+
+
+def spec_size(spec):
+    """Bytes the spec takes as JSON (what the browser receives)."""
+    return len(json.dumps(spec, separators=(",", ":")))
@@ -1,22 +1,20 @@
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timedelta
-from golden_cross import (
-    fetch_historical_data,
-    detect_crossovers,
-    plot_stock_data_with_indicators,
-    get_trending_symbols,
-    load_skipped_symbols,
-    filter_cooldown_symbols,
-    reset_cached_data
-)
+from golden_cross import get_trending_symbols
+from scanner_state import filter_skipped_and_cooldown, reset_cached_data
+from scan_cache import scan_cached, prefetch, clear_scan_cache
+from chart_renderer import get_renderer
+from signal_index import since, recent_signals
+from light_charts import chart_spec
+import metrics
 
 st.set_page_config(page_title="Golden Cross Scanner", layout="centered")
 st.title("📈 Golden Cross Stock Scanner")
 st.markdown("_Scan for recent 50/200 SMA Golden Cross signals._")
 
 # --- Mode Selection ---
-mode = st.radio("Choose a mode:", ["🔎 Specific Stock", "🔥 Trending Stocks"])
+mode = st.radio("Choose a mode:", ["🔎 Specific Stock", "🔥 Trending Stocks", "🧪 Screen"])
 
 # --- Shared Date Settings ---
 with st.expander("⚙️ Scan Settings", expanded=True):
@@ -27,6 +25,13 @@ with st.expander("⚙️ Scan Settings", expanded=True):
         end_date = st.date_input("End Date", datetime.today())
 
     show_recent_only = st.checkbox("Show only recent crosses (last 30 days)", value=True)
+    light_charts = st.checkbox("Lightweight interactive charts (downsampled)", value=True)
+    show_metrics = st.checkbox("Show scan metrics", value=False)
+
+if show_metrics:
+    metrics.enable()
+else:
+    metrics.disable()
 
 start_str = start_date.strftime("%Y-%m-%d")
 end_str = end_date.strftime("%Y-%m-%d")
@@ -36,12 +41,13 @@ if mode == "🔎 Specific Stock":
     symbol = st.text_input("Enter stock symbol", value="AAPL")
     if st.button("🔍 Check Symbol") and symbol:
         with st.spinner("Fetching and analyzing data..."):
-            data = fetch_historical_data(symbol.upper(), start_str, end_str)
+            # Memoised, so toggling "recent only" afterwards doesn't refetch
+            result = next(scan_cached([symbol.upper()], start_str, end_str))
+            data = result["data"] if result["error"] is None else None
             if data is not None:
-                golden_crosses, _ = detect_crossovers(data)
+                golden_crosses = result["golden_crosses"]
                 if show_recent_only:
-                    cutoff = datetime.today() - timedelta(days=30)
-                    golden_crosses = [d for d in golden_crosses if d >= cutoff]
+                    golden_crosses = since(golden_crosses, datetime.today() - timedelta(days=30))
 
                 if golden_crosses and isinstance(golden_crosses[-1], pd.Timestamp):
                     last_cross = golden_crosses[-1]
@@ -49,8 +55,10 @@ if mode == "🔎 Specific Stock":
                 else:
                     st.info("📉 No recent golden cross found.")
 
-                fig = plot_stock_data_with_indicators(data, symbol.upper(), golden_crosses)
-                st.pyplot(fig)
+                if light_charts:
+                    st.vega_lite_chart(chart_spec(data, symbol.upper(), golden_crosses), use_container_width=True)
+                else:
+                    st.image(get_renderer().render(data, symbol.upper(), golden_crosses))
             else:
                 st.error("❌ Failed to fetch data for that symbol.")
 
@@ -60,18 +68,18 @@ elif mode == "🔥 Trending Stocks":
 
     with col1:
         if st.button("📈 Get Trending Symbols"):
-            get_trending_symbols()
+            get_trending_symbols(force_refresh=True)
             st.success("Trending symbols updated.")
 
     with col2:
         if st.button("🧹 Reset Cache"):
             reset_cached_data()
+            clear_scan_cache()
             st.success("Trending cache and skipped symbols reset.")
 
     if st.button("▶️ Start Scanning Trending Stocks"):
         raw_symbols = get_trending_symbols()
-        skipped = load_skipped_symbols()
-        allowed_symbols = filter_cooldown_symbols([s for s in raw_symbols if s not in skipped])
+        allowed_symbols = filter_skipped_and_cooldown(raw_symbols)
 
         if allowed_symbols:
             st.session_state["symbol_batches"] = [allowed_symbols[i:i+10] for i in range(0, len(allowed_symbols), 10)]
@@ -96,35 +104,85 @@ elif mode == "🔥 Trending Stocks":
         with st.spinner("Analyzing symbols..."):
             cols = st.columns(2)  # Try 3 for smaller components
 
-            for idx, symbol in enumerate(batch):
+            charts = []
+
+            # Cached symbols come back at once, the rest stream in as they finish
+            for idx, result in enumerate(scan_cached(batch, start_str, end_str)):
+                symbol = result["symbol"]
                 with cols[idx % 2]:  # Cycle through the columns
                     st.markdown(f"### 🔍 {symbol}")
-                    data = fetch_historical_data(symbol, start_str, end_str)
+                    data = result["data"]
                     if data is None or data.empty:
                         st.info("📭 No data.")
                     else:
-                        golden_crosses = detect_crossovers(data)
-                        flat = []
-                        for d in golden_crosses:
-                            if isinstance(d, list):
-                                flat.extend(d)
-                            else:
-                                flat.append(d)
-                        golden_crosses = flat
+                        golden_crosses = result["golden_crosses"]
 
                         if show_recent_only:
-                            cutoff = datetime.today() - timedelta(days=30)
-                            golden_crosses = [d for d in golden_crosses if d >= cutoff]
-                        if show_recent_only:
-                            cutoff = datetime.today() - timedelta(days=30)
-                            golden_crosses = [d for d in golden_crosses if d >= cutoff]
+                            golden_crosses = since(golden_crosses, datetime.today() - timedelta(days=30))
 
                         if golden_crosses and isinstance(golden_crosses[-1], pd.Timestamp):
                             last_cross = golden_crosses[-1]
                             st.success(f"🌟 Golden Cross on {last_cross.strftime('%Y-%m-%d')}")
-                            fig = plot_stock_data_with_indicators(data, symbol, [last_cross])
-                            st.pyplot(fig)
+                            if light_charts:
+                                # A few hundred points as a Vega-Lite spec; the browser draws it
+                                st.vega_lite_chart(chart_spec(data, symbol, [last_cross]), use_container_width=True)
+                            else:
+                                # Filled in below once the worker pool has drawn it
+                                charts.append((st.empty(), get_renderer().submit(data, symbol, [last_cross])))
                         else:
                             st.info("📉 No recent golden cross.")
+
+            for slot, chart in charts:
+                slot.image(chart.result())
+
+        # Warm the next batch while the user reads this one
+        next_batch = st.session_state["current_batch"] + 1
+        if next_batch < len(st.session_state["symbol_batches"]):
+            prefetch(st.session_state["symbol_batches"][next_batch], start_str, end_str)
     else:
         st.info("📉 No batch loaded or scanning not started.")
+
+    # Answered from the signal index (every symbol scanned so far), no fetching
+    with st.expander("📇 Recent golden crosses across all scanned symbols"):
+        index_days = st.number_input("Days back", min_value=1, max_value=365, value=30)
+        recent = recent_signals(int(index_days))
+        if recent:
+            st.dataframe(pd.DataFrame(recent)[["date", "symbol", "value"]].rename(columns={"value": "close"}))
+        else:
+            st.caption("No golden crosses indexed in that window yet.")
+
+# --- Mode 3: Screen ---
+elif mode == "🧪 Screen":
+    from screen import ScreenError, compile_screen, screen_frame, screen_symbols
+
+    expression = st.text_input("Screen", value="golden_cross(50,200) within 10d and rsi(14) < 40")
+    st.caption("Terms: close, volume, sma(n), ema(n), rsi(n), macd, macd_signal, macd_hist, upper_band, "
+               "middle_band, lower_band, golden_cross(s,l), death_cross(s,l), crosses_above(a,b), "
+               "crosses_below(a,b); combine with and/or/not, compare with < > etc., and `... within 10d`.")
+    universe = st.text_area("Symbols (blank = trending list)", value="")
+    matches_only = st.checkbox("Only show matches", value=True)
+    if st.button("🧪 Run Screen") and expression:
+        try:
+            compiled = compile_screen(expression)
+        except ScreenError as e:
+            st.error(f"❌ {e}")
+        else:
+            symbols = universe.replace(",", " ").upper().split() or filter_skipped_and_cooldown(get_trending_symbols())
+            with st.spinner(f"Screening {len(symbols)} symbols..."):
+                rows = screen_symbols(compiled, symbols, start_str, end_str, matches_only=matches_only)
+            st.success(f"{sum(row['match'] for row in rows)} of {len(symbols)} symbols match.")
+            if rows:
+                st.dataframe(screen_frame(rows))
+
+# --- Optional metrics panel ---
+if show_metrics:
+    with st.expander("⏱️ Scan metrics", expanded=True):
+        stats = metrics.summary()
+        if stats["stages"]:
+            st.dataframe(pd.DataFrame(stats["stages"]).T)
+        else:
+            st.caption("No timings recorded yet.")
+        if stats["counters"] or stats["rates"]:
+            st.json({**stats["counters"], **stats["rates"]})
+        if st.button("Reset metrics"):
+            metrics.reset()
@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight per-stage timing and counters for scans. Off by default; turn
+# on with SCANNER_METRICS=1 or enable(). When off, timed() hands back a shared
+# no-op context and incr() returns immediately, so the cost is one bool check.
+ENABLED = os.environ.get("SCANNER_METRICS") == "1"
+METRICS_JSONL_FILE = os.environ.get("SCANNER_METRICS_JSONL", "scan_metrics.jsonl")
+METRICS_PROM_FILE = os.environ.get("SCANNER_METRICS_PROM", "scan_metrics.prom")
+MAX_EVENTS = 100_000  # oldest timing events are dropped beyond this
+
+_lock = threading.Lock()
+_events = []        # {"stage", "symbol", "seconds", "ts", ...}
+_counters = {}      # name -> number
+_stage_totals = {}  # stage -> [count, total_seconds, max_seconds]
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _stage_totals.clear()
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def record(stage, seconds, symbol=None, **fields):
+    """Record one finished stage duration (e.g. measured in a worker process)."""
+    if not ENABLED:
+        return
+    event = {"stage": stage, "symbol": symbol, "seconds": seconds, "ts": time.time(), **fields}
+    with _lock:
+        _events.append(event)
+        if len(_events) > MAX_EVENTS:
+            del _events[:len(_events) - MAX_EVENTS]
+        totals = _stage_totals.setdefault(stage, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+
+@contextmanager
+def _timer(stage, symbol, fields):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, symbol, **fields)
+
+
+def timed(stage, symbol=None, **fields):
+    """`with metrics.timed("fetch", symbol):` -- a no-op when metrics are off."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _timer(stage, symbol, fields)
+
+
+def incr(name, value=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def summary():
+    """Per-stage count/total/mean/max, counters and derived cache hit rates."""
+    with _lock:
+        stages = {
+            stage: {"count": count, "total_s": round(total, 6), "mean_s": round(total / count, 6),
+                    "max_s": round(longest, 6)}
+            for stage, (count, total, longest) in _stage_totals.items()
+        }
+        counters = dict(_counters)
+
+    rates = {}
+    prefixes = {name.rsplit("_", 1)[0] for name in counters if name.endswith(("_hits", "_misses"))}
+    for prefix in prefixes:
+        hits = counters.get(f"{prefix}_hits", 0)
+        total = hits + counters.get(f"{prefix}_misses", 0)
+        if total:
+            rates[f"{prefix}_hit_rate"] = round(hits / total, 4)
+    return {"stages": stages, "counters": counters, "rates": rates}
+
+
+def events():
+    with _lock:
+        return list(_events)
+
+
+def export_jsonl(path=None):
+    """
+    Append the timing events recorded since the last export, plus a summary
+    line, to a JSON-lines file. Exported events are dropped from memory.
+    """
+    path = path or METRICS_JSONL_FILE
+    with _lock:
+        pending = list(_events)
+        _events.clear()
+    with open(path, "a") as f:
+        for event in pending:
+            f.write(json.dumps(event, default=str) + "\n")
+        f.write(json.dumps({"summary": summary(), "ts": time.time()}) + "\n")
+    return path
+
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format."""
+    data = summary()
+    lines = [
+        "# HELP scanner_stage_seconds_total Time spent per scan stage.",
+        "# TYPE scanner_stage_seconds_total counter",
+    ]
+    for stage, stats in data["stages"].items():
+        lines.append(f'scanner_stage_seconds_total{{stage="{stage}"}} {stats["total_s"]}')
+    lines += ["# HELP scanner_stage_calls_total Calls per scan stage.", "# TYPE scanner_stage_calls_total counter"]
+    for stage, stats in data["stages"].items():
+        lines.append(f'scanner_stage_calls_total{{stage="{stage}"}} {stats["count"]}')
+    lines += ["# HELP scanner_stage_max_seconds Slowest single call per stage.", "# TYPE scanner_stage_max_seconds gauge"]
+    for stage, stats in data["stages"].items():
+        lines.append(f'scanner_stage_max_seconds{{stage="{stage}"}} {stats["max_s"]}')
+    for name, value in data["counters"].items():
+        lines += [f"# TYPE scanner_{name}_total counter", f"scanner_{name}_total {value}"]
+    for name, value in data["rates"].items():
+        lines += [f"# TYPE scanner_{name} gauge", f"scanner_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Write prometheus_text() atomically (e.g. for node_exporter's textfile collector)."""
+    path = path or METRICS_PROM_FILE
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+    return path
+
+
+def flush():
+    """Write both export files if metrics are on; called at the end of a scan."""
+    if not ENABLED:
+        return
+    export_jsonl()
+    write_prometheus()
+
+
+def serve_prometheus(port=9108, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread; returns the server (call shutdown() to stop)."""
+    # http.server is slow to import and only needed here
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+
+# Cross-sectional mode: every symbol's closes in one dates x symbols array and
+# all indicators computed for every column at once. Each column is first
+# "compacted" so its own bars sit contiguously at the top (NaN below), which
+# makes listing dates and missing bars behave exactly like a per-symbol frame.
+
+MA_WINDOWS = (50, 200)
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WINDOW = 20
+STORE_BLOCK = 500  # symbols per pass in scan_store (bounds the float64 working set)
+
+
+class PricePanel:
+    """Closes (and optionally volumes) for a universe on a shared date axis."""
+
+    def __init__(self, dates, symbols, close, volume=None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = volume
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Align {symbol: DataFrame with 'Close'} on the union of their dates."""
+        frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return cls([], [], np.empty((0, 0)))
+        closes = pd.DataFrame({symbol: df["Close"] for symbol, df in frames.items()}).sort_index()
+        volume = None
+        if all("Volume" in df.columns for df in frames.values()):
+            volume = pd.DataFrame({symbol: df["Volume"] for symbol, df in frames.items()}).reindex(closes.index)
+            volume = volume.to_numpy(dtype=np.float64)
+        return cls(closes.index, closes.columns, closes.to_numpy(dtype=np.float64), volume)
+
+    def column(self, symbol):
+        return self._columns[symbol]
+
+    def symbol_frame(self, symbol, arrays=None):
+        """One symbol's own bars (no NaN padding) with any computed arrays as columns."""
+        col = self.column(symbol)
+        rows = ~np.isnan(self.close[:, col])
+        data = {"Close": self.close[rows, col]}
+        if self.volume is not None:
+            data["Volume"] = self.volume[rows, col]
+        for name, values in (arrays or {}).items():
+            if values.ndim == 2:
+                data[name] = values[rows, col]
+        return pd.DataFrame(data, index=self.dates[rows])
+
+
+def compact(values):
+    """
+    Move each column's non-NaN values to the top, keeping their order.
+    Returns (compacted, order, counts); expand() undoes it.
+    """
+    valid = ~np.isnan(values)
+    order = np.argsort(~valid, axis=0, kind="stable")
+    return np.take_along_axis(values, order, axis=0), order, valid.sum(axis=0)
+
+
+def expand(compacted, order, counts):
+    """Scatter compacted results back onto the shared date grid."""
+    rows = np.arange(compacted.shape[0])[:, None]
+    compacted = np.where(rows < counts, compacted, np.nan)
+    out = np.full(compacted.shape, np.nan, dtype=compacted.dtype)
+    np.put_along_axis(out, order, compacted, axis=0)
+    return out
+
+
+def _window_sum(values, window):
+    """Trailing `window`-row sums down each column; NaN until the window is full."""
+    csum = np.cumsum(np.nan_to_num(values), axis=0)
+    out = np.full(values.shape, np.nan)
+    if window <= values.shape[0]:
+        out[window - 1:] = csum[window - 1:]
+        out[window:] -= csum[:-window]
+    return out
+
+
+def panel_sma(close, window):
+    # Centre each column first so long running sums keep their precision
+    offset = np.nanmean(close, axis=0) if close.size else 0.0
+    offset = np.nan_to_num(offset)
+    return _window_sum(close - offset, window) / window + offset
+
+
+def panel_std(close, window):
+    """Rolling sample standard deviation (ddof=1) down each column."""
+    offset = np.nan_to_num(np.nanmean(close, axis=0)) if close.size else 0.0
+    shifted = close - offset
+    total = _window_sum(shifted, window)
+    total_sq = _window_sum(shifted * shifted, window)
+    var = (total_sq - total * total / window) / (window - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def panel_ema(values, span):
+    """ewm(span, adjust=False).mean() down each column, all columns per step."""
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(values)
+    ema = values[0].copy()
+    out[0] = ema
+    for t in range(1, values.shape[0]):
+        x = values[t]
+        ema = np.where(np.isnan(ema), x, np.where(np.isnan(x), ema, ema + alpha * (x - ema)))
+        out[t] = ema
+    return out
+
+
+def panel_rsi(close, window=RSI_WINDOW):
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    # NaN deltas count as 0, like delta.where(delta > 0, 0)
+    gain = _window_sum(np.where(delta > 0, delta, 0.0), window) / window
+    loss = _window_sum(np.where(delta < 0, -delta, 0.0), window) / window
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def cross_flags(sma_short, sma_long):
+    """Boolean (golden, death) arrays: True on the bar the short SMA crosses."""
+    spread = sma_short - sma_long
+    golden = np.zeros(spread.shape, dtype=bool)
+    death = np.zeros(spread.shape, dtype=bool)
+    prev, curr = spread[:-1], spread[1:]
+    golden[1:] = (prev < 0) & (curr >= 0)
+    death[1:] = (prev > 0) & (curr <= 0)
+    return golden, death
+
+
+def compute_compacted(close, counts, ma_windows=MA_WINDOWS, cross_pairs=((50, 200),)):
+    """
+    compute_panel() on closes already in compact() layout (`counts` bars per
+    column). Results stay in that layout; rows past a column's count are
+    meaningless and its cross flags there are False.
+    """
+    n_rows = close.shape[0]
+    own_bar = np.arange(n_rows)[:, None] < counts
+
+    windows = set(ma_windows) | {w for pair in cross_pairs for w in pair}
+    smas = {window: panel_sma(close, window) for window in windows}
+
+    ema_fast = panel_ema(close, MACD_FAST)
+    ema_slow = panel_ema(close, MACD_SLOW)
+    macd = ema_fast - ema_slow
+    signal = panel_ema(macd, MACD_SIGNAL)
+
+    band_mean = smas[BOLLINGER_WINDOW] if BOLLINGER_WINDOW in smas else panel_sma(close, BOLLINGER_WINDOW)
+    band_std = panel_std(close, BOLLINGER_WINDOW)
+
+    compacted = {f"{window}_MA": smas[window] for window in ma_windows}
+    compacted.update({
+        "RSI": panel_rsi(close),
+        "MACD": macd,
+        "Signal_Line": signal,
+        "Upper_Band": band_mean + band_std * 2,
+        "Lower_Band": band_mean - band_std * 2,
+    })
+    for short, long in cross_pairs:
+        golden, death = cross_flags(smas[short], smas[long])
+        compacted[f"golden_{short}_{long}"] = golden & own_bar
+        compacted[f"death_{short}_{long}"] = death & own_bar
+    return compacted
+
+
+def compute_panel(panel, ma_windows=MA_WINDOWS, cross_pairs=((50, 200),)):
+    """
+    SMA/EMA/RSI/MACD/Bollinger and crossover flags for every symbol in one
+    vectorised pass. Returns {name: dates x symbols array}; cross flags are
+    named 'golden_<short>_<long>' / 'death_<short>_<long>'.
+    """
+    close, order, counts = compact(panel.close)
+    return _expand_results(compute_compacted(close, counts, ma_windows, cross_pairs), order, counts)
+
+
+def _expand_results(compacted, order, counts):
+    results = {}
+    for name, values in compacted.items():
+        if values.dtype == bool:
+            results[name] = expand(values, order, counts) == 1
+        else:
+            results[name] = expand(values, order, counts)
+    return results
+
+
+def panel_crossovers(panel, results, short=50, long=200):
+    """{symbol: (golden_cross_dates, death_cross_dates)} from compute_panel flags."""
+    golden = results[f"golden_{short}_{long}"]
+    death = results[f"death_{short}_{long}"]
+    return {
+        symbol: (list(panel.dates[golden[:, col]]), list(panel.dates[death[:, col]]))
+        for col, symbol in enumerate(panel.symbols)
+    }
+
+
+def _block_events(close, counts, results, golden, death, days):
+    import signal_index  # only scans that index signals need it
+    return signal_index.block_events(days, counts, close, results, golden, death)
+
+
+def scan_panel(frames, short=50, long=200, with_events=False):
+    """
+    Yield scan_pipeline-style result dicts for {symbol: DataFrame or None},
+    computed with one panel pass instead of per-symbol frames. With
+    `with_events` each result also has the symbol's signal_index "events"
+    and indicator "snapshot", taken from the same arrays.
+    """
+    panel = PricePanel.from_frames(frames)
+    crosses, indicators, indexed = {}, {}, {}
+    if panel.symbols:
+        close, order, counts = compact(panel.close)
+        compacted = compute_compacted(close, counts, cross_pairs=((short, long),))
+        results = _expand_results(compacted, order, counts)
+        crosses = panel_crossovers(panel, results, short, long)
+        indicators = {name: values for name, values in results.items() if values.dtype != bool}
+        if with_events:
+            days = [panel.dates.values[order[:count, col]].astype("datetime64[D]") for col, count in enumerate(counts)]
+            indexed = dict(zip(panel.symbols, _block_events(
+                close, counts, compacted, compacted[f"golden_{short}_{long}"], compacted[f"death_{short}_{long}"], days)))
+
+    for symbol, df in frames.items():
+        if symbol not in crosses:
+            yield {"symbol": symbol, "data": None, "golden_crosses": [], "death_crosses": [],
+                   "error": "missing or invalid data"}
+            continue
+        data = df.assign(**panel.symbol_frame(symbol, indicators).drop(columns=["Close", "Volume"], errors="ignore"))
+        golden, death = crosses[symbol]
+        result = {"symbol": symbol, "data": data, "golden_crosses": golden, "death_crosses": death, "error": None}
+        if symbol in indexed:
+            result["events"], result["snapshot"] = indexed[symbol]
+        yield result
+
+
+def scan_store(store, symbols=None, short=50, long=200, block=STORE_BLOCK, with_events=False):
+    """
+    scan_panel() for a price_store.PriceStore: crossovers only, `block`
+    symbols at a time, upcast to float64 just for the pass. Each result's
+    `data` is the symbol's compact frame; indicators are left to whoever
+    needs them (e.g. the chart renderer computes its own). `with_events`
+    computes the block's indicators just long enough to attach each
+    symbol's signal "events" and "snapshot".
+    """
+    symbols = store.symbols if symbols is None else list(symbols)
+    for first in range(0, len(symbols), block):
+        names = symbols[first:first + block]
+        present = [symbol for symbol in names if symbol in store]
+        golden = death = None
+        indexed = {}
+        if present:
+            # The store's slices are already in compact() layout
+            close, counts = store.matrix(present)
+            own_bar = np.arange(close.shape[0])[:, None] < counts
+            if with_events:
+                results = compute_compacted(close, counts, cross_pairs=((short, long),))
+                golden, death = results[f"golden_{short}_{long}"], results[f"death_{short}_{long}"]
+                days = [store.days(symbol).astype("datetime64[D]") for symbol in present]
+                indexed = dict(zip(present, _block_events(close, counts, results, golden, death, days)))
+            else:
+                golden, death = cross_flags(panel_sma(close, short), panel_sma(close, long))
+                golden &= own_bar
+                death &= own_bar
+            columns = {symbol: col for col, symbol in enumerate(present)}
+
+        for symbol in names:
+            if symbol not in store:
+                yield {"symbol": symbol, "data": None, "golden_crosses": [], "death_crosses": [],
+                       "error": "missing or invalid data"}
+                continue
+            col, days = columns[symbol], store.days(symbol)
+            rows = slice(0, len(days))
+            result = {
+                "symbol": symbol,
+                "data": store.frame(symbol),
+                "golden_crosses": list(pd.DatetimeIndex(days[golden[rows, col]])),
+                "death_crosses": list(pd.DatetimeIndex(days[death[rows, col]])),
+                "error": None,
+            }
+            if symbol in indexed:
+                result["events"], result["snapshot"] = indexed[symbol]
+            yield result
@@ -0,0 +1,214 @@
+import contextlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import importlib.util
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# One columnar file per symbol plus a small JSON index of the date range each
+# file is known to cover. Ranges are [start, end) like yf.download's.
+PRICE_CACHE_DIR = "price_cache"
+COVERAGE_FILE = os.path.join(PRICE_CACHE_DIR, "coverage.json")
+
+# pandas needs pyarrow for Parquet. Checked without importing either, so
+# clear_price_cache() stays cheap for the quick state commands.
+PRICE_FILE_EXT = ".parquet" if importlib.util.find_spec("pyarrow") else ".pkl"
+
+# Concurrent fetches (scan_pipeline) and processes (shard_scan run) share the one coverage index
+_coverage_lock = threading.Lock()
+
+
+def _day(value):
+    import pandas as pd  # imported on use so clear_price_cache() stays light
+    return pd.Timestamp(value).normalize().tz_localize(None)
+
+
+def _price_path(symbol):
+    safe = symbol.replace("/", "_").replace("^", "_")
+    return os.path.join(PRICE_CACHE_DIR, f"{safe}{PRICE_FILE_EXT}")
+
+
+def load_coverage():
+    """Return {symbol: (start, end)} as Timestamps for everything on disk."""
+    if not os.path.exists(COVERAGE_FILE):
+        return {}
+    try:
+        with open(COVERAGE_FILE, "r") as f:
+            raw = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    return {symbol: (_day(rng[0]), _day(rng[1])) for symbol, rng in raw.items()}
+
+
+def save_coverage(coverage):
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    data = {
+        symbol: [start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")]
+        for symbol, (start, end) in coverage.items()
+    }
+    tmp = f"{COVERAGE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, COVERAGE_FILE)
+
+
+@contextlib.contextmanager
+def _coverage_locked():
+    """Hold the coverage index for a read-modify-write, against other threads and processes."""
+    with _coverage_lock:
+        os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+        with open(COVERAGE_FILE + ".lock", "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_prices(symbol):
+    path = _price_path(symbol)
+    if not os.path.exists(path):
+        return None
+    import pandas as pd
+    try:
+        if PRICE_FILE_EXT == ".parquet":
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def write_prices(symbol, df):
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    path = _price_path(symbol)
+    tmp = path + ".tmp"
+    if PRICE_FILE_EXT == ".parquet":
+        df.to_parquet(tmp)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def missing_ranges(covered, start, end):
+    """
+    Return the [start, end) pieces of the request not inside `covered`.
+    Coverage is always one contiguous range, so at most a head and a tail.
+    Each gap runs up to (or on from) the covered range even when the request
+    doesn't reach it, so the merged coverage never spans an unfetched hole.
+    """
+    if covered is None:
+        return [(start, end)]
+    cov_start, cov_end = covered
+    gaps = []
+    if start < cov_start:
+        gaps.append((start, cov_start))
+    if end > cov_end:
+        gaps.append((cov_end, end))
+    return [(s, e) for s, e in gaps if s < e]
+
+
+def _merge(old, new):
+    if old is None or old.empty:
+        return new
+    if new is None or new.empty:
+        return old
+    import pandas as pd
+    # Freshly fetched bars win (e.g. today's bar finalised after the close)
+    merged = pd.concat([old, new])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def load_prices(symbols, start, end, fetch_frames):
+    """
+    Return {symbol: DataFrame or None} for [start, end), fetching only the
+    head/tail each symbol's cache doesn't cover yet.
+
+    `fetch_frames(symbols, start, end)` must return {symbol: DataFrame or None};
+    symbols sharing the same gap are requested together in one call. A
+    symbol left out of its result counts as a failed fetch: its gap stays
+    uncovered and only cached bars are served for it.
+    """
+    start, end = _day(start), _day(end)
+    # Never mark today or later as covered, so a partial bar is refetched
+    today = _day(datetime.now())
+    coverage = load_coverage()
+
+    # Group symbols by identical gaps so a daily refresh is one request
+    wanted = {}
+    for symbol in symbols:
+        gaps = missing_ranges(coverage.get(symbol), start, end)
+        metrics.incr("price_cache_misses" if gaps else "price_cache_hits")
+        for gap in gaps:
+            wanted.setdefault(gap, []).append(symbol)
+
+    fetched = {}
+    for (gap_start, gap_end), group in wanted.items():
+        try:
+            frames = fetch_frames(group, gap_start.strftime("%Y-%m-%d"), gap_end.strftime("%Y-%m-%d"))
+        except Exception as e:
+            print(f"⚠️ Fetch failed for {group}, serving cached data only: {e}")
+            continue
+        for symbol in group:
+            if symbol not in frames:
+                # Fetch failed (throttled, timed out); leave the gap to retry
+                continue
+            df = frames[symbol]
+            if df is None and symbol not in coverage:
+                # Unknown symbol with no data; don't cache, let it be retried
+                continue
+            # For a known symbol an empty gap is real (holiday, pre-listing)
+            fetched.setdefault(symbol, []).append((gap_start, gap_end, df))
+
+    results = {}
+    changed = {}
+    for symbol in symbols:
+        df = read_prices(symbol)
+        pieces = fetched.get(symbol, [])
+        if pieces:
+            for gap_start, gap_end, new in pieces:
+                df = _merge(df, new)
+                cov_start, cov_end = coverage.get(symbol, (gap_start, gap_start))
+                coverage[symbol] = (min(cov_start, gap_start), max(cov_end, min(gap_end, today)))
+            if df is not None:
+                write_prices(symbol, df)
+            changed[symbol] = coverage[symbol]
+
+        if df is None or df.empty:
+            results[symbol] = None
+            continue
+        window = df[(df.index >= start) & (df.index < end)]
+        results[symbol] = window.copy() if not window.empty else None
+
+    if changed:
+        # Re-read so entries written by other threads or processes meanwhile aren't lost
+        with _coverage_locked():
+            latest = load_coverage()
+            latest.update(changed)
+            save_coverage(latest)
+    return results
+
+
+def clear_price_cache():
+    if not os.path.isdir(PRICE_CACHE_DIR):
+        return
+    for name in os.listdir(PRICE_CACHE_DIR):
+        os.remove(os.path.join(PRICE_CACHE_DIR, name))
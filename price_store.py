@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# Memory-lean price storage for big universes. A full yfinance frame is six
+# float64 columns plus whatever indicators get attached; crossover scans only
+# need closes. Compact mode keeps just the columns a stage asks for, narrows
+# them (float32 prices, int32 volume and day numbers) and packs every symbol
+# into a few contiguous arrays. Derived columns are never stored: SMAs,
+# RSI, MACD etc. are recomputed (in float64) when something needs them.
+
+PRICE_DTYPE = np.float32
+SCAN_COLUMNS = ("Close",)              # all a crossover scan reads
+PANEL_COLUMNS = ("Close", "Volume")
+STORE_CHUNK = 500                      # symbols fetched per step into a store
+
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def _narrow(column, values):
+    """float32 for prices; int32 for volume when every value fits, else int64."""
+    if column != "Volume":
+        return np.ascontiguousarray(values, dtype=PRICE_DTYPE)
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    dtype = np.int32 if values.size == 0 or np.abs(values).max() <= _INT32_MAX else np.int64
+    return values.astype(dtype)
+
+
+def compact_frame(df, columns=SCAN_COLUMNS):
+    """`df` cut down to `columns` with narrow dtypes (no derived columns)."""
+    if df is None:
+        return None
+    columns = [column for column in columns if column in df.columns]
+    return pd.DataFrame({column: _narrow(column, df[column].to_numpy()) for column in columns}, index=df.index)
+
+
+def _day_numbers(index):
+    return pd.DatetimeIndex(index).tz_localize(None).values.astype("datetime64[D]").astype(np.int32)
+
+
+class PriceStore:
+    """
+    Many symbols' bars in contiguous arrays: one int32 day-number array,
+    one narrow array per column, and each symbol as a [start, stop) slice
+    of them. Frames are appended with add(); they're packed on first read.
+    """
+
+    def __init__(self, columns=SCAN_COLUMNS):
+        self.columns = tuple(columns)
+        self._slices = {}                   # symbol -> (start, stop)
+        self._days = np.empty(0, dtype=np.int32)
+        self._data = {column: np.empty(0, dtype=PRICE_DTYPE) for column in self.columns}
+        self._pending = []                  # (days, {column: values}) not packed yet
+        self._size = 0
+
+    def add(self, symbol, df):
+        """Append one symbol's bars (ignored if None/empty or already stored)."""
+        if df is None or df.empty or symbol in self._slices or "Close" not in df.columns:
+            return
+        df = df[~df.index.duplicated(keep="last") & df["Close"].notna()].sort_index()
+        if df.empty:
+            return
+        values = {column: _narrow(column, df[column].to_numpy() if column in df.columns
+                                  else np.full(len(df), np.nan)) for column in self.columns}
+        self._pending.append((_day_numbers(df.index), values))
+        self._slices[symbol] = (self._size, self._size + len(df))
+        self._size += len(df)
+
+    def add_frames(self, frames):
+        for symbol, df in frames.items():
+            self.add(symbol, df)
+
+    def _pack(self):
+        if not self._pending:
+            return
+        self._days = np.concatenate([self._days] + [days for days, _ in self._pending])
+        for column in self.columns:
+            # Skip an empty array's dtype, or int32 volume would be promoted
+            parts = [values[column] for _, values in self._pending]
+            if len(self._data[column]):
+                parts.insert(0, self._data[column])
+            self._data[column] = np.concatenate(parts)
+        self._pending = []
+
+    def __contains__(self, symbol):
+        return symbol in self._slices
+
+    def __len__(self):
+        return len(self._slices)
+
+    @property
+    def symbols(self):
+        return list(self._slices)
+
+    def length(self, symbol):
+        start, stop = self._slices[symbol]
+        return stop - start
+
+    def days(self, symbol):
+        """The symbol's bar dates (datetime64[ns], like a price frame's index)."""
+        self._pack()
+        start, stop = self._slices[symbol]
+        return self._days[start:stop].astype("datetime64[D]").astype("datetime64[ns]")
+
+    def values(self, symbol, column="Close"):
+        self._pack()
+        start, stop = self._slices[symbol]
+        return self._data[column][start:stop]
+
+    def frame(self, symbol):
+        """The symbol's stored columns as a (narrow-dtype) DataFrame."""
+        index = pd.DatetimeIndex(self.days(symbol), name="Date")
+        return pd.DataFrame({column: self.values(symbol, column) for column in self.columns}, index=index)
+
+    def matrix(self, symbols, column="Close", dtype=np.float64):
+        """
+        Compacted (max bars x len(symbols)) array: each symbol's own bars from
+        row 0 down, NaN below -- the layout panel.compact() produces.
+        Returns (matrix, counts).
+        """
+        counts = np.array([self.length(symbol) for symbol in symbols], dtype=np.int64)
+        out = np.full((int(counts.max()) if len(counts) else 0, len(symbols)), np.nan, dtype=dtype)
+        for col, symbol in enumerate(symbols):
+            out[:counts[col], col] = self.values(symbol, column)
+        return out, counts
+
+    @property
+    def nbytes(self):
+        self._pack()
+        return self._days.nbytes + sum(values.nbytes for values in self._data.values())
@@ -0,0 +1,230 @@
+import random
+import re
+import threading
+import time
+
+import metrics
+
+# Shared, self-tuning throttle for everything that talks to Yahoo. A token
+# bucket paces requests; its rate creeps up while calls succeed quickly and
+# is cut on 429s, errors and slow responses (AIMD). Retryable failures are
+# retried with exponential backoff and full jitter; "this symbol doesn't
+# exist" errors are not. Too many failures in a row open a circuit breaker
+# that fails calls fast until a cool-down has passed.
+
+INITIAL_RATE = 1 / 1.5     # requests per second (the old fixed 1.5 s pause)
+MIN_RATE = 0.1
+MAX_RATE = 5.0
+BURST = 2                  # requests that may go back to back after an idle spell
+RATE_STEP = 0.05           # additive increase per healthy call
+BACKOFF_FACTOR = 0.5       # multiplicative decrease on a 429 / error
+SLOW_CALL = 10.0           # seconds; slower successful calls count as a mild warning
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0         # first retry waits up to this long, doubling per attempt
+BACKOFF_CAP = 60.0
+BREAKER_THRESHOLD = 5      # consecutive failed calls that open the circuit
+BREAKER_COOLDOWN = 120.0   # seconds the circuit stays open before a trial call
+
+
+class TransientError(Exception):
+    """A failure worth retrying (timeout, connection reset, 5xx)."""
+
+
+class RateLimitedError(TransientError):
+    """The provider said slow down (HTTP 429 or equivalent)."""
+
+    def __init__(self, message="rate limited", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(TransientError):
+    """Calls are being refused because the provider keeps failing."""
+
+
+# Status codes only as whole numbers: yfinance's "possibly delisted" errors
+# quote epoch timestamps like 1735002000, which contain "500"
+_THROTTLE_PATTERN = re.compile(r"too many requests|rate ?limit|\b429\b")
+_TRANSIENT_PATTERN = re.compile(r"timeout|timed out|connection|temporarily|max retries|reset by peer|\b50[0234]\b")
+
+
+def classify_message(message):
+    """'throttle', 'transient' or 'permanent' for an error message."""
+    text = str(message).lower()
+    if _THROTTLE_PATTERN.search(text):
+        return "throttle"
+    if _TRANSIENT_PATTERN.search(text):
+        return "transient"
+    return "permanent"
+
+
+def classify(exc):
+    """'throttle', 'transient' or 'permanent' for an exception."""
+    if isinstance(exc, RateLimitedError):
+        return "throttle"
+    if isinstance(exc, TransientError):
+        return "transient"
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        if status == 429:
+            return "throttle"
+        return "transient" if status >= 500 or status == 408 else "permanent"
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return "transient"
+    try:
+        import requests
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return "transient"
+    except ImportError:
+        pass
+    return classify_message(f"{type(exc).__name__}: {exc}")
+
+
+def is_transient(exc):
+    return classify(exc) != "permanent"
+
+
+def _retry_after(exc):
+    if isinstance(exc, RateLimitedError) and exc.retry_after:
+        return exc.retry_after
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Token bucket + AIMD rate control + retries + circuit breaker, shared across threads."""
+
+    def __init__(self, name, rate=INITIAL_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE, burst=BURST,
+                 max_retries=MAX_RETRIES, breaker_threshold=BREAKER_THRESHOLD, breaker_cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._failures = 0            # consecutive failed calls
+        self._opened_at = None        # circuit open since (monotonic), None when closed
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    # -- pacing -------------------------------------------------------------
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may go out; raises CircuitOpenError while the breaker is open."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._opened_at is not None:
+                    if now - self._opened_at < self.breaker_cooldown or self._trial_running:
+                        raise CircuitOpenError(f"{self.name}: circuit open after {self._failures} failures")
+                    # Half-open: let exactly one trial call through
+                    self._trial_running = True
+                self._refill(now)
+                wait = max(self._paused_until - now, 0.0)
+                if not wait and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                if not wait:
+                    wait = (1 - self._tokens) / self.rate
+            metrics.record("throttle", wait)
+            time.sleep(wait)
+
+    # -- feedback -----------------------------------------------------------
+
+    def record_success(self, latency=0.0):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+            if latency > SLOW_CALL:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+
+    def record_failure(self, kind, retry_after=None):
+        """kind is 'throttle' or 'transient'; permanent errors say nothing about the provider's health."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._failures += 1
+            if self._trial_running or self._failures >= self.breaker_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    # -- calling ------------------------------------------------------------
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential delay for retry number `attempt` (0-based)."""
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run fn under the limiter. Throttling and transient errors are retried
+        up to max_retries times with backoff; permanent errors and
+        CircuitOpenError are raised straight away.
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if kind == "permanent":
+                    self._release_trial()
+                    raise
+                retry_after = _retry_after(e)
+                self.record_failure(kind, retry_after)
+                metrics.incr("rate_limited" if kind == "throttle" else "transient_errors")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                print(f"⏳ {self.name}: {type(e).__name__} ({e}); retry {attempt + 1}/{self.max_retries} "
+                      f"in {delay:.1f}s")
+                metrics.incr("retries")
+                with metrics.timed("backoff"):
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            self.record_success(time.monotonic() - started)
+            return result
+
+    def state(self):
+        with self._lock:
+            return {"name": self.name, "rate": round(self.rate, 4), "tokens": round(self._tokens, 3),
+                    "consecutive_failures": self._failures, "circuit_open": self._opened_at is not None}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, **settings):
+    """The process-wide limiter for `name` (e.g. "yahoo", "listings"), created on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = AdaptiveRateLimiter(name, **settings)
+        return limiter
@@ -0,0 +1,348 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import chart_renderer
+import signal_index
+import state_store
+
+# Read-only HTTP/JSON API over the results scans already stored: crossover
+# results, indexed signals, indicator snapshots and rendered charts. Nothing
+# is fetched or computed per request; each response body is built once from
+# the state DB, gzipped once, and served from memory with an ETag until a scan
+# writes to the DB (SQLite's data_version tells us). Charts are
+# content-addressed files, so their names double as ETags.
+#
+#   python results_api.py --port 8050
+#   python results_api.py --host 0.0.0.0 --rescan-minutes 60 --universe listings --no-charts
+#
+#   GET /health
+#   GET /results?signals_only=1&days=30     latest result per symbol
+#   GET /results/AAPL                       result + signals + indicator snapshot
+#   GET /signals?days=7&kind=golden_cross&kind=macd_bullish
+#   GET /indicators, /indicators/AAPL
+#   GET /charts/<file from a result's "chart" field>
+
+HOST = "127.0.0.1"
+PORT = 8050
+CACHE_ENTRIES = 2048     # distinct response bodies kept in memory
+MIN_GZIP_BYTES = 1024    # smaller bodies aren't worth compressing
+CHART_MAX_AGE = 86400    # chart files never change under the same name
+CHART_TYPES = {".png": "image/png", ".svg": "image/svg+xml"}
+MAX_DAYS = 36500         # longest ?days= window (larger ones overflow the date maths)
+
+
+class ResponseCache:
+    """
+    Encoded responses keyed by day, path and query: (etag, body, gzipped body).
+    Cleared whenever the state DB changes, checked with PRAGMA data_version on
+    a connection of its own (cheap; no table is read). Each entry remembers
+    the version it was built from, so a body built while the DB changed is
+    never kept.
+    """
+
+    def __init__(self, db_path=None, max_entries=CACHE_ENTRIES):
+        state_store.connect(db_path)  # create/migrate the DB before watching it
+        self._version_conn = sqlite3.connect(os.path.abspath(db_path or state_store.STATE_DB),
+                                             check_same_thread=False)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key, build):
+        """The cached (etag, body, gzipped) for `key`, calling build() -> JSON-able on a miss."""
+        with self._lock:
+            self._check_version()
+            version = self._version
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+        # Built outside the lock so a slow query doesn't stall cached responses
+        body = json.dumps(build(), separators=(",", ":")).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= MIN_GZIP_BYTES else None
+        entry = (etag, body, gzipped)
+        with self._lock:
+            self.misses += 1
+            self._check_version()
+            if version == self._version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = (version, entry)
+        return entry
+
+
+# --- Response bodies (read from the state DB only) ---
+
+def _chart_url(chart):
+    return f"/charts/{os.path.basename(chart)}" if chart else None
+
+
+def _result(symbol, entry):
+    golden, death = entry["golden_crosses"], entry["death_crosses"]
+    return {
+        "symbol": symbol,
+        "last_golden_cross": golden[-1] if golden else None,
+        "last_death_cross": death[-1] if death else None,
+        "golden_crosses": golden,
+        "death_crosses": death,
+        "start_date": entry["start_date"],
+        "last_bar": entry["last_bar"],
+        "processed_at": entry["processed_at"],
+        "chart": _chart_url(entry["chart"]),
+    }
+
+
+def results_body(days=None, signals_only=False, db_path=None):
+    """Every stored result; with `days`, signal_date is the last golden cross in that window."""
+    cutoff = signal_index.recent_symbols(days, db_path=db_path) if days is not None else None
+    rows = []
+    for symbol, entry in state_store.load_symbol_results(db_path=db_path).items():
+        row = _result(symbol, entry)
+        row["signal_date"] = row["last_golden_cross"] if cutoff is None else cutoff.get(symbol)
+        if signals_only and not row["signal_date"]:
+            continue
+        rows.append(row)
+    return {"count": len(rows), "results": rows}
+
+
+def symbol_body(symbol, db_path=None):
+    entry = state_store.load_symbol_results([symbol], db_path).get(symbol)
+    if entry is None:
+        return None
+    return {
+        **_result(symbol, entry),
+        "signals": [dict(zip(("date", "kind", "value"), row))
+                    for row in state_store.symbol_signals(symbol, db_path)],
+        "indicators": state_store.load_snapshots([symbol], db_path).get(symbol),
+    }
+
+
+def signals_body(days=30, kinds=("golden_cross",), db_path=None):
+    events = signal_index.recent_signals(days, kinds, db_path=db_path)
+    return {"days": days, "kinds": list(kinds), "count": len(events), "signals": events}
+
+
+def indicators_body(symbols=None, db_path=None):
+    snapshots = state_store.load_snapshots(symbols, db_path)
+    return {"count": len(snapshots), "indicators": snapshots}
+
+
+class Refresher:
+    """
+    Reruns scan_cli with `scan_argv` every `minutes` from a daemon thread; the
+    cache notices the DB writes. Each scan is its own process, so its worker
+    pools are never forked from this threaded server.
+    """
+
+    def __init__(self, scan_argv, minutes):
+        self.command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scan_cli.py"),
+                        *scan_argv]
+        self.interval = minutes * 60
+        self.running = False
+        self.last_finished = None
+        self.last_error = None
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+        return self
+
+    def _loop(self):
+        while True:
+            self.running = True
+            try:
+                code = subprocess.run(self.command).returncode
+                self.last_error = None if code == 0 else f"scan exited with status {code}"
+            except OSError as e:
+                self.last_error = str(e)
+            if self.last_error:
+                print(f"⚠️ Background scan failed: {self.last_error}")
+            self.running = False
+            self.last_finished = datetime.now().strftime(state_store.DATE_FMT)
+            time.sleep(self.interval)
+
+
+def _days(query, default=None):
+    """?days= as an int, or ValueError (a 400) when it's not a usable window."""
+    if "days" not in query:
+        return default
+    days = int(query["days"][0])
+    if not 0 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be between 0 and {MAX_DAYS}")
+    return days
+
+
+def make_server(host=HOST, port=PORT, db_path=None, chart_dir=chart_renderer.CHART_CACHE_DIR, refresher=None):
+    """ThreadingHTTPServer for the API (call serve_forever(); shutdown() to stop)."""
+    # http.server is slow to import and only needed here
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    cache = ResponseCache(db_path)
+    started = time.time()
+
+    def route(path, query):
+        """(cache key, build) for a JSON route, or None if there's no such route."""
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if parts == ["results"]:
+            days = _days(query)
+            signals_only = query.get("signals_only", ["0"])[0] in ("1", "true", "yes")
+            return lambda: results_body(days, signals_only, db_path)
+        if len(parts) == 2 and parts[0] == "results":
+            symbol = parts[1].upper()
+            return lambda: symbol_body(symbol, db_path)
+        if parts == ["signals"]:
+            days = _days(query, 30)
+            kinds = tuple(query.get("kind", ["golden_cross"]))
+            unknown = set(kinds) - set(signal_index.EVENT_KINDS)
+            if unknown:
+                raise ValueError(f"unknown kind(s): {', '.join(sorted(unknown))}")
+            return lambda: signals_body(days, kinds, db_path)
+        if parts == ["indicators"]:
+            return lambda: indicators_body(db_path=db_path)
+        if len(parts) == 2 and parts[0] == "indicators":
+            symbol = parts[1].upper()
+            return lambda: indicators_body([symbol], db_path)["indicators"].get(symbol)
+        return None
+
+    class ResultsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for clients polling many symbols
+
+        def _send(self, status, body, content_type, etag=None, gzipped=None, max_age=0):
+            if etag and etag in (self.headers.get("If-None-Match") or ""):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if gzipped is not None and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                body = gzipped
+                self.send_response(status)
+                self.send_header("Content-Encoding", "gzip")
+            else:
+                self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Cache-Control", f"public, max-age={max_age}" + (", immutable" if max_age else ""))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _error(self, status, message):
+            body = json.dumps({"error": message}).encode()
+            self._send(status, body, "application/json")
+
+        def _chart(self, name):
+            name = os.path.basename(name)
+            content_type = CHART_TYPES.get(os.path.splitext(name)[1])
+            path = os.path.join(chart_dir, name)
+            if content_type is None or not os.path.isfile(path):
+                self._error(404, "no such chart")
+                return
+            with open(path, "rb") as f:
+                body = f.read()
+            # SVG compresses well; PNG is already compressed
+            gzipped = gzip.compress(body) if name.endswith(".svg") else None
+            self._send(200, body, content_type, f'"{os.path.splitext(name)[0]}"', gzipped, CHART_MAX_AGE)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            path = url.path.rstrip("/") or "/"
+            if path.startswith("/charts/"):
+                self._chart(path[len("/charts/"):])
+                return
+            if path == "/health":
+                health = {"status": "ok", "uptime_seconds": round(time.time() - started),
+                          "cache_hits": cache.hits, "cache_misses": cache.misses}
+                if refresher:
+                    health.update(refreshing=refresher.running, last_refresh=refresher.last_finished,
+                                  last_refresh_error=refresher.last_error)
+                self._send(200, json.dumps(health).encode(), "application/json")
+                return
+            try:
+                build = route(path, parse_qs(url.query))
+            except (ValueError, OverflowError) as e:
+                self._error(400, str(e))
+                return
+            if build is None:
+                self._error(404, "not found")
+                return
+            # ?days= windows end today, so a new day needs new bodies even without a scan
+            key = f"{date.today()} {path}?{url.query}"
+            try:
+                etag, body, gzipped = cache.get(key, build)
+            except (ValueError, OverflowError) as e:
+                self._error(400, str(e))
+                return
+            if body == b"null":
+                self._error(404, f"nothing stored for {path.rsplit('/', 1)[-1].upper()}")
+                return
+            self._send(200, body, "application/json", etag, gzipped)
+
+        do_HEAD = do_GET
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ResultsHandler)
+    server.daemon_threads = True
+    server.cache = cache
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve stored scan results over HTTP. Arguments it doesn't know are passed to scan_cli "
+                    "for --rescan-minutes.")
+    parser.add_argument("--host", default=HOST, help="interface to listen on (0.0.0.0 for the whole network)")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--rescan-minutes", type=float,
+                        help="also rescan in the background this often (scan_cli arguments select what)")
+    args, scan_argv = parser.parse_known_args(argv)
+
+    refresher = None
+    if args.rescan_minutes:
+        import scan_cli
+        scan_cli.build_parser().parse_args(scan_argv)  # bad arguments fail here, not in every rescan
+        refresher = Refresher(scan_argv, args.rescan_minutes).start()
+    elif scan_argv:
+        parser.error(f"unrecognized arguments: {' '.join(scan_argv)}")
+
+    server = make_server(args.host, args.port, refresher=refresher)
+    print(f"📡 Serving results on http://{args.host}:{args.port}/results")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
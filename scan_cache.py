@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+
+import golden_cross
+import metrics
+from scan_pipeline import scan_symbols
+
+# In-process memo of scan results (price frame + indicators + crosses), keyed
+# by (symbol, start, end). Streamlit keeps imported modules alive between
+# reruns, so widget clicks reuse these instead of refetching everything.
+# Fresh results are recorded like any other scan (history, skips, stored
+# results, signal index), so the CLI and the results API see app scans too.
+SCAN_CACHE_TTL = 30 * 60    # seconds before an entry is considered stale
+SCAN_CACHE_SIZE = 256       # entries kept before evicting least recently used
+PREFETCH_WAIT = 120         # max seconds to wait on a prefetch already running
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=SCAN_CACHE_SIZE, ttl=SCAN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def __contains__(self, key):
+        """Whether `key` holds a live entry; unlike get(), not counted as a hit or miss."""
+        with self._lock:
+            item = self._items.get(key)
+            return item is not None and time.monotonic() - item[0] <= self.ttl
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+_scan_cache = TTLCache()
+_in_flight = {}                 # key -> Event set once a prefetch has stored it
+_in_flight_lock = threading.Lock()
+
+
+def _key(symbol, start, end):
+    return (symbol, str(start), str(end))
+
+
+def _store(result, start, end):
+    golden_cross.record_results([result], start, end)
+    # Failures aren't memoised so a retry can still succeed
+    if result["error"] is None and result["data"] is not None:
+        _scan_cache.set(_key(result["symbol"], start, end), result)
+
+
+def scan_cached(symbols, start, end, **scan_kwargs):
+    """
+    Like scan_pipeline.scan_symbols, but memoised: cached symbols are yielded
+    straight away, symbols being prefetched are waited for, and only the rest
+    are fetched and computed.
+    """
+    waiting, missing = [], []
+    for symbol in symbols:
+        result = _scan_cache.get(_key(symbol, start, end))
+        if result is not None:
+            metrics.incr("scan_cache_hits")
+            yield result
+            continue
+        metrics.incr("scan_cache_misses")
+        with _in_flight_lock:
+            event = _in_flight.get(_key(symbol, start, end))
+        if event is not None:
+            waiting.append((symbol, event))
+        else:
+            missing.append(symbol)
+
+    for symbol, event in waiting:
+        event.wait(PREFETCH_WAIT)
+        result = _scan_cache.get(_key(symbol, start, end))
+        if result is not None:
+            yield result
+        else:
+            missing.append(symbol)
+
+    for result in scan_symbols(missing, start, end, **scan_kwargs):
+        _store(result, start, end)
+        yield result
+
+
+def prefetch(symbols, start, end, **scan_kwargs):
+    """Warm the cache for `symbols` on a background thread (e.g. the next batch)."""
+    with _in_flight_lock:
+        todo = [s for s in symbols
+                if _key(s, start, end) not in _in_flight and _key(s, start, end) not in _scan_cache]
+        events = {s: threading.Event() for s in todo}
+        for symbol, event in events.items():
+            _in_flight[_key(symbol, start, end)] = event
+    if not todo:
+        return None
+
+    def run():
+        try:
+            for result in scan_symbols(todo, start, end, **scan_kwargs):
+                _store(result, start, end)
+                _finish(result["symbol"])
+        except Exception as e:
+            print(f"⚠️ Prefetch failed for {todo}: {e}")
+        finally:
+            for symbol in todo:
+                _finish(symbol)
+
+    def _finish(symbol):
+        with _in_flight_lock:
+            event = _in_flight.pop(_key(symbol, start, end), None)
+        if event is not None:
+            event.set()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def clear_scan_cache():
+    _scan_cache.clear()
@@ -0,0 +1,226 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import change_detect
+import golden_cross
+import indicator_engine
+
+# Headless scanner: same scan as golden_cross.main(), but driven by arguments,
+# run over the whole universe without prompts, with results written to disk.
+# --daemon keeps it running and rescans once a day after the market closes,
+# so the slow fetch/compute happens off-hours and the UI just reads results.
+#
+#   python scan_cli.py --universe trending --recent-days 30
+#   python scan_cli.py --symbols AAPL MSFT --format json --no-charts
+#   python scan_cli.py --universe listings --daemon --run-at 16:30
+#   python scan_cli.py --symbols-file nasdaqlisted.txt --screen "rsi(14) < 30 and close > sma(200)"
+
+RESULTS_DIR = "scan_results"
+MARKET_TZ = "America/New_York"
+RUN_AT = "16:30"          # market-time run for --daemon (after the 16:00 close)
+RETRY_DELAY = 15 * 60     # seconds before retrying a daemon run that crashed
+RESULT_FIELDS = ["symbol", "signal_date", "last_golden_cross", "last_death_cross", "new_golden_cross",
+                 "new_death_cross", "start_date", "end_date", "chart", "error"]
+
+
+def resolve_universe(args):
+    """Symbols to scan from --symbols, --symbols-file or --universe."""
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols if s.strip()]
+    elif args.symbols_file:
+        from update_stocks import load_symbol_file
+        symbols = load_symbol_file(args.symbols_file)
+    elif args.universe == "listings":
+        from update_stocks import load_stock_symbols
+        symbols = load_stock_symbols()
+    else:
+        symbols = golden_cross.get_trending_symbols(force_refresh=args.refresh)
+
+    symbols = list(dict.fromkeys(symbols))
+    if not args.include_skipped:
+        symbols = golden_cross.filter_skipped_and_cooldown(symbols)
+    if args.limit:
+        symbols = symbols[:args.limit]
+    return symbols
+
+
+def write_results(rows, output_dir, fmt, started, fields=RESULT_FIELDS, prefix="scan"):
+    """Write one timestamped results file and refresh latest.<fmt> next to it."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{prefix}_{started.strftime('%Y%m%d_%H%M%S')}.{fmt}")
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        elif fmt == "jsonl":
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+        else:
+            new = [{"symbol": row["symbol"], "cross": kind, "date": row[f"new_{kind}_cross"]} for row in rows
+                   for kind in ("golden", "death") if row.get(f"new_{kind}_cross")]
+            json.dump({"scanned_at": started.isoformat(timespec="seconds"), "new_since_last_run": new,
+                       "results": rows}, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+    latest = os.path.join(output_dir, f"latest.{fmt}" if prefix == "scan" else f"{prefix}_latest.{fmt}")
+    with open(path, "rb") as src, open(latest + ".tmp", "wb") as dst:
+        dst.write(src.read())
+    os.replace(latest + ".tmp", latest)
+    return path
+
+
+def run_screen(args, symbols, start_date, end_date, started):
+    """--screen: evaluate the expression over the whole universe in one pass."""
+    import screen
+
+    compiled = screen.compile_screen(args.screen)
+    rows = screen.screen_symbols(compiled, symbols, start_date, end_date, matches_only=args.signals_only)
+    path = write_results(rows, args.output_dir, args.format, started,
+                         fields=["symbol", "as_of", "match", *compiled.terms], prefix="screen")
+    hits = sum(1 for row in rows if row["match"])
+    print(f"✅ {hits} symbol(s) match {args.screen!r}; results saved to {path}")
+    return path
+
+
+def default_end(now=None):
+    """
+    Exclusive end date that takes in the newest closed session: tomorrow
+    once today's bar is final (after the close in MARKET_TZ), today before.
+    """
+    last_bar = change_detect.expected_last_bar(date.max, now)
+    return (last_bar + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def run_scan(args):
+    """One full headless scan; returns the path of the results file."""
+    started = datetime.now()
+    end_date = args.end or default_end()
+    start_date = args.start or (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=365 * args.years)).strftime(
+        "%Y-%m-%d")
+    symbols = resolve_universe(args)
+    if args.screen:
+        print(f"[{started:%Y-%m-%d %H:%M:%S}] Screening {len(symbols)} symbols from {start_date} to {end_date}")
+        return run_screen(args, symbols, start_date, end_date, started)
+    print(f"[{started:%Y-%m-%d %H:%M:%S}] Scanning {len(symbols)} symbols from {start_date} to {end_date}")
+
+    rows = []
+    for i in range(0, len(symbols), args.batch_size):
+        batch = symbols[i:i + args.batch_size]
+        rows += golden_cross.check_stocks_for_crossovers(
+            batch, start_date, end_date, recent_only=args.recent_days is not None,
+            recent_days=args.recent_days or 30, use_panel=args.panel, render_charts=not args.no_charts,
+            compact=args.compact, incremental=not args.full, save_indicators=False,
+        )
+        print(f"Processed {min(i + args.batch_size, len(symbols))}/{len(symbols)} symbols")
+    indicator_engine.save_engine()
+
+    if args.signals_only:
+        rows = [row for row in rows if row["signal_date"]]
+    path = write_results(rows, args.output_dir, args.format, started)
+    hits = sum(1 for row in rows if row["signal_date"])
+    fresh = sum(1 for row in rows if row.get("new_golden_cross"))
+    print(f"✅ {hits} golden cross(es) found, {fresh} new since the last run; results saved to {path}")
+    return path
+
+
+def next_run(now, run_at=RUN_AT, tz=MARKET_TZ, weekdays_only=True):
+    """Next market-time `run_at` after `now` (aware), skipping weekends."""
+    zone = ZoneInfo(tz)
+    hour, minute = map(int, run_at.split(":"))
+    local = now.astimezone(zone)
+    candidate = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= local:
+        candidate += timedelta(days=1)
+    while weekdays_only and candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def run_daemon(args):
+    """Scan now if asked, then once per trading day at --run-at market time."""
+    if args.run_now:
+        run_scan(args)
+    while True:
+        when = next_run(datetime.now().astimezone(), args.run_at, args.tz, not args.every_day)
+        print(f"⏰ Next scan at {when:%Y-%m-%d %H:%M %Z}")
+        while True:
+            remaining = (when - datetime.now().astimezone()).total_seconds()
+            if remaining <= 0:
+                break
+            # Short sleeps so suspend/clock changes don't push the run back
+            time.sleep(min(remaining, 300))
+        try:
+            run_scan(args)
+        except Exception as e:
+            print(f"⚠️ Scheduled scan failed: {e}; retrying in {RETRY_DELAY // 60} minutes")
+            time.sleep(RETRY_DELAY)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scan for golden crosses without prompts.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--universe", choices=["trending", "listings"], default="trending",
+                        help="trending list, or every symbol from the listing pages")
+    source.add_argument("--symbols", nargs="+", help="explicit tickers to scan")
+    source.add_argument("--symbols-file", help="local symbol list: one per line, or an exchange listing file")
+    parser.add_argument("--refresh", action="store_true", help="refetch the trending list first")
+    parser.add_argument("--include-skipped", action="store_true", help="don't drop skipped/cooling-down symbols")
+    parser.add_argument("--limit", type=int, help="scan at most this many symbols")
+    parser.add_argument("--start", help="start date YYYY-MM-DD (default: --years before --end)")
+    parser.add_argument("--end", help="end date YYYY-MM-DD, exclusive (default: the day after the last closed session)")
+    parser.add_argument("--years", type=int, default=2, help="history length when --start isn't given")
+    parser.add_argument("--recent-days", type=int, help="only report golden crosses within this many days")
+    parser.add_argument("--batch-size", type=int, default=100, help="symbols per scan batch")
+    parser.add_argument("--panel", action="store_true", help="compute each batch as one cross-sectional panel")
+    parser.add_argument("--compact", action="store_true",
+                        help="keep only float32 closes in memory (for very large universes)")
+    parser.add_argument("--full", action="store_true",
+                        help="rescan every symbol, even ones with no new bar since the last scan")
+    parser.add_argument("--screen", metavar="EXPR",
+                        help='screen instead of the crossover scan, e.g. '
+                             '"golden_cross(50,200) within 10d and rsi(14) < 40 and close < lower_band"')
+    parser.add_argument("--no-charts", action="store_true", help="don't render charts for hits")
+    parser.add_argument("--signals-only", action="store_true", help="only write rows with a golden cross (or a --screen match)")
+    parser.add_argument("--format", choices=["csv", "json", "jsonl"], default="csv")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--daemon", action="store_true", help="keep running and rescan after each market close")
+    parser.add_argument("--run-at", default=RUN_AT, help="daemon run time HH:MM in --tz")
+    parser.add_argument("--tz", default=MARKET_TZ)
+    parser.add_argument("--every-day", action="store_true", help="daemon also runs on weekends")
+    parser.add_argument("--run-now", action="store_true", help="daemon scans once immediately before waiting")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.batch_size < 1:
+        print("--batch-size must be at least 1", file=sys.stderr)
+        return 2
+    if args.screen:
+        import screen
+        try:
+            screen.compile_screen(args.screen)
+        except screen.ScreenError as e:
+            print(f"--screen: {e}", file=sys.stderr)
+            return 2
+    try:
+        if args.daemon:
+            run_daemon(args)
+        else:
+            run_scan(args)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import golden_cross
+import metrics
+
+# Two-stage scan: network fetches run concurrently on an asyncio loop (in a
+# background thread), crossover/indicator maths runs in a process pool, and
+# results are yielded to the caller as soon as each symbol is done.
+MAX_IN_FLIGHT = 4       # concurrent provider requests
+FETCH_CHUNK_SIZE = 10   # symbols per grouped request
+COMPUTE_WORKERS = None  # process-pool size; None = one per CPU, 0 = compute inline
+
+INDICATOR_COLUMNS = ["RSI", "MACD", "Signal_Line", "Upper_Band", "Lower_Band"]
+
+_FETCH_DONE = object()
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """
+    The compute pool, shared by every scan in this process (Streamlit reruns,
+    prefetches, API refreshes) and only rebuilt when its size changes or it
+    broke. Workers start from a fork server (spawn where there's none), never
+    by forking this process, whose fetch threads may be holding locks.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+
+def analyze_symbol(symbol, close, with_indicators=True):
+    """Compute-stage work for one symbol; runs in a worker process."""
+    df = close.astype("float64").to_frame("Close")
+    started = time.perf_counter()
+    golden_crosses, death_crosses = golden_cross.detect_crossovers(df)
+    detected = time.perf_counter()
+    indicators = None
+    # Worker processes can't reach the parent's metrics, so send timings back
+    timings = {"detect": detected - started}
+    if with_indicators:
+        indicators = golden_cross.calculate_indicators(df)[INDICATOR_COLUMNS]
+        timings["indicators"] = time.perf_counter() - detected
+    return {
+        "symbol": symbol,
+        "golden_crosses": golden_crosses,
+        "death_crosses": death_crosses,
+        "indicators": indicators,
+        "timings": timings,
+    }
+
+
+async def _fetch_all(symbols, start, end, out, max_in_flight, chunk_size, provider, columns, failures):
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def fetch_chunk(chunk):
+        async with semaphore:
+            try:
+                frames = await asyncio.to_thread(
+                    golden_cross.fetch_historical_data_batch, chunk, start, end,
+                    batch_size=chunk_size, provider=provider, columns=columns, failures=failures)
+            except Exception as e:
+                print(f"❌ Fetch failed for {chunk}: {e}")
+                failures.update(dict.fromkeys(chunk, str(e)))
+                frames = {}
+        for symbol in chunk:
+            out.put((symbol, frames.get(symbol)))
+
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+
+def _run_fetch_stage(symbols, start, end, out, max_in_flight, chunk_size, provider, columns, failures):
+    try:
+        asyncio.run(_fetch_all(symbols, start, end, out, max_in_flight, chunk_size, provider, columns, failures))
+    finally:
+        out.put(_FETCH_DONE)
+
+
+def _result(symbol, data, analysis=None, error=None):
+    if error is not None:
+        metrics.incr("symbols_failed")
+    if analysis is not None:
+        for stage, seconds in analysis["timings"].items():
+            metrics.record(stage, seconds, symbol)
+        if analysis["indicators"] is not None:
+            data = data.assign(**{column: analysis["indicators"][column] for column in INDICATOR_COLUMNS})
+    return {
+        "symbol": symbol,
+        "data": data,
+        "golden_crosses": analysis["golden_crosses"] if analysis else [],
+        "death_crosses": analysis["death_crosses"] if analysis else [],
+        "error": error,
+    }
+
+
+def scan_symbols(symbols, start, end, max_in_flight=MAX_IN_FLIGHT, chunk_size=FETCH_CHUNK_SIZE,
+                 workers=COMPUTE_WORKERS, provider=None, columns=None, failures=None):
+    """
+    Fetch and analyse `symbols`, yielding one result dict per symbol in
+    completion order:
+
+        {"symbol", "data", "golden_crosses", "death_crosses", "error"}
+
+    `data` is the price frame with MAs and indicators attached, or None if
+    nothing could be fetched. Fetching keeps going while earlier symbols are
+    still being computed, so the scan takes about as long as its slowest stage.
+
+    With `columns` (compact mode) `data` holds only those columns in narrow
+    dtypes and indicators aren't computed; charts derive their own.
+
+    Symbols whose fetch failed (rather than returning no data) are recorded
+    in `failures` as {symbol: reason} and their error starts "fetch failed".
+    """
+    failures = {} if failures is None else failures
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return
+
+    fetched = queue.Queue()
+    fetcher = threading.Thread(
+        target=_run_fetch_stage,
+        args=(symbols, start, end, fetched, max_in_flight, chunk_size, provider, columns, failures),
+        daemon=True,
+    )
+    fetcher.start()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = get_pool(workers) if workers else None
+
+    pending = {}
+    fetching = True
+    try:
+        while fetching or pending:
+            if fetching:
+                try:
+                    item = fetched.get(timeout=0.05 if pending else None)
+                except queue.Empty:
+                    item = None
+
+                if item is _FETCH_DONE:
+                    fetching = False
+                elif item is not None:
+                    symbol, df = item
+                    if df is None and symbol in failures:
+                        yield _result(symbol, None, error=f"fetch failed: {failures[symbol]}")
+                    elif df is None:
+                        yield _result(symbol, None, error="missing or invalid data")
+                    elif pool is None:
+                        yield _result(symbol, df, analyze_symbol(symbol, df["Close"], columns is None))
+                    else:
+                        pending[pool.submit(analyze_symbol, symbol, df["Close"], columns is None)] = (symbol, df)
+
+            if pending:
+                done, _ = wait(pending, timeout=0 if fetching else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol, df = pending.pop(future)
+                    try:
+                        result = _result(symbol, df, future.result())
+                    except Exception as e:
+                        result = _result(symbol, df, error=str(e))
+                    yield result
+    finally:
+        # The pool outlives this scan; just drop what it no longer needs to do
+        for future in pending:
+            future.cancel()
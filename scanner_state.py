@@ -0,0 +1,111 @@
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+import state_store
+
+# Cooldowns, skips and the cached trending list, kept apart from
+# golden_cross so quick actions (add a cooldown, reset caches) don't pay for
+# importing pandas, yfinance or matplotlib. golden_cross re-exports these.
+#
+#   python scanner_state.py cooldown AAPL TSLA --days 2
+#   python scanner_state.py reset
+#   python scanner_state.py list
+
+SKIP_DAYS = 3  # Number of days to temporarily skip symbols
+TRENDING_CACHE_DAYS = 3  # days before refresh
+COOLDOWN_HOURS = 24  # default cooldown after update_cooldown()
+
+
+def load_skipped_symbols():
+    """{symbol: datetime} for symbols skipped within the last SKIP_DAYS days."""
+    return state_store.recent_skips(SKIP_DAYS)
+
+
+def save_skipped_symbols(skipped):
+    state_store.set_skipped(skipped)
+
+
+def filter_skipped_and_cooldown(symbols):
+    """Drop skipped and cooling-down symbols with one bulk lookup."""
+    return state_store.filter_symbols(symbols, SKIP_DAYS)
+
+
+def load_cached_trending():
+    return state_store.load_trending(TRENDING_CACHE_DAYS)
+
+
+def save_cached_trending(symbols):
+    state_store.save_trending(symbols)
+
+
+def reset_cached_data():
+    try:
+        # Stored results too: with the price cache gone they'd answer scans from stale data
+        state_store.reset(("trending", "skipped", "symbol_results"))
+        print("✅ Reset trending cache, skipped symbols and stored results")
+    except Exception as e:
+        print(f"❌ Failed to reset state: {e}")
+
+    # Both only touch files on disk; neither pulls in pandas or matplotlib
+    from price_cache import clear_price_cache
+    from chart_renderer import clear_chart_cache
+    clear_price_cache()
+    clear_chart_cache()
+    print("✅ Reset price and chart caches")
+
+#logic for 'cooldown' stocks. for day trading.
+
+def load_cooldown():
+    """Return {symbol: datetime the cooldown ends} for every active cooldown."""
+    return state_store.active_cooldowns()
+
+
+def update_cooldown(symbol, cooldown_period_hours=COOLDOWN_HOURS):
+    state_store.set_cooldown([symbol], datetime.now() + timedelta(hours=cooldown_period_hours))
+
+def is_in_cooldown(symbol, cooldown_period_hours=COOLDOWN_HOURS):
+    """
+    True while `symbol` is cooling down. Cooldowns are stored by end time; a
+    period other than COOLDOWN_HOURS moves that end by the difference.
+    """
+    until = state_store.cooldown_until(symbol)
+    if until is None:
+        return False
+    return datetime.now() < until + timedelta(hours=cooldown_period_hours - COOLDOWN_HOURS)
+
+def filter_cooldown_symbols(symbols):
+    active = load_cooldown()  # one indexed query, not one file read per symbol
+    return [s for s in symbols if s not in active]
+
+def add_to_cooldown(symbols, days=2):
+    expiry = datetime.combine(datetime.today() + timedelta(days=days), datetime.min.time())
+    state_store.set_cooldown(symbols, expiry)
+
+    print(f"✅ Added {len(symbols)} symbols to cooldown until {expiry.strftime('%Y-%m-%d')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage cooldowns, skips and cached data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cooldown = commands.add_parser("cooldown", help="put symbols on cooldown")
+    cooldown.add_argument("symbols", nargs="+", help="tickers (space or comma separated)")
+    cooldown.add_argument("--days", type=int, default=2)
+    commands.add_parser("reset", help="clear the trending list, skips, stored results and price/chart caches")
+    commands.add_parser("list", help="show active cooldowns and skipped symbols")
+    args = parser.parse_args(argv)
+
+    if args.command == "cooldown":
+        add_to_cooldown([s.strip().upper() for arg in args.symbols for s in arg.split(",") if s.strip()], args.days)
+    elif args.command == "reset":
+        reset_cached_data()
+    else:
+        for symbol, until in sorted(load_cooldown().items()):
+            print(f"{symbol}\tcooldown until {until:%Y-%m-%d %H:%M}")
+        for symbol, when in sorted(load_skipped_symbols().items()):
+            print(f"{symbol}\tskipped {when:%Y-%m-%d %H:%M}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
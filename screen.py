@@ -0,0 +1,493 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import panel
+
+# Screening expressions, evaluated for a whole universe at once:
+#
+#   golden_cross(50,200) within 10d and rsi(14) < 40 and close < lower_band
+#
+# An expression is parsed once into a small graph of NumPy operations over the
+# panel's compacted dates x symbols layout (each symbol's own bars from row 0
+# down, as in panel.compact). Identical sub-expressions share one node, so
+# e.g. sma(50) is computed once however often it appears, and a Context
+# caches nodes across several screens run over the same prices. A symbol
+# matches when the expression holds on its latest bar.
+#
+# Terms (arguments are optional; defaults shown):
+#   close, volume, sma(n), ema(n), rsi(14), macd(12,26), macd_signal(12,26,9),
+#   macd_hist(12,26,9), upper_band(20,2), middle_band(20), lower_band(20,2),
+#   golden_cross(50,200), death_cross(50,200), crosses_above(a, b),
+#   crosses_below(a, b)
+# Operators: + - * /, < <= > >= == !=, and, or, not, parentheses, and
+# `<condition> within <N>d` (true on any bar in the last N calendar days;
+# `w` counts weeks).
+
+NO_DATE = 10_000_000  # day number for padding rows (past any real date)
+
+
+class ScreenError(ValueError):
+    """The expression couldn't be parsed or doesn't make sense."""
+
+
+# --- Parsing -----------------------------------------------------------------
+
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?[dw]\b)|(\d+(?:\.\d+)?)|([A-Za-z_]\w*)|(<=|>=|==|!=|[-+*/<>(),]))")
+_KEYWORDS = {"and", "or", "not", "within"}
+_COMPARISONS = {"<", "<=", ">", ">=", "==", "!="}
+
+# name -> (defaults, builder(args) -> node); every term expands to primitives
+_CLOSE = ("close",)
+
+
+def _sma(n):
+    return ("sma", _CLOSE, int(n))
+
+
+def _ema(n):
+    return ("ema", _CLOSE, int(n))
+
+
+def _std(n):
+    return ("std", _CLOSE, int(n))
+
+
+def _macd(fast, slow):
+    return ("-", _ema(fast), _ema(slow))
+
+
+def _macd_signal(fast, slow, signal):
+    return ("ema", _macd(fast, slow), int(signal))
+
+
+_TERMS = {
+    "close": ((), lambda: _CLOSE),
+    "volume": ((), lambda: ("volume",)),
+    "sma": ((50,), _sma),
+    "ema": ((20,), _ema),
+    "rsi": ((panel.RSI_WINDOW,), lambda n: ("rsi", _CLOSE, int(n))),
+    "macd": ((panel.MACD_FAST, panel.MACD_SLOW), _macd),
+    "macd_signal": ((panel.MACD_FAST, panel.MACD_SLOW, panel.MACD_SIGNAL), _macd_signal),
+    "macd_hist": ((panel.MACD_FAST, panel.MACD_SLOW, panel.MACD_SIGNAL),
+                  lambda f, s, g: ("-", _macd(f, s), _macd_signal(f, s, g))),
+    "upper_band": ((panel.BOLLINGER_WINDOW, 2), lambda n, k: ("+", _sma(n), ("*", ("num", float(k)), _std(n)))),
+    "middle_band": ((panel.BOLLINGER_WINDOW,), _sma),
+    "lower_band": ((panel.BOLLINGER_WINDOW, 2), lambda n, k: ("-", _sma(n), ("*", ("num", float(k)), _std(n)))),
+    "golden_cross": (panel.MA_WINDOWS, lambda s, l: ("cross_up", _sma(s), _sma(l))),
+    "death_cross": (panel.MA_WINDOWS, lambda s, l: ("cross_down", _sma(s), _sma(l))),
+}
+_SERIES_TERMS = {"crosses_above": "cross_up", "crosses_below": "cross_down"}
+_BOOL_OPS = {"cross_up", "cross_down", "within", "and", "or", "not"} | _COMPARISONS
+
+
+def _is_bool(node):
+    return node[0] in _BOOL_OPS
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if not match:
+                raise ScreenError(f"unexpected character at {pos + 1}: {text[pos:pos + 10]!r}")
+            duration, number, name, op = match.groups()
+            start = match.start(match.lastindex)
+            if duration:
+                days = float(duration[:-1]) * (7 if duration[-1] == "w" else 1)
+                self.tokens.append(("duration", days, start))
+            elif number:
+                self.tokens.append(("num", float(number), start))
+            elif name:
+                kind = name.lower() if name.lower() in _KEYWORDS else "name"
+                self.tokens.append((kind, name.lower(), start))
+            else:
+                self.tokens.append((op, op, start))
+            pos = match.end()
+        self.tokens.append(("end", None, len(text)))
+        self.i = 0
+        self.terms = {}  # source text -> node, for reporting values
+
+    def peek(self):
+        return self.tokens[self.i][0]
+
+    def take(self, kind=None):
+        token = self.tokens[self.i]
+        if kind is not None and token[0] != kind:
+            what = "end of expression" if token[0] == "end" else repr(self.text[token[2]:].split()[0])
+            raise ScreenError(f"expected {kind!r} at {token[2] + 1}, got {what}")
+        self.i += 1
+        return token
+
+    def parse(self):
+        node = self.boolean()
+        self.take("end")
+        if not _is_bool(node):
+            raise ScreenError("a screen must be a condition (e.g. rsi < 30), not a value")
+        return node
+
+    def _need(self, node, boolean, where):
+        if _is_bool(node) != boolean:
+            kind = "a condition" if boolean else "a value"
+            raise ScreenError(f"{where} needs {kind}")
+        return node
+
+    def boolean(self):
+        node = self.conjunction()
+        while self.peek() == "or":
+            self.take()
+            node = ("or", self._need(node, True, "'or'"), self._need(self.conjunction(), True, "'or'"))
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.peek() == "and":
+            self.take()
+            node = ("and", self._need(node, True, "'and'"), self._need(self.negation(), True, "'and'"))
+        return node
+
+    def negation(self):
+        if self.peek() == "not":
+            self.take()
+            return ("not", self._need(self.negation(), True, "'not'"))
+        node = self.comparison()
+        while self.peek() == "within":
+            self.take()
+            days = self.take("duration")[1]
+            node = ("within", self._need(node, True, "'within'"), days)
+        return node
+
+    def comparison(self):
+        node = self.additive()
+        if self.peek() in _COMPARISONS:
+            op = self.take()[0]
+            node = (op, self._need(node, False, f"{op!r}"), self._need(self.additive(), False, f"{op!r}"))
+        return node
+
+    def additive(self):
+        node = self.multiplicative()
+        while self.peek() in ("+", "-"):
+            op = self.take()[0]
+            node = (op, self._need(node, False, f"{op!r}"), self._need(self.multiplicative(), False, f"{op!r}"))
+        return node
+
+    def multiplicative(self):
+        node = self.unary()
+        while self.peek() in ("*", "/"):
+            op = self.take()[0]
+            node = (op, self._need(node, False, f"{op!r}"), self._need(self.unary(), False, f"{op!r}"))
+        return node
+
+    def unary(self):
+        if self.peek() == "-":
+            self.take()
+            return ("*", ("num", -1.0), self._need(self.unary(), False, "'-'"))
+        return self.atom()
+
+    def atom(self):
+        kind, value, start = self.tokens[self.i]
+        if kind == "num":
+            self.take()
+            return ("num", value)
+        if kind == "(":
+            self.take()
+            node = self.boolean()
+            self.take(")")
+            return node
+        if kind == "name":
+            return self.term()
+        raise ScreenError(f"unexpected {'end of expression' if kind == 'end' else repr(value)} at {start + 1}")
+
+    def term(self):
+        _, name, start = self.take("name")
+        args = []
+        if self.peek() == "(":
+            self.take()
+            while self.peek() != ")":
+                args.append(self.boolean() if name in _SERIES_TERMS else ("num", self.take("num")[1]))
+                if self.peek() != ")":
+                    self.take(",")
+            self.take(")")
+        source = self.text[start:self.tokens[self.i][2]].strip()
+
+        if name in _SERIES_TERMS:
+            if len(args) != 2:
+                raise ScreenError(f"{name}() takes two values, e.g. {name}(close, sma(50))")
+            node = (_SERIES_TERMS[name], self._need(args[0], False, name), self._need(args[1], False, name))
+        elif name in _TERMS:
+            defaults, build = _TERMS[name]
+            if len(args) > len(defaults):
+                raise ScreenError(f"{name}() takes at most {len(defaults)} argument(s)")
+            values = [arg[1] for arg in args] + list(defaults[len(args):])
+            if any(value <= 0 for value in values):
+                raise ScreenError(f"{name}() arguments must be positive")
+            node = build(*values)
+        else:
+            raise ScreenError(f"unknown term {name!r} at {start + 1}; known: {', '.join(sorted(_TERMS))}")
+        self.terms.setdefault(source, node)
+        return node
+
+
+class Screen:
+    """
+    A compiled expression: `steps` lists every distinct sub-expression once,
+    operands before the nodes using them, so evaluating is one pass.
+    """
+
+    def __init__(self, text):
+        parser = _Parser(text)
+        self.text = text
+        self.root = parser.parse()
+        self.terms = parser.terms
+        self.steps = []
+        seen = set()
+
+        def visit(node):
+            if node in seen:
+                return
+            for child in node[1:]:
+                if isinstance(child, tuple):
+                    visit(child)
+            seen.add(node)
+            self.steps.append(node)
+
+        visit(self.root)
+
+    @property
+    def uses_volume(self):
+        return ("volume",) in self.steps
+
+    def __repr__(self):
+        return f"Screen({self.text!r}, {len(self.steps)} steps)"
+
+
+def compile_screen(text):
+    return Screen(text)
+
+
+# --- Evaluation ----------------------------------------------------------------
+
+class Context:
+    """
+    Prices for a universe in compacted layout (max bars x symbols, each
+    symbol's own bars from row 0, NaN below) plus matching day numbers.
+    Computed nodes are cached, so several screens share their work.
+    """
+
+    def __init__(self, symbols, close, counts, days, volume=None):
+        self.symbols = list(symbols)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.days = days                        # int64 day numbers, NO_DATE below each symbol's bars
+        self.volume = volume
+        self.own_bar = np.arange(self.close.shape[0])[:, None] < self.counts
+        self._cache = {}
+
+    @classmethod
+    def from_panel(cls, price_panel):
+        close, order, counts = panel.compact(price_panel.close)
+        days = price_panel.dates.values.astype("datetime64[D]").astype(np.int64)[order]
+        rows = np.arange(close.shape[0])[:, None]
+        days = np.where(rows < counts, days, NO_DATE)
+        volume = None
+        if price_panel.volume is not None:
+            volume = np.take_along_axis(price_panel.volume, order, axis=0)
+        return cls(price_panel.symbols, close, counts, days, volume)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """{symbol: DataFrame with Close (and Volume) or None}."""
+        return cls.from_panel(panel.PricePanel.from_frames(frames))
+
+    @classmethod
+    def from_store(cls, store, symbols=None):
+        """From a price_store.PriceStore (Volume used when the store has it)."""
+        symbols = [symbol for symbol in (store.symbols if symbols is None else symbols) if symbol in store]
+        close, counts = store.matrix(symbols)
+        days = np.full(close.shape, NO_DATE, dtype=np.int64)
+        for col, symbol in enumerate(symbols):
+            days[:counts[col], col] = store.days(symbol).astype("datetime64[D]").astype(np.int64)
+        volume = store.matrix(symbols, "Volume")[0] if "Volume" in store.columns else None
+        return cls(symbols, close, counts, days, volume)
+
+    def value(self, node):
+        """The dates x symbols array for a compiled node (operands must be cached or computable)."""
+        cached = self._cache.get(node)
+        if cached is None:
+            cached = self._cache[node] = self._compute(node)
+        return cached
+
+    def _compute(self, node):
+        op = node[0]
+        arg = self.value
+        if op == "num":
+            return np.float64(node[1])
+        if op == "close":
+            return self.close
+        if op == "volume":
+            if self.volume is None:
+                raise ScreenError("volume isn't available for these prices")
+            return self.volume
+        if op == "sma":
+            return panel.panel_sma(arg(node[1]), node[2])
+        if op == "ema":
+            return panel.panel_ema(arg(node[1]), node[2])
+        if op == "std":
+            return panel.panel_std(arg(node[1]), node[2])
+        if op == "rsi":
+            return panel.panel_rsi(arg(node[1]), node[2])
+        if op in ("cross_up", "cross_down"):
+            golden, death = panel.cross_flags(arg(node[1]), arg(node[2]))
+            return (golden if op == "cross_up" else death) & self.own_bar
+        if op == "within":
+            return self._within(arg(node[1]), node[2])
+        if op == "and":
+            return arg(node[1]) & arg(node[2])
+        if op == "or":
+            return arg(node[1]) | arg(node[2])
+        if op == "not":
+            # A NaN comparison is False, and so not-False; only negate where defined
+            return ~arg(node[1]) & self.defined(node[1])
+        left, right = arg(node[1]), arg(node[2])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if op == "+":
+                return left + right
+            if op == "-":
+                return left - right
+            if op == "*":
+                return left * right
+            if op == "/":
+                return left / right
+            result = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+                      "==": np.equal, "!=": np.not_equal}[op](left, right)
+        return np.broadcast_to(result, self.close.shape) & self.own_bar
+
+    def defined(self, node):
+        """
+        Where every value `node` depends on is known (not NaN) on the
+        symbol's own bars, e.g. not before rsi(14) has 14 bars behind it.
+        """
+        key = ("defined", node)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._cache[key] = self._defined(node)
+        return cached
+
+    def _defined(self, node):
+        op = node[0]
+        if op == "num":
+            return self.own_bar
+        if op == "not":
+            return self.defined(node[1])
+        if op == "within":
+            return self._within(self.defined(node[1]), node[2])
+        known = self.own_bar
+        for child in node[1:]:
+            if isinstance(child, tuple):
+                known = known & self.defined(child)
+        if _is_bool(node):
+            return known
+        return known & ~np.isnan(np.broadcast_to(self.value(node), self.close.shape))
+
+    def _within(self, flags, days):
+        """True where `flags` held on any of the symbol's bars in the last `days` calendar days."""
+        n_rows, n_cols = flags.shape
+        if not n_rows:
+            return flags
+        # One sorted key per (symbol, day), so a single searchsorted finds every
+        # window's first row across the whole universe
+        stride = NO_DATE + 1
+        keys = (np.arange(n_cols, dtype=np.int64) * stride + self.days).T.ravel()
+        first = np.searchsorted(keys, (np.arange(n_cols, dtype=np.int64) * stride
+                                       + self.days - int(days)).T.ravel()).reshape(n_cols, n_rows).T
+        first -= np.arange(n_cols, dtype=np.int64) * n_rows
+        hits = np.cumsum(flags, axis=0)
+        before = np.where(first > 0, np.take_along_axis(hits, np.maximum(first - 1, 0), axis=0), 0)
+        return (hits - before > 0) & self.own_bar
+
+    def latest(self, values):
+        """Each symbol's value on its last bar (NaN/False for symbols with no bars)."""
+        last = np.maximum(self.counts - 1, 0)
+        values = np.broadcast_to(values, self.close.shape)
+        if not values.shape[0]:
+            return np.zeros(len(self.symbols), dtype=values.dtype)
+        picked = values[last, np.arange(len(self.symbols))]
+        return np.where(self.counts > 0, picked, False if picked.dtype == bool else np.nan)
+
+    def last_true_dates(self, flags):
+        """Date of each symbol's last True bar in `flags`, or None."""
+        flags = np.broadcast_to(flags, self.close.shape)
+        rows = np.arange(flags.shape[0])[:, None]
+        last = np.where(flags, rows, -1).max(axis=0, initial=-1)
+        days = self.days[np.maximum(last, 0), np.arange(len(self.symbols))] if flags.shape[0] else last
+        return [str(np.datetime64(int(day), "D")) if row >= 0 else None for day, row in zip(days, last)]
+
+    def last_dates(self):
+        last = np.maximum(self.counts - 1, 0)
+        if not self.days.shape[0]:
+            return [None] * len(self.symbols)
+        days = self.days[last, np.arange(len(self.symbols))]
+        return [str(np.datetime64(int(day), "D")) if count else None for day, count in zip(days, self.counts)]
+
+
+def evaluate(screen, context):
+    """Boolean match per symbol (on its latest bar), in context.symbols order."""
+    for node in screen.steps:
+        context.value(node)
+    return context.latest(context.value(screen.root))
+
+
+def run_screen(screen, frames=None, store=None, context=None, matches_only=False):
+    """
+    Evaluate `screen` (text or Screen) over {symbol: DataFrame}, a PriceStore
+    or a prepared Context. Returns one row per symbol:
+    {"symbol", "as_of", "match", <term>: value on the latest bar, ...}.
+    """
+    screen = compile_screen(screen) if isinstance(screen, str) else screen
+    if context is None:
+        context = Context.from_store(store) if store is not None else Context.from_frames(frames or {})
+    matched = evaluate(screen, context)
+    # Values report the latest bar; events (crosses) report their latest date
+    terms = {}
+    for source, node in screen.terms.items():
+        values = context.value(node)
+        terms[source] = context.last_true_dates(values) if _is_bool(node) else context.latest(values)
+    rows = []
+    for col, (symbol, as_of) in enumerate(zip(context.symbols, context.last_dates())):
+        if matches_only and not matched[col]:
+            continue
+        row = {"symbol": symbol, "as_of": as_of, "match": bool(matched[col])}
+        for source, values in terms.items():
+            value = values[col]
+            row[source] = value if not isinstance(value, float) else (None if np.isnan(value) else round(value, 4))
+        rows.append(row)
+    return rows
+
+
+def screen_frame(rows):
+    """run_screen() rows as a DataFrame, matches first."""
+    df = pd.DataFrame(rows)
+    return df.sort_values(["match", "symbol"], ascending=[False, True]).reset_index(drop=True) if not df.empty else df
+
+
+def screen_symbols(screen, symbols, start, end, matches_only=False):
+    """
+    Fetch `symbols` (through the price cache) into a compact PriceStore, a
+    chunk at a time, and run `screen` over all of them in one pass.
+    """
+    import golden_cross
+    import price_store
+
+    screen = compile_screen(screen) if isinstance(screen, str) else screen
+    columns = price_store.PANEL_COLUMNS if screen.uses_volume else price_store.SCAN_COLUMNS
+    store = price_store.PriceStore(columns)
+    symbols = list(dict.fromkeys(symbols))
+    for i in range(0, len(symbols), price_store.STORE_CHUNK):
+        chunk = symbols[i:i + price_store.STORE_CHUNK]
+        store.add_frames(golden_cross.fetch_historical_data_batch(chunk, start, end, columns=columns))
+    return run_screen(screen, store=store, matches_only=matches_only)
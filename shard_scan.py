@@ -0,0 +1,386 @@
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from multiprocessing import Process
+
+# Full-universe scans split into deterministic shards that any number of
+# worker processes -- on this machine or others sharing the work directory --
+# claim from a SQLite queue. Every symbol is checkpointed as soon as its row is
+# final, so a crash or Ctrl-C just resumes where it stopped. The queue uses a
+# rollback journal rather than WAL, whose shared-memory index doesn't work
+# across hosts on a network filesystem.
+#
+#   python shard_scan.py init --symbols-file nasdaqlisted.txt --shards 32
+#   python shard_scan.py work --job <id>          # run on as many hosts as you like
+#   python shard_scan.py run --job <id> --workers 4   # local workers, then merge
+#   python shard_scan.py status --job <id>
+#   python shard_scan.py merge --job <id> --format csv
+
+WORK_DIR = "scan_work"
+QUEUE_DB = "queue.db"
+DEFAULT_SHARDS = 16
+CHECKPOINT_BATCH = 25      # symbols per check_stocks_for_crossovers call (each is checkpointed on its own)
+CLAIM_TIMEOUT = 10 * 60    # seconds without a heartbeat before a claimed shard can be taken over
+HISTORY_YEARS = 2          # default range when --start isn't given
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    recent_days INTEGER,
+    shards INTEGER NOT NULL,
+    options TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS shards (
+    job_id TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',   -- pending | claimed | done
+    worker TEXT,
+    heartbeat REAL,
+    finished_at TEXT,
+    PRIMARY KEY (job_id, shard)
+);
+
+CREATE TABLE IF NOT EXISTS symbols (
+    job_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | done | error | skipped
+    result TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (job_id, symbol)
+);
+CREATE INDEX IF NOT EXISTS symbols_shard ON symbols (job_id, shard, status);
+"""
+
+
+def shard_of(symbol, shards):
+    """Stable shard number: the same symbol lands in the same shard on every host."""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def connect(work_dir=WORK_DIR):
+    os.makedirs(work_dir, exist_ok=True)
+    # Autocommit mode; claims take an explicit BEGIN IMMEDIATE write lock
+    conn = sqlite3.connect(os.path.join(work_dir, QUEUE_DB), timeout=60, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _job_id(symbols, start_date, end_date, shards, recent_days):
+    # Same inputs -> same job, so re-running init resumes instead of restarting
+    key = json.dumps([sorted(symbols), start_date, end_date, shards, recent_days])
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def create_job(conn, symbols, start_date, end_date, shards=DEFAULT_SHARDS, recent_days=None, options=None,
+               job_id=None):
+    """Queue a scan of `symbols`; returns the job id (existing jobs are left as they are)."""
+    symbols = list(dict.fromkeys(symbols))
+    job_id = job_id or _job_id(symbols, start_date, end_date, shards, recent_days)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        inserted = conn.execute(
+            "INSERT OR IGNORE INTO jobs (job_id, created_at, start_date, end_date, recent_days, shards, options) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, _now(), start_date, end_date, recent_days, shards, json.dumps(options or {})),
+        ).rowcount
+        if inserted:
+            conn.executemany("INSERT INTO shards (job_id, shard) VALUES (?, ?)",
+                             [(job_id, shard) for shard in range(shards)])
+            conn.executemany("INSERT OR IGNORE INTO symbols (job_id, symbol, shard) VALUES (?, ?, ?)",
+                             [(job_id, symbol, shard_of(symbol, shards)) for symbol in symbols])
+            # Nothing to do in an empty shard
+            conn.execute("UPDATE shards SET state = 'done', finished_at = ? WHERE job_id = ? AND shard NOT IN "
+                         "(SELECT DISTINCT shard FROM symbols WHERE job_id = ?)", (_now(), job_id, job_id))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return job_id
+
+
+def load_job(conn, job_id):
+    row = conn.execute("SELECT start_date, end_date, recent_days, shards, options FROM jobs WHERE job_id = ?",
+                       (job_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"No such job: {job_id}")
+    start_date, end_date, recent_days, shards, options = row
+    return {"job_id": job_id, "start_date": start_date, "end_date": end_date, "recent_days": recent_days,
+            "shards": shards, "options": json.loads(options)}
+
+
+def claim_shard(conn, job_id, worker, claim_timeout=CLAIM_TIMEOUT):
+    """
+    Atomically take the next shard: one this worker already held, else a
+    pending one, else one whose holder stopped heartbeating. None when done.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT shard FROM shards WHERE job_id = ? AND (state = 'pending' OR "
+            "(state = 'claimed' AND (worker = ? OR heartbeat < ?))) "
+            "ORDER BY worker = ? DESC, state = 'pending' DESC, shard LIMIT 1",
+            (job_id, worker, now - claim_timeout, worker),
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE shards SET state = 'claimed', worker = ?, heartbeat = ? "
+                         "WHERE job_id = ? AND shard = ?", (worker, now, job_id, row[0]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row[0] if row else None
+
+
+def release_shard(conn, job_id, shard, worker):
+    """Hand an unfinished shard back (e.g. on Ctrl-C) so another worker can take it now."""
+    conn.execute("UPDATE shards SET state = 'pending', worker = NULL WHERE job_id = ? AND shard = ? AND worker = ?",
+                 (job_id, shard, worker))
+
+
+def checkpoint(conn, job_id, shard, worker, outcomes):
+    """Persist {symbol: (status, result row)} and refresh the shard's heartbeat in one transaction."""
+    now = _now()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "UPDATE symbols SET status = ?, result = ?, updated_at = ? WHERE job_id = ? AND symbol = ?",
+            [(status, json.dumps(row, default=str) if row else None, now, job_id, symbol)
+             for symbol, (status, row) in outcomes.items()],
+        )
+        conn.execute("UPDATE shards SET heartbeat = ? WHERE job_id = ? AND shard = ? AND worker = ?",
+                     (time.time(), job_id, shard, worker))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def finish_shard(conn, job_id, shard, worker):
+    conn.execute("UPDATE shards SET state = 'done', finished_at = ? WHERE job_id = ? AND shard = ? AND worker = ?",
+                 (_now(), job_id, shard, worker))
+
+
+def scan_shard(conn, job, shard, worker, batch_size=CHECKPOINT_BATCH):
+    """Scan a claimed shard's remaining symbols, checkpointing each one as it finishes."""
+    import golden_cross  # heavy; status/merge don't need it
+    import indicator_engine
+
+    options = job["options"]
+    pending = [row[0] for row in conn.execute(
+        "SELECT symbol FROM symbols WHERE job_id = ? AND shard = ? AND status = 'pending' ORDER BY symbol",
+        (job["job_id"], shard))]
+    def record(row):
+        checkpoint(conn, job["job_id"], shard, worker, {row["symbol"]: ("error" if row["error"] else "done", row)})
+
+    for i in range(0, len(pending), batch_size):
+        batch = pending[i:i + batch_size]
+        rows = golden_cross.check_stocks_for_crossovers(
+            batch, job["start_date"], job["end_date"], recent_only=job["recent_days"] is not None,
+            recent_days=job["recent_days"] or 30, use_panel=options.get("panel", False),
+            render_charts=options.get("charts", True), compact=options.get("compact", False), on_row=record,
+            save_indicators=False,
+        )
+        # Left out by check_stocks_for_crossovers' load_skipped_symbols check
+        skipped = set(batch) - {row["symbol"] for row in rows}
+        if skipped:
+            checkpoint(conn, job["job_id"], shard, worker, {symbol: ("skipped", None) for symbol in skipped})
+    indicator_engine.save_engine()
+    finish_shard(conn, job["job_id"], shard, worker)
+    return len(pending)
+
+
+def work(job_id, work_dir=WORK_DIR, worker=None, batch_size=CHECKPOINT_BATCH):
+    """Claim and scan shards until none are left. Returns the number of symbols scanned."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect(work_dir)
+    job = load_job(conn, job_id)
+    scanned = 0
+    while True:
+        shard = claim_shard(conn, job_id, worker)
+        if shard is None:
+            break
+        print(f"🧩 {worker} took shard {shard}/{job['shards']}")
+        try:
+            scanned += scan_shard(conn, job, shard, worker, batch_size)
+        except BaseException:
+            release_shard(conn, job_id, shard, worker)
+            raise
+    conn.close()
+    return scanned
+
+
+def reopen_errors(conn, job_id):
+    """Queue failed symbols again and reopen their shards. Returns how many."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        count = conn.execute("UPDATE symbols SET status = 'pending', result = NULL "
+                             "WHERE job_id = ? AND status = 'error'", (job_id,)).rowcount
+        conn.execute("UPDATE shards SET state = 'pending', worker = NULL, finished_at = NULL WHERE job_id = ? "
+                     "AND shard IN (SELECT DISTINCT shard FROM symbols WHERE job_id = ? AND status = 'pending')",
+                     (job_id, job_id))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return count
+
+
+def job_status(conn, job_id):
+    symbols = dict(conn.execute("SELECT status, COUNT(*) FROM symbols WHERE job_id = ? GROUP BY status", (job_id,)))
+    shards = dict(conn.execute("SELECT state, COUNT(*) FROM shards WHERE job_id = ? GROUP BY state", (job_id,)))
+    return {"symbols": symbols, "shards": shards}
+
+
+def merged_rows(conn, job_id):
+    """Result rows for every finished symbol, in symbol order."""
+    return [json.loads(result) for (result,) in conn.execute(
+        "SELECT result FROM symbols WHERE job_id = ? AND result IS NOT NULL ORDER BY symbol", (job_id,))]
+
+
+def merge(job_id, work_dir=WORK_DIR, output_dir=None, fmt="csv", signals_only=False):
+    """Write the job's results as one scan_cli-style results file; returns its path."""
+    import scan_cli
+
+    conn = connect(work_dir)
+    rows = merged_rows(conn, job_id)
+    status = job_status(conn, job_id)
+    conn.close()
+    if status["symbols"].get("pending"):
+        print(f"⚠️ {status['symbols']['pending']} symbols are still pending; merging what's finished.")
+    if signals_only:
+        rows = [row for row in rows if row.get("signal_date")]
+    return scan_cli.write_results(rows, output_dir or scan_cli.RESULTS_DIR, fmt, datetime.now())
+
+
+def _work_quietly(job_id, work_dir, batch_size, pool_size):
+    import scan_pipeline
+    import shared_panel
+    # The local workers split the CPUs between their compute pools; 1 means compute in-process
+    scan_pipeline.COMPUTE_WORKERS = pool_size if pool_size > 1 else 0
+    shared_panel.PARALLEL_WORKERS = pool_size
+    try:
+        work(job_id, work_dir, batch_size=batch_size)
+    except KeyboardInterrupt:
+        pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Sharded, resumable golden-cross scans.")
+    parser.add_argument("--work-dir", default=WORK_DIR, help="shared directory holding the queue DB")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="queue a new scan (re-running with the same inputs resumes it)")
+    init.add_argument("--symbols-file", required=True, help="one ticker per line, or an exchange listing file")
+    init.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    init.add_argument("--start", help="start date YYYY-MM-DD (default: --years before --end)")
+    init.add_argument("--end", help="end date YYYY-MM-DD, exclusive (default: the day after the last closed session)")
+    init.add_argument("--years", type=int, default=HISTORY_YEARS)
+    init.add_argument("--recent-days", type=int, help="only report golden crosses within this many days")
+    init.add_argument("--panel", action="store_true")
+    init.add_argument("--compact", action="store_true")
+    init.add_argument("--no-charts", action="store_true")
+    init.add_argument("--job", help="explicit job id")
+
+    for name, help_text in (("work", "claim and scan shards until none are left"),
+                            ("run", "scan with local worker processes, then merge")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--job", required=True)
+        command.add_argument("--batch-size", type=int, default=CHECKPOINT_BATCH)
+        if name == "run":
+            command.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+            command.add_argument("--format", choices=["csv", "json", "jsonl"], default="csv")
+            command.add_argument("--output-dir")
+
+    status = commands.add_parser("status", help="show progress")
+    status.add_argument("--job", required=True)
+
+    retry = commands.add_parser("retry", help="queue failed symbols again")
+    retry.add_argument("--job", required=True)
+
+    merge_cmd = commands.add_parser("merge", help="write all finished results to one file")
+    merge_cmd.add_argument("--job", required=True)
+    merge_cmd.add_argument("--format", choices=["csv", "json", "jsonl"], default="csv")
+    merge_cmd.add_argument("--output-dir")
+    merge_cmd.add_argument("--signals-only", action="store_true")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "init":
+        from update_stocks import load_symbol_file
+        symbols = load_symbol_file(args.symbols_file)
+        import scan_cli
+        end_date = args.end or scan_cli.default_end()
+        start_date = args.start or (datetime.strptime(end_date, "%Y-%m-%d")
+                                    - timedelta(days=365 * args.years)).strftime("%Y-%m-%d")
+        options = {"panel": args.panel, "compact": args.compact, "charts": not args.no_charts}
+        conn = connect(args.work_dir)
+        job_id = create_job(conn, symbols, start_date, end_date, args.shards, args.recent_days, options, args.job)
+        print(f"Job {job_id}: {len(symbols)} symbols in {args.shards} shards, {start_date} to {end_date}")
+        print(json.dumps(job_status(conn, job_id)))
+        return 0
+
+    if args.command == "work":
+        try:
+            scanned = work(args.job, args.work_dir, batch_size=args.batch_size)
+        except KeyboardInterrupt:
+            print("\nStopped; finished symbols are saved and the shard was released.")
+            return 130
+        print(f"✅ No shards left; scanned {scanned} symbols.")
+        return 0
+
+    if args.command == "run":
+        count = max(args.workers, 1)
+        pool_size = max((os.cpu_count() or 1) // count, 1)
+        workers = [Process(target=_work_quietly, args=(args.job, args.work_dir, args.batch_size, pool_size))
+                   for _ in range(count)]
+        for process in workers:
+            process.start()
+        try:
+            for process in workers:
+                process.join()
+        except KeyboardInterrupt:
+            for process in workers:
+                process.join()
+            print("\nStopped; run again to resume.")
+            return 130
+        path = merge(args.job, args.work_dir, args.output_dir, args.format)
+        print(f"✅ Results merged into {path}")
+        return 0
+
+    if args.command == "merge":
+        path = merge(args.job, args.work_dir, args.output_dir, args.format, args.signals_only)
+        print(f"✅ Results merged into {path}")
+        return 0
+
+    conn = connect(args.work_dir)
+    if args.command == "retry":
+        print(f"Re-queued {reopen_errors(conn, args.job)} failed symbols.")
+    else:
+        print(json.dumps(job_status(conn, args.job)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
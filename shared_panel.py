@@ -0,0 +1,211 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import panel
+import price_store
+
+# Parallel compact scans without pickling prices. A PriceStore's contiguous
+# arrays (day numbers, float32 closes) are copied once into one shared-memory
+# block -- or a memory-mapped file -- next to the per-symbol [start, stop)
+# bounds and empty float32 output columns. Worker processes attach to the
+# block by name, read the inputs through read-only views and write their
+# indicators straight into the outputs; a task is just (first, stop) symbol
+# positions, and what comes back is the cross positions. The per-symbol
+# kernels are panel's (the same maths as the in-process panel scan).
+
+PARALLEL_WORKERS = None        # None = one per CPU; 0 or 1 = scan in this process
+PARALLEL_MIN_SYMBOLS = 500     # smaller stores aren't worth starting a pool for
+WORKER_BLOCK = 250             # symbols per task (bounds each worker's float64 working set)
+OUTPUT_COLUMNS = ("50_MA", "200_MA", "RSI", "MACD", "Signal_Line", "Upper_Band", "Lower_Band")
+_ALIGN = 64
+
+
+class SharedPanel:
+    """
+    One buffer laid out as named arrays (see `layout`): "days", "bounds",
+    one per store column and one per output column. `spec` is all another
+    process needs to attach; it's a few hundred bytes whatever the size.
+    """
+
+    def __init__(self, buffer, spec, shm=None, owner=False):
+        self.spec = spec
+        self._shm = shm
+        self._owner = owner
+        self._buffer = buffer
+        self.arrays = {}
+        for name, dtype, offset, length in spec["layout"]:
+            array = np.ndarray((length,), dtype=dtype, buffer=buffer, offset=offset)
+            if name not in spec["outputs"] and not owner:
+                array.flags.writeable = False
+            self.arrays[name] = array
+        self.bounds = self.arrays["bounds"]
+
+    @classmethod
+    def create(cls, store, outputs=OUTPUT_COLUMNS, path=None):
+        """Copy `store` into a new shared-memory block (or a memmap file at `path`)."""
+        store._pack()
+        symbols = store.symbols
+        bounds = np.array([store._slices[symbol][0] for symbol in symbols] + [len(store._days)], dtype=np.int64)
+        arrays = {"days": store._days, "bounds": bounds}
+        arrays.update((column, store._data[column]) for column in store.columns)
+        n_bars = len(store._days)
+        layout, size = [], 0
+        for name, dtype, length in ([(name, array.dtype.str, len(array)) for name, array in arrays.items()] +
+                                    [(name, np.dtype(price_store.PRICE_DTYPE).str, n_bars) for name in outputs]):
+            layout.append((name, dtype, size, length))
+            size += -(-length * np.dtype(dtype).itemsize // _ALIGN) * _ALIGN
+        spec = {"layout": layout, "outputs": list(outputs), "columns": list(store.columns), "size": size}
+
+        if path is None:
+            shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            spec["name"], buffer = shm.name, shm.buf
+        else:
+            shm = None
+            spec["path"] = os.path.abspath(path)
+            buffer = np.memmap(path, dtype=np.uint8, mode="w+", shape=(max(size, 1),))
+        shared = cls(buffer, spec, shm, owner=True)
+        for name, array in arrays.items():
+            shared.arrays[name][:] = array
+        for name in outputs:
+            shared.arrays[name][:] = np.nan
+        shared.symbols = symbols
+        return shared
+
+    @classmethod
+    def attach(cls, spec):
+        """Map an existing panel from `spec` (inputs read-only, outputs writable)."""
+        if "path" in spec:
+            return cls(np.memmap(spec["path"], dtype=np.uint8, mode="r+", shape=(max(spec["size"], 1),)), spec)
+        shm = shared_memory.SharedMemory(name=spec["name"])
+        return cls(shm.buf, spec, shm)
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    @property
+    def nbytes(self):
+        return self.spec["size"]
+
+    def counts(self, first, stop):
+        return np.diff(self.bounds[first:stop + 1])
+
+    def matrix(self, first, stop, column="Close"):
+        """Symbols first..stop-1 as a compacted float64 (max bars x n) array and their counts."""
+        counts = self.counts(first, stop)
+        values = self.arrays[column]
+        out = np.full((int(counts.max()) if len(counts) else 0, len(counts)), np.nan)
+        for col, start in enumerate(self.bounds[first:stop]):
+            out[:counts[col], col] = values[start:start + counts[col]]
+        return out, counts
+
+    def compute_block(self, first, stop, short=50, long=200, with_events=False):
+        """
+        Indicators and crosses for symbols first..stop-1. Indicators are
+        written into the output columns; returns [(golden, death)] bar
+        positions within each symbol's own slice, with `with_events` as
+        [(golden, death, events, snapshot)] (see signal_index.block_events).
+        """
+        close, counts = self.matrix(first, stop)
+        results = panel.compute_compacted(close, counts, (short, long), ((short, long),))
+        golden, death = results[f"golden_{short}_{long}"], results[f"death_{short}_{long}"]
+        crosses = []
+        for col, start in enumerate(self.bounds[first:stop]):
+            n = counts[col]
+            for name in self.spec["outputs"]:
+                if name in results:
+                    self.arrays[name][start:start + n] = results[name][:n, col]
+            crosses.append((np.flatnonzero(golden[:n, col]), np.flatnonzero(death[:n, col])))
+        if with_events:
+            import signal_index
+            days = [self.arrays["days"][start:start + n].astype("datetime64[D]")
+                    for start, n in zip(self.bounds[first:stop], counts)]
+            indexed = signal_index.block_events(days, counts, close, results, golden, death)
+            crosses = [pair + found for pair, found in zip(crosses, indexed)]
+        return crosses
+
+    def frame(self, position, symbol_days):
+        """Stored and output columns of the symbol at `position` (copied out of the buffer)."""
+        start, stop = self.bounds[position], self.bounds[position + 1]
+        # Real copies: no view may outlive close()
+        data = {name: self.arrays[name][start:stop].copy() for name in self.spec["columns"] + self.spec["outputs"]}
+        return pd.DataFrame(data, index=pd.DatetimeIndex(symbol_days, name="Date"))
+
+    def close(self):
+        """Drop this process's mapping; the creator also frees the block."""
+        self.arrays = {}
+        self.bounds = None
+        if self._shm is not None:
+            self._buffer = None
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        elif self._owner and "path" in self.spec:
+            self._buffer = None
+            os.remove(self.spec["path"])
+
+
+_attached = None
+
+
+def _attach_worker(spec):
+    global _attached
+    _attached = SharedPanel.attach(spec)
+
+
+def _compute_block(first, stop, short, long, with_events):
+    return first, _attached.compute_block(first, stop, short, long, with_events)
+
+
+def scan_store(store, symbols=None, short=50, long=200, workers=PARALLEL_WORKERS, block=WORKER_BLOCK, path=None,
+               with_events=False):
+    """
+    panel.scan_store() spread over a process pool through a SharedPanel.
+    Each result's `data` also carries the MAs, RSI, MACD and Bollinger bands
+    (float32), so nothing downstream recomputes them; `with_events` has the
+    workers attach signal "events" and a "snapshot" too. Small stores, or
+    workers <= 1, use panel.scan_store() in this process instead.
+    """
+    symbols = store.symbols if symbols is None else list(symbols)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, -(-len(store) // block))
+    if workers <= 1 or len(store) < PARALLEL_MIN_SYMBOLS:
+        yield from panel.scan_store(store, symbols, short, long, with_events=with_events)
+        return
+
+    shared = SharedPanel.create(store, path=path)
+    try:
+        crosses = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                                 initargs=(shared.spec,)) as pool:
+            tasks = [pool.submit(_compute_block, first, min(first + block, len(shared)), short, long, with_events)
+                     for first in range(0, len(shared), block)]
+            for task in tasks:
+                first, block_crosses = task.result()
+                crosses.update(enumerate(block_crosses, first))
+
+        positions = {symbol: i for i, symbol in enumerate(shared.symbols)}
+        for symbol in symbols:
+            if symbol not in positions:
+                yield {"symbol": symbol, "data": None, "golden_crosses": [], "death_crosses": [],
+                       "error": "missing or invalid data"}
+                continue
+            position = positions[symbol]
+            days = store.days(symbol)
+            golden, death, *indexed = crosses[position]
+            result = {
+                "symbol": symbol,
+                "data": shared.frame(position, days),
+                "golden_crosses": list(pd.DatetimeIndex(days[golden])),
+                "death_crosses": list(pd.DatetimeIndex(days[death])),
+                "error": None,
+            }
+            if indexed:
+                result["events"], result["snapshot"] = indexed
+            yield result
+    finally:
+        shared.close()
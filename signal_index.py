@@ -0,0 +1,206 @@
+import argparse
+import bisect
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+
+import indicator_engine
+import state_store
+
+# Persisted signal index: every golden/death cross and RSI/MACD event from the
+# latest scan of each symbol (plus its latest indicator values), kept in the
+# state DB ordered per symbol and globally by (kind, date). "Which symbols
+# crossed in the last N days?" is an index range search over the whole
+# universe; no price data is loaded.
+# Scans rewrite only the symbols they processed.
+#
+#   python signal_index.py --days 30
+#   python signal_index.py --days 7 --kind golden_cross macd_bullish
+#   python signal_index.py --symbol AAPL
+
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+MACD_WARMUP = 26 + 9  # bars before MACD and its signal line mean anything
+CROSS_KINDS = ("golden_cross", "death_cross")
+INDICATOR_KINDS = ("rsi_oversold", "rsi_overbought", "macd_bullish", "macd_bearish")
+EVENT_KINDS = CROSS_KINDS + INDICATOR_KINDS
+SNAPSHOT_COLUMNS = ["Close", "50_MA", "200_MA", "RSI", "MACD", "Signal_Line", "Upper_Band", "Lower_Band"]
+
+
+def since(dates, cutoff):
+    """The tail of sorted `dates` on or after `cutoff`, found by binary search."""
+    return dates[bisect.bisect_left(dates, cutoff):]
+
+
+def _crossings(values, level):
+    """
+    Boolean (up, down) arrays, True where `values` moves from below `level`
+    to at/above it and the reverse. Works down axis 0, so a 2-D array is
+    one series per column.
+    """
+    import numpy as np
+    above = values >= level
+    valid = ~np.isnan(values)
+    both = valid[1:] & valid[:-1]
+    up = np.zeros(values.shape, dtype=bool)
+    down = np.zeros(values.shape, dtype=bool)
+    up[1:] = both & above[1:] & ~above[:-1]
+    down[1:] = both & ~above[1:] & above[:-1]
+    return up, down
+
+
+def _indicator_masks(rsi, macd_gap):
+    """(kind, mask, values) for the RSI/MACD events; `macd_gap` is modified (warm-up blanked)."""
+    import numpy as np
+    _, oversold = _crossings(rsi, RSI_OVERSOLD)
+    overbought, _ = _crossings(rsi, RSI_OVERBOUGHT)
+    macd_gap[:MACD_WARMUP] = np.nan
+    bullish, bearish = _crossings(macd_gap, 0.0)
+    return (("rsi_oversold", oversold, rsi), ("rsi_overbought", overbought, rsi),
+            ("macd_bullish", bullish, macd_gap), ("macd_bearish", bearish, macd_gap))
+
+
+def indicator_frame(df, symbol=None):
+    """
+    `df` with RSI/MACD/Bollinger and the 50/200-day MAs, taken from the
+    frame when the scan attached them, otherwise computed from Close
+    (compact frames carry only closes) -- through the shared indicator
+    engine when `symbol` is given. `df` itself isn't modified.
+    """
+    missing = [column for column in SNAPSHOT_COLUMNS[1:] if column not in df.columns]
+    if not missing:
+        return df
+    if symbol is None:
+        values = indicator_engine.batch_indicators(df["Close"])
+    else:
+        values = indicator_engine.get_engine().frame(symbol, df)
+    return df.assign(**{column: values[column].to_numpy() for column in missing})
+
+
+def snapshot(df):
+    """{"as_of": last bar date, name: latest value} for SNAPSHOT_COLUMNS (None where not defined yet)."""
+    last = df.iloc[-1]
+    values = {"as_of": df.index[-1].strftime("%Y-%m-%d")}
+    for column in SNAPSHOT_COLUMNS:
+        value = float(last[column]) if column in df.columns else math.nan
+        values[column] = None if math.isnan(value) else round(value, 4)
+    return values
+
+
+def symbol_events(df, golden_crosses=(), death_crosses=()):
+    """
+    [(date, kind, value), ...] for one scanned symbol: its crosses plus RSI
+    leaving the 30/70 bands and MACD crossing its signal line. RSI/MACD are
+    taken from `df` when the scan attached them, otherwise computed from Close.
+    """
+    import numpy as np
+    if not {"RSI", "MACD", "Signal_Line"} <= set(df.columns):
+        df = indicator_frame(df)
+    close = df["Close"].to_numpy(dtype="float64")
+
+    events = []
+    for kind, dates in (("golden_cross", golden_crosses), ("death_cross", death_crosses)):
+        for date in dates:
+            position = df.index.get_loc(date) if date in df.index else None
+            value = float(close[position]) if isinstance(position, (int, np.integer)) else None
+            events.append((date.strftime("%Y-%m-%d"), kind, value))
+
+    # Only the event bars' dates get formatted, not the whole index
+    index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    rsi = df["RSI"].to_numpy(dtype="float64")
+    macd_gap = df["MACD"].to_numpy(dtype="float64") - df["Signal_Line"].to_numpy(dtype="float64")
+    for kind, mask, values in _indicator_masks(rsi, macd_gap):
+        positions = np.flatnonzero(mask)
+        days = np.datetime_as_string(index.values[positions], unit="D").tolist()
+        events.extend(zip(days, [kind] * len(days), values[positions].tolist()))
+    events.sort()
+    return events
+
+
+def block_events(days, counts, close, values, golden, death):
+    """
+    symbol_events() and snapshot() for a block of symbols at once, straight
+    from arrays in panel.compact() layout (rows x symbols, each symbol's own
+    `counts` bars from row 0): `close`, `values` as panel.compute_compacted()
+    returns them, the golden/death flags, and `days`, each column's bar dates
+    as datetime64[D]. Returns [(events, snapshot)], one per column.
+    """
+    import numpy as np
+    own_bar = np.arange(close.shape[0])[:, None] < counts
+    rsi = np.where(own_bar, values["RSI"], np.nan)
+    macd_gap = np.where(own_bar, values["MACD"] - values["Signal_Line"], np.nan)
+    masks = [("golden_cross", golden & own_bar, close), ("death_cross", death & own_bar, close)]
+    masks += _indicator_masks(rsi, macd_gap)
+
+    found = [[] for _ in range(close.shape[1])]
+    for kind, mask, source in masks:
+        # Transposed so the hits come out grouped by column
+        cols, rows = np.nonzero(mask.T)
+        for col, row, value in zip(cols.tolist(), rows.tolist(), source[rows, cols].tolist()):
+            found[col].append((row, kind, value))
+
+    results = []
+    for col, hits in enumerate(found):
+        count = int(counts[col])
+        rows = np.array([row for row, _, _ in hits] + [count - 1], dtype=np.int64)
+        dates = np.datetime_as_string(days[col][rows], unit="D").tolist()
+        events = sorted((dates[i], kind, None if value != value else value)
+                        for i, (_, kind, value) in enumerate(hits))
+        snap = {"as_of": dates[-1]}
+        for column in SNAPSHOT_COLUMNS:
+            source = close if column == "Close" else values.get(column)
+            value = float(source[count - 1, col]) if source is not None else math.nan
+            snap[column] = None if math.isnan(value) else round(value, 4)
+        results.append((events, snap))
+    return results
+
+
+def update(events, snapshots=None, db_path=None):
+    """
+    Replace the indexed events of the symbols in {symbol: symbol_events(...)}
+    and, if given, their latest indicator values {symbol: snapshot(...)}.
+    """
+    if events:
+        state_store.replace_signals(events, db_path)
+    if snapshots:
+        state_store.save_snapshots(snapshots, db_path)
+
+
+def recent_signals(days=30, kinds=("golden_cross",), now=None, db_path=None):
+    """[{symbol, date, kind, value}] for events in the last `days` days, newest first."""
+    cutoff = ((now or datetime.now()) - timedelta(days=days)).strftime("%Y-%m-%d")
+    return [dict(zip(("symbol", "date", "kind", "value"), row))
+            for row in state_store.signals_between(kinds, cutoff, db_path=db_path)]
+
+
+def recent_symbols(days=30, kind="golden_cross", now=None, db_path=None):
+    """{symbol: latest event date} for symbols with a `kind` event in the last `days` days."""
+    latest = {}
+    for event in recent_signals(days, (kind,), now, db_path):
+        latest.setdefault(event["symbol"], event["date"])
+    return latest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the persisted signal index.")
+    parser.add_argument("--days", type=int, default=30, help="look back this many days")
+    parser.add_argument("--kind", nargs="+", choices=EVENT_KINDS, default=["golden_cross"])
+    parser.add_argument("--symbol", help="list every indexed event for one symbol instead")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.symbol:
+        rows = [(args.symbol.upper(), *row) for row in state_store.symbol_signals(args.symbol.upper())]
+    else:
+        rows = [tuple(event.values()) for event in recent_signals(args.days, args.kind)]
+    elapsed = time.perf_counter() - started
+
+    for symbol, date, kind, value in rows:
+        print(f"{date}  {symbol:<8} {kind:<15} {'' if value is None else f'{value:.2f}'}")
+    print(f"{len(rows)} event(s) in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
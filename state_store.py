@@ -0,0 +1,425 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Single SQLite file for everything the scanner remembers between runs:
+# cooldowns, skipped symbols, the trending list, scan history and each
+# symbol's latest crossover result (for change detection), indicator
+# snapshots and the signal index. WAL mode plus a busy timeout lets the CLI,
+# the Streamlit app and the results API use it at once.
+STATE_DB = "scanner_state.db"
+
+# Legacy JSON files imported once on first use
+LEGACY_COOLDOWN_FILE = "cooldown.json"
+LEGACY_SKIPPED_FILES = ["skipped_symbols.json", "skipped_stocks.json"]
+LEGACY_TRENDING_FILE = "trending_cache.json"
+LEGACY_COOLDOWN_HOURS = 24  # the old JSON stored sale times checked against 24h
+
+DATE_FMT = "%Y-%m-%d %H:%M:%S"
+SQL_CHUNK = 500  # keep IN (...) lists under SQLite's variable limit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cooldown (
+    symbol TEXT PRIMARY KEY,
+    until TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cooldown_until ON cooldown (until);
+
+CREATE TABLE IF NOT EXISTS skipped (
+    symbol TEXT PRIMARY KEY,
+    skipped_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS skipped_at ON skipped (skipped_at);
+
+CREATE TABLE IF NOT EXISTS trending (
+    position INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS scan_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    scanned_at TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    last_golden_cross TEXT,
+    last_death_cross TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS scan_history_symbol ON scan_history (symbol, scanned_at);
+
+CREATE TABLE IF NOT EXISTS symbol_results (
+    symbol TEXT PRIMARY KEY,
+    start_date TEXT NOT NULL,
+    last_bar TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    golden_crosses TEXT NOT NULL,
+    death_crosses TEXT NOT NULL,
+    chart TEXT,
+    processed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS indicator_snapshots (
+    symbol TEXT PRIMARY KEY,
+    as_of TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+-- Signal index: clustered per symbol by date, plus a global (kind, date) index
+CREATE TABLE IF NOT EXISTS signals (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (symbol, date, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signals_by_date ON signals (kind, date);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialised = set()
+
+
+def _fmt(when):
+    return when.strftime(DATE_FMT)
+
+
+def _parse(value):
+    for fmt in (DATE_FMT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def connect(db_path=None):
+    """Per-thread connection to the state DB, created (and migrated) on first use."""
+    db_path = os.path.abspath(db_path or STATE_DB)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conns[db_path] = conn
+        with _init_lock:
+            if db_path not in _initialised:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(SCHEMA)
+                migrate_json(conn)
+                _initialised.add(db_path)
+    return conn
+
+
+def _chunks(items):
+    items = list(items)
+    for i in range(0, len(items), SQL_CHUNK):
+        yield items[i:i + SQL_CHUNK]
+
+
+def _load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def migrate_json(conn):
+    """Import the old JSON state files once; they're left on disk untouched."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+        return
+
+    cooldown = _load_json(LEGACY_COOLDOWN_FILE)
+    rows = []
+    if isinstance(cooldown, dict):
+        for symbol, date_str in cooldown.items():
+            stamped = _parse(date_str)
+            if stamped:
+                rows.append((symbol, _fmt(stamped + timedelta(hours=LEGACY_COOLDOWN_HOURS))))
+
+    skipped = []
+    for path in LEGACY_SKIPPED_FILES:
+        data = _load_json(path)
+        if isinstance(data, dict):
+            skipped.extend((symbol, date_str) for symbol, date_str in data.items() if _parse(date_str))
+
+    trending = _load_json(LEGACY_TRENDING_FILE)
+
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO cooldown VALUES (?, ?)", rows)
+        conn.executemany("INSERT OR REPLACE INTO skipped VALUES (?, ?)",
+                         [(symbol, _fmt(_parse(date_str))) for symbol, date_str in skipped])
+        if isinstance(trending, dict) and trending.get("symbols"):
+            conn.executemany("INSERT OR REPLACE INTO trending VALUES (?, ?, ?)",
+                             [(i, symbol, trending.get("timestamp", 0)) for i, symbol in enumerate(trending["symbols"])])
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_json', ?)", (_fmt(datetime.now()),))
+
+    if rows or skipped or trending:
+        print(f"✅ Migrated JSON state into {STATE_DB}")
+
+
+# --- Cooldown ---
+
+def set_cooldown(symbols, until, db_path=None):
+    conn = connect(db_path)
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO cooldown VALUES (?, ?)",
+                         [(symbol, _fmt(until)) for symbol in symbols])
+
+
+def cooldown_until(symbol, db_path=None):
+    """When `symbol`'s cooldown ends (expired or not), or None if it has none."""
+    row = connect(db_path).execute("SELECT until FROM cooldown WHERE symbol = ?", (symbol,)).fetchone()
+    return _parse(row[0]) if row else None
+
+
+def active_cooldowns(now=None, db_path=None):
+    """{symbol: until} for every cooldown that hasn't expired (indexed range scan)."""
+    now = now or datetime.now()
+    rows = connect(db_path).execute("SELECT symbol, until FROM cooldown WHERE until > ?", (_fmt(now),))
+    return {symbol: _parse(until) for symbol, until in rows}
+
+
+# --- Skipped symbols ---
+
+def set_skipped(skipped, db_path=None):
+    """
+    Record {symbol: datetime or 'YYYY-MM-DD'} as skipped at that time.
+    Entries whose time can't be read are left out (with a warning) rather
+    than failing the rest.
+    """
+    rows = []
+    for symbol, when in skipped.items():
+        when = when if isinstance(when, datetime) else _parse(when)
+        if when is None:
+            print(f"⚠️ Not recording a skip for {symbol}: unreadable time")
+            continue
+        rows.append((symbol, _fmt(when)))
+    conn = connect(db_path)
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO skipped VALUES (?, ?)", rows)
+
+
+def recent_skips(days, now=None, db_path=None):
+    """{symbol: skipped_at} for skips newer than `days` days."""
+    cutoff = (now or datetime.now()) - timedelta(days=days)
+    rows = connect(db_path).execute("SELECT symbol, skipped_at FROM skipped WHERE skipped_at > ?", (_fmt(cutoff),))
+    return {symbol: _parse(skipped_at) for symbol, skipped_at in rows}
+
+
+def filter_symbols(symbols, skip_days, now=None, db_path=None):
+    """
+    Drop symbols that are in cooldown or were skipped within `skip_days`,
+    with one indexed query per SQL_CHUNK symbols. Order is preserved.
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=skip_days)
+    conn = connect(db_path)
+    blocked = set()
+    for chunk in _chunks(dict.fromkeys(symbols)):
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT symbol FROM cooldown WHERE symbol IN ({marks}) AND until > ? "
+            f"UNION SELECT symbol FROM skipped WHERE symbol IN ({marks}) AND skipped_at > ?",
+            (*chunk, _fmt(now), *chunk, _fmt(cutoff)),
+        )
+        blocked.update(symbol for (symbol,) in rows)
+    return [s for s in symbols if s not in blocked]
+
+
+# --- Trending cache ---
+
+def load_trending(max_age_days, db_path=None):
+    """
+    Cached trending symbols, or None if missing or older than `max_age_days`
+    (pass None to get them regardless of age).
+    """
+    rows = connect(db_path).execute("SELECT symbol, fetched_at FROM trending ORDER BY position").fetchall()
+    if not rows:
+        return None
+    age_days = (time.time() - rows[0][1]) / (60 * 60 * 24)
+    if max_age_days is not None and age_days > max_age_days:
+        return None
+    return [symbol for symbol, _ in rows]
+
+
+def trending_age(db_path=None):
+    """Seconds since the trending list was saved, or None if there isn't one."""
+    row = connect(db_path).execute("SELECT MIN(fetched_at) FROM trending").fetchone()
+    return time.time() - row[0] if row and row[0] is not None else None
+
+
+def save_trending(symbols, db_path=None):
+    conn = connect(db_path)
+    now = time.time()
+    with conn:
+        conn.execute("DELETE FROM trending")
+        conn.executemany("INSERT INTO trending VALUES (?, ?, ?)",
+                         [(i, symbol, now) for i, symbol in enumerate(symbols)])
+
+
+# --- Scan history ---
+
+def record_scans(entries, db_path=None):
+    """
+    Append scan outcomes. Each entry is a dict with 'symbol' and optionally
+    'start_date', 'end_date', 'last_golden_cross', 'last_death_cross', 'error'.
+    """
+    now = _fmt(datetime.now())
+    conn = connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO scan_history (symbol, scanned_at, start_date, end_date, "
+            "last_golden_cross, last_death_cross, error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(e["symbol"], now, e.get("start_date"), e.get("end_date"), e.get("last_golden_cross"),
+              e.get("last_death_cross"), e.get("error")) for e in entries],
+        )
+
+
+def scan_history(symbol=None, limit=100, db_path=None):
+    conn = connect(db_path)
+    query = "SELECT symbol, scanned_at, start_date, end_date, last_golden_cross, last_death_cross, error FROM scan_history"
+    params = ()
+    if symbol:
+        query += " WHERE symbol = ?"
+        params = (symbol,)
+    query += " ORDER BY scanned_at DESC, id DESC LIMIT ?"
+    columns = ["symbol", "scanned_at", "start_date", "end_date", "last_golden_cross", "last_death_cross", "error"]
+    return [dict(zip(columns, row)) for row in conn.execute(query, (*params, limit))]
+
+
+# --- Latest result per symbol ---
+
+RESULT_COLUMNS = ["symbol", "start_date", "last_bar", "fingerprint", "golden_crosses", "death_crosses", "chart",
+                  "processed_at"]
+
+
+def load_symbol_results(symbols=None, db_path=None):
+    """{symbol: stored result} with the cross lists decoded, for symbols that have one (None = all)."""
+    conn = connect(db_path)
+    query = f"SELECT {', '.join(RESULT_COLUMNS)} FROM symbol_results"
+    if symbols is None:
+        batches = [conn.execute(query + " ORDER BY symbol")]
+    else:
+        batches = (conn.execute(query + f" WHERE symbol IN ({','.join('?' * len(chunk))})", chunk)
+                   for chunk in _chunks(dict.fromkeys(symbols)))
+    results = {}
+    for rows in batches:
+        for row in rows:
+            entry = dict(zip(RESULT_COLUMNS, row))
+            entry["golden_crosses"] = json.loads(entry["golden_crosses"])
+            entry["death_crosses"] = json.loads(entry["death_crosses"])
+            results[entry["symbol"]] = entry
+    return results
+
+
+def save_symbol_results(entries, db_path=None):
+    """
+    Replace the stored result for each entry: a dict with 'symbol',
+    'start_date', 'last_bar', 'fingerprint', 'golden_crosses' and
+    'death_crosses' (lists of YYYY-MM-DD) and optionally 'chart'.
+    """
+    now = _fmt(datetime.now())
+    conn = connect(db_path)
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO symbol_results ({', '.join(RESULT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(e["symbol"], e["start_date"], e["last_bar"], e["fingerprint"], json.dumps(e["golden_crosses"]),
+              json.dumps(e["death_crosses"]), e.get("chart"), now) for e in entries],
+        )
+
+
+# --- Indicator snapshots ---
+
+def save_snapshots(snapshots, db_path=None):
+    """Replace each symbol's latest indicator values: {symbol: {"as_of": date, name: value, ...}}."""
+    now = _fmt(datetime.now())
+    conn = connect(db_path)
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO indicator_snapshots VALUES (?, ?, ?, ?)",
+                         [(symbol, snap["as_of"], json.dumps(snap), now) for symbol, snap in snapshots.items()])
+
+
+def load_snapshots(symbols=None, db_path=None):
+    """{symbol: snapshot} for `symbols` (None = all)."""
+    conn = connect(db_path)
+    if symbols is None:
+        rows = conn.execute("SELECT symbol, snapshot FROM indicator_snapshots ORDER BY symbol").fetchall()
+    else:
+        rows = []
+        for chunk in _chunks(dict.fromkeys(symbols)):
+            rows += conn.execute(f"SELECT symbol, snapshot FROM indicator_snapshots "
+                                 f"WHERE symbol IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+    return {symbol: json.loads(snapshot) for symbol, snapshot in rows}
+
+
+# --- Signal index ---
+
+def replace_signals(events, db_path=None):
+    """
+    Swap in each symbol's events, {symbol: [(date, kind, value), ...]} with
+    dates as YYYY-MM-DD; symbols not in `events` are left alone. Only rows
+    that differ from what's stored are written, so a rescan that adds a
+    bar or two touches a handful of rows, not the symbol's whole history.
+    """
+    conn = connect(db_path)
+    with conn:
+        for chunk in _chunks(sorted(events)):
+            stored = set(conn.execute(f"SELECT symbol, date, kind, value FROM signals "
+                                      f"WHERE symbol IN ({','.join('?' * len(chunk))})", chunk))
+            wanted = {(symbol, date, kind, value) for symbol in chunk for date, kind, value in events[symbol]}
+            conn.executemany("DELETE FROM signals WHERE symbol = ? AND date = ? AND kind = ?",
+                             [row[:3] for row in stored - wanted])
+            # In key order, so the clustered table is appended to rather than split
+            conn.executemany("INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?)", sorted(wanted - stored))
+
+
+def signals_between(kinds, since, until=None, db_path=None):
+    """
+    (symbol, date, kind, value) rows for `kinds` dated since <= date < until,
+    newest first: one index range search per kind, no full scan.
+    """
+    conn = connect(db_path)
+    query = "SELECT symbol, date, kind, value FROM signals WHERE kind = ? AND date >= ?"
+    rows = []
+    for kind in kinds:
+        if until is None:
+            rows += conn.execute(query, (kind, since)).fetchall()
+        else:
+            rows += conn.execute(query + " AND date < ?", (kind, since, until)).fetchall()
+    rows.sort(key=lambda row: (row[1], row[0]), reverse=True)
+    return rows
+
+
+def symbol_signals(symbol, db_path=None):
+    """(date, kind, value) rows for one symbol, oldest first."""
+    return connect(db_path).execute(
+        "SELECT date, kind, value FROM signals WHERE symbol = ? ORDER BY date", (symbol,)).fetchall()
+
+
+def reset(tables=("trending", "skipped"), db_path=None):
+    conn = connect(db_path)
+    with conn:
+        for table in tables:
+            conn.execute(f"DELETE FROM {table}")
+
+
+def close(db_path=None):
+    conns = getattr(_local, "conns", {})
+    conn = conns.pop(os.path.abspath(db_path or STATE_DB), None)
+    if conn is not None:
+        conn.close()
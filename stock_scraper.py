@@ -1,63 +1,281 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import os
+import sys
+import threading
+import time
 from datetime import datetime
+
 import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
+
+from update_stocks import HTML_PARSER, REQUEST_TIMEOUT, get_session
+
+# Live quotes in bulk. Yahoo's spark endpoint returns the latest price for a
+# batch of symbols as small JSON, over the same keep-alive session as the
+# listing fetches. Only symbols it leaves out fall back to the quote page,
+# parsed down to the price node alone. Quotes are appended to one columnar
+# file per session; --poll re-fetches and reports only prices that moved.
+#
+#   python stock_scraper.py AAPL MSFT NVDA
+#   python stock_scraper.py AAPL MSFT --poll 30 --min-change 0.05
+
+SPARK_URL = "https://query1.finance.yahoo.com/v7/finance/spark"
+QUOTE_PAGE_URL = "https://finance.yahoo.com/quote/{symbol}"
+QUOTE_BATCH_SIZE = 20          # symbols per spark request (Yahoo's limit)
+QUOTES_DIR = "quotes"
+POLL_INTERVAL = 30             # seconds between polls
+DEBUG_HTML = os.environ.get("SCRAPER_DEBUG_HTML") == "1"  # dump fallback pages to debug.html
+DEBUG_HTML_FILE = "debug.html"
+QUOTE_COLUMNS = ["Stock", "Price", "Previous Close", "Market Time", "Time Fetched"]
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+_debug_lock = threading.Lock()
+
+
+def _float(value):
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _spark_quote(symbol, entry):
+    """One quote row from a spark entry (either of the shapes Yahoo serves)."""
+    if "response" in entry:  # {"symbol", "response": [{"meta": {...}}]}
+        meta = (entry.get("response") or [{}])[0].get("meta", {})
+        price, previous, market_time = (meta.get("regularMarketPrice"), meta.get("chartPreviousClose"),
+                                        meta.get("regularMarketTime"))
+    else:                    # {"close": [...], "timestamp": [...], "chartPreviousClose": ...}
+        closes = [c for c in entry.get("close") or [] if c is not None]
+        stamps = entry.get("timestamp") or []
+        price, previous = (closes[-1] if closes else None), entry.get("chartPreviousClose")
+        market_time = stamps[-1] if stamps else None
+    if price is None:
+        return None
+    return {
+        "Stock": symbol,
+        "Price": float(price),
+        "Previous Close": _float(previous),
+        "Market Time": datetime.fromtimestamp(market_time).strftime("%Y-%m-%d %H:%M:%S") if market_time else None,
+    }
+
+
+def _fetch_spark(symbols, session):
+    response = session.get(SPARK_URL, params={"symbols": ",".join(symbols), "range": "1d", "interval": "1d"},
+                           timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    payload = response.json()
+    if "spark" in payload:
+        entries = {entry.get("symbol"): entry for entry in payload["spark"].get("result") or []}
+    else:
+        entries = payload
+    quotes = {}
+    for symbol in symbols:
+        entry = entries.get(symbol)
+        quote = _spark_quote(symbol, entry) if isinstance(entry, dict) else None
+        if quote:
+            quotes[symbol] = quote
+    return quotes
+
+
+def _dump_debug_html(html):
+    with _debug_lock:
+        with open(DEBUG_HTML_FILE, "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+def fetch_quote_page(symbol, session=None, debug_html=None):
+    """Fallback for one symbol: the quote page, parsed down to the price span only."""
+    session = session or get_session()
+    response = session.get(QUOTE_PAGE_URL.format(symbol=symbol), timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        print(f"Failed to fetch {symbol}. HTTP Status Code: {response.status_code}")
+        return None
+    if DEBUG_HTML if debug_html is None else debug_html:
+        _dump_debug_html(response.text)
+
+    price_only = SoupStrainer("span", attrs={"data-testid": "qsp-price"})
+    price_element = BeautifulSoup(response.text, HTML_PARSER, parse_only=price_only).find("span")
+    price = _float(price_element.text) if price_element else None
+    if price is None:
+        print(f"Error: price element not found for {symbol}.")
+        return None
+    return {"Stock": symbol, "Price": price, "Previous Close": None, "Market Time": None}
+
+
+def fetch_quotes(symbols, session=None, batch_size=QUOTE_BATCH_SIZE, fallback=True, debug_html=None):
+    """
+    Latest price for every symbol: one spark request per `batch_size`
+    symbols, then the quote page for any the bulk call missed.
+    Returns a DataFrame with QUOTE_COLUMNS (symbols with no price left out).
+    """
+    session = session or get_session()
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    quotes = {}
+    for i in range(0, len(symbols), batch_size):
+        batch = symbols[i:i + batch_size]
+        try:
+            quotes.update(_fetch_spark(batch, session))
+        except Exception as e:
+            print(f"⚠️ Bulk quote request failed for {batch}: {e}")
+
+    if fallback:
+        for symbol in symbols:
+            if symbol not in quotes:
+                try:
+                    quote = fetch_quote_page(symbol, session, debug_html)
+                except Exception as e:
+                    print(f"Error fetching {symbol}: {e}")
+                    quote = None
+                if quote:
+                    quotes[symbol] = quote
+
+    fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [{**quotes[symbol], "Time Fetched": fetched_at} for symbol in symbols if symbol in quotes]
+    return pd.DataFrame(rows, columns=QUOTE_COLUMNS)
+
+
+class QuoteWriter:
+    """
+    Appends quote batches to one Parquet file per session (one row group
+    per write), or to quotes.csv when pyarrow isn't installed. Read the lot
+    back with read_quotes().
+    """
+
+    def __init__(self, directory=QUOTES_DIR):
+        self.directory = directory
+        self.path = None
+        self._writer = None
+
+    def write(self, quotes):
+        if quotes.empty:
+            return self.path
+        os.makedirs(self.directory, exist_ok=True)
+        quotes = quotes.astype({"Price": "float64", "Previous Close": "float64"})
+        if pq is None:
+            self.path = os.path.join(self.directory, "quotes.csv")
+            quotes.to_csv(self.path, mode="a", header=not os.path.exists(self.path), index=False)
+            return self.path
+
+        import pyarrow as pa
+        # Fixed schema, so a batch where every Market Time is missing still fits
+        schema = pa.schema([("Stock", pa.string()), ("Price", pa.float64()), ("Previous Close", pa.float64()),
+                            ("Market Time", pa.string()), ("Time Fetched", pa.string())])
+        table = pa.Table.from_pandas(quotes[QUOTE_COLUMNS], schema=schema, preserve_index=False)
+        if self._writer is None:
+            self.path = os.path.join(self.directory, f"quotes_{datetime.now():%Y%m%d_%H%M%S_%f}.parquet")
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        return self.path
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def read_quotes(directory=QUOTES_DIR):
+    """Every quote written so far, oldest first."""
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=QUOTE_COLUMNS)
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(".parquet"):
+            frames.append(pd.read_parquet(path))
+        elif name.endswith(".csv"):
+            frames.append(pd.read_csv(path))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=QUOTE_COLUMNS)
+
+
+def changed_quotes(quotes, last_prices, min_change=0.0):
+    """Rows whose price moved more than `min_change` since `last_prices` (updated in place)."""
+    moved = []
+    for symbol, price in zip(quotes["Stock"], quotes["Price"]):
+        previous = last_prices.get(symbol)
+        if previous is None or abs(price - previous) > min_change:
+            moved.append(True)
+            last_prices[symbol] = price
+        else:
+            moved.append(False)
+    return quotes[moved]
+
+
+def poll_quotes(symbols, interval=POLL_INTERVAL, min_change=0.0, rounds=None, **fetch_kwargs):
+    """
+    Yield a DataFrame of quotes whose price moved since the last poll (the
+    first poll yields everything). Runs forever unless `rounds` is given.
+    """
+    last_prices = {}
+    done = 0
+    while rounds is None or done < rounds:
+        started = time.monotonic()
+        moved = changed_quotes(fetch_quotes(symbols, **fetch_kwargs), last_prices, min_change)
+        if not moved.empty:
+            yield moved
+        done += 1
+        if rounds is None or done < rounds:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
 
 
 def fetch_stock_data(stock_symbol):
     """
     Fetch basic stock data from Yahoo Finance for the given stock symbol.
     """
-    url = f"https://finance.yahoo.com/quote/{stock_symbol}"
-    response = requests.get(url)
-    
-    if response.status_code != 200:
-        print(f"Failed to fetch data. HTTP Status Code: {response.status_code}")
+    quotes = fetch_quotes([stock_symbol])
+    if quotes.empty:
         return None
+    row = quotes.iloc[0]
+    return {"Stock": row["Stock"], "Price": row["Price"], "Time Fetched": row["Time Fetched"]}
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Debug: Save raw HTML for inspection
-    with open("debug.html", "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
-    
-    # Extract key stock data
-    data = {}
-    try:
-        data['Stock'] = stock_symbol.upper()
-        # Use the data-testid attribute to find the price
-        price_element = soup.find('span', {'data-testid': 'qsp-price'})
-        if price_element:
-            data['Price'] = price_element.text
-        else:
-            raise ValueError("Price element not found.")
-        
-        data['Time Fetched'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
 
-    return data
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch live quotes for many symbols at once.")
+    parser.add_argument("symbols", nargs="*", help="tickers (prompted for if left out)")
+    parser.add_argument("--poll", type=float, metavar="SECONDS", help="keep polling; print only moved prices")
+    parser.add_argument("--min-change", type=float, default=0.0, help="ignore moves up to this size when polling")
+    parser.add_argument("--output-dir", default=QUOTES_DIR)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--debug-html", action="store_true", help=f"dump fallback quote pages to {DEBUG_HTML_FILE}")
+    args = parser.parse_args(argv)
 
-def main():
     print("Simple Stock Data Scraper\n")
-    
-    # Get user input
-    stock_symbol = input("Enter the stock symbol (e.g., AAPL for Apple): ").strip()
-    
-    # Fetch stock data
-    stock_data = fetch_stock_data(stock_symbol)
-    if stock_data:
-        # Display data in a table format
-        df = pd.DataFrame([stock_data])
-        print("\nStock Data:")
-        print(df)
-        
-        # Save data to a CSV file
-        df.to_csv(f'./{stock_symbol}_stock_data.csv', index=False)
-        print(f"\nStock data saved to {stock_symbol}_stock_data.csv")
-    else:
-        print("Failed to fetch stock data. Please try again.")
+    symbols = args.symbols
+    if not symbols:
+        symbols = input("Enter stock symbols (e.g., AAPL MSFT): ").replace(",", " ").split()
+    debug_html = args.debug_html or None
+
+    with QuoteWriter(args.output_dir) as writer:
+        if args.poll:
+            try:
+                for moved in poll_quotes(symbols, args.poll, args.min_change, debug_html=debug_html):
+                    print(moved.to_string(index=False, header=False))
+                    if not args.no_save:
+                        writer.write(moved)
+            except KeyboardInterrupt:
+                print("\nStopped polling.")
+        else:
+            quotes = fetch_quotes(symbols, debug_html=debug_html)
+            if quotes.empty:
+                print("Failed to fetch stock data. Please try again.")
+                return 1
+            print("\nStock Data:")
+            print(quotes.to_string(index=False))
+            if not args.no_save:
+                print(f"\nStock data appended to {writer.write(quotes)}")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import functools
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Deterministic fake market data so the scanner can be exercised and timed
+# without touching Yahoo. The same (seed, symbol) always gives the same bars.
+DEFAULT_SEED = 42
+HISTORY_END = "2025-01-01"
+
+
+def _rng(seed, symbol):
+    return np.random.default_rng([seed, zlib.crc32(symbol.encode())])
+
+
+@functools.lru_cache(maxsize=16)
+def _business_days(end, periods):
+    # Building the calendar dominates generation, and every symbol shares it
+    return pd.bdate_range(end=end, periods=periods)
+
+
+def generate_ohlcv(symbol, years=10, end=HISTORY_END, seed=DEFAULT_SEED):
+    """
+    Daily OHLCV for `symbol`: a random walk with regime changes (drift and
+    volatility switch every few months), occasional missing bars and price
+    gaps, and for roughly one symbol in five a short history (late listing).
+    """
+    rng = _rng(seed, symbol)
+    dates = _business_days(end, int(years * 252))
+
+    # Late listings: start somewhere in the back half of the window
+    if rng.random() < 0.2:
+        dates = dates[rng.integers(len(dates) // 2, len(dates)):]
+    n = len(dates)
+    if n == 0:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+    # Regimes: each lasts ~3-9 months with its own drift/volatility
+    regime_lengths = rng.integers(60, 190, size=n // 60 + 1)
+    drifts = rng.normal(0.0003, 0.001, size=len(regime_lengths))
+    vols = rng.uniform(0.008, 0.035, size=len(regime_lengths))
+    regime = np.repeat(np.arange(len(regime_lengths)), regime_lengths)[:n]
+    returns = rng.normal(drifts[regime], vols[regime])
+
+    # Overnight gaps
+    gap_days = rng.random(n) < 0.01
+    returns[gap_days] += rng.normal(0, 0.08, size=gap_days.sum())
+
+    close = rng.uniform(5, 500) * np.exp(np.cumsum(returns))
+    open_ = close * np.exp(rng.normal(0, 0.004, size=n))
+    spread = np.abs(rng.normal(0, 0.01, size=n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(13, 1, size=n).astype(np.int64)
+
+    df = pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+    # Missing bars (halts, data holes)
+    return df[rng.random(n) >= 0.003]
+
+
+class SyntheticProvider:
+    """
+    Drop-in replacement for golden_cross.yahoo_provider. Returns the same
+    {symbol: DataFrame} shape a provider may return, sliced to [start, end).
+    Symbols in `missing` return nothing, like delisted/unknown tickers.
+    """
+
+    def __init__(self, years=10, seed=DEFAULT_SEED, end=HISTORY_END, missing=()):
+        self.years = years
+        self.seed = seed
+        self.end = end
+        self.missing = set(missing)
+        self.calls = 0
+        self._history = {}
+
+    def history(self, symbol):
+        if symbol not in self._history:
+            self._history[symbol] = generate_ohlcv(symbol, self.years, self.end, self.seed)
+        return self._history[symbol]
+
+    def __call__(self, symbols, start, end):
+        self.calls += 1
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        frames = {}
+        for symbol in symbols:
+            if symbol in self.missing:
+                continue
+            df = self.history(symbol)
+            frames[symbol] = df[(df.index >= start) & (df.index < end)]
+        return frames
+
+
+def synthetic_universe(size):
+    """Stable ticker-like names: SYN0000, SYN0001, ..."""
+    return [f"SYN{i:04d}" for i in range(size)]
@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from panel import PricePanel
+
+
+def _panel(n_symbols=12, n_bars=600, seed=3):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2018-01-01", periods=n_bars)
+    frames = {}
+    for i in range(n_symbols):
+        # Different listing dates, so the compacted columns have different lengths
+        start = int(rng.integers(0, n_bars // 2))
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n_bars - start)))
+        frames[f"S{i:02d}"] = pd.DataFrame({"Close": close}, index=dates[start:])
+    return PricePanel.from_frames(frames)
+
+
+def _naive(close, short, long, fee, max_hold):
+    """One symbol, bar by bar: the same rules as backtest_pair, without any vectorising."""
+    close = pd.Series(close)
+    spread = (close.rolling(short).mean() - close.rolling(long).mean()).to_numpy()
+    equity, peak, max_drawdown = 1.0, 1.0, 0.0
+    long_since, holding = None, False
+    trades = []
+    for t in range(len(close)):
+        if t > 0 and spread[t - 1] < 0 <= spread[t]:
+            long_since = t
+        elif t > 0 and spread[t - 1] > 0 >= spread[t]:
+            long_since = None
+        wanted = long_since is not None and (max_hold is None or t - long_since < max_hold)
+        growth = close[t] / close[t - 1] if holding else 1.0
+        if wanted != holding:
+            growth *= 1 - fee
+            if wanted:
+                trades.append(1.0)
+        if (holding or wanted) and trades:
+            trades[-1] *= growth
+        equity *= growth
+        peak = max(peak, equity)
+        max_drawdown = max(max_drawdown, 1 - equity / peak)
+        holding = wanted
+    return equity - 1, max_drawdown, len(trades), sum(1 for trade in trades if trade > 1)
+
+
+@pytest.mark.parametrize("fee_bps, max_hold", [(0, None), (5, None), (25, 30), (5, 1)])
+def test_grid_matches_a_per_bar_loop(fee_bps, max_hold):
+    panel = _panel()
+    pairs = backtest.parameter_grid([5, 20], [30, 60])
+    _, per_symbol = backtest.run_backtest(panel, pairs, fee_bps=fee_bps, max_hold=max_hold, workers=0)
+    assert len(per_symbol) == len(pairs) * len(panel.symbols)
+    assert per_symbol["trades"].sum() > 0
+
+    for row in per_symbol.itertuples():
+        close = panel.close[:, panel.column(row.symbol)]
+        close = close[~np.isnan(close)]
+        total, drawdown, trades, wins = _naive(close, row.short, row.long, fee_bps / 10_000, max_hold)
+        assert math.isclose(row.total_return, total, rel_tol=1e-9, abs_tol=1e-12), row
+        assert math.isclose(row.max_drawdown, drawdown, rel_tol=1e-9, abs_tol=1e-12), row
+        assert (row.trades, row.wins) == (trades, wins), row
+
+
+def test_summary_aggregates_per_symbol_rows():
+    panel = _panel()
+    summary, per_symbol = backtest.run_backtest(panel, [(5, 30)], fee_bps=5, workers=0)
+    row = summary.loc[(5, 30)]
+    assert row["trades"] == per_symbol["trades"].sum()
+    assert row["hit_rate"] == pytest.approx(per_symbol["wins"].sum() / per_symbol["trades"].sum())
+    assert row["mean_return"] == pytest.approx(per_symbol["total_return"].mean())
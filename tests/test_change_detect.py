@@ -0,0 +1,125 @@
+import contextlib
+import io
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import change_detect
+import golden_cross
+import scan_pipeline
+import state_store
+from synthetic_data import HISTORY_END, SyntheticProvider, synthetic_universe
+
+NY = ZoneInfo(change_detect.MARKET_TZ)
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2024, 10, 18, 15, 59, tzinfo=NY), date(2024, 10, 17)),  # Friday before the close
+    (datetime(2024, 10, 18, 16, 0, tzinfo=NY), date(2024, 10, 18)),   # Friday after it
+    (datetime(2024, 10, 19, 12, 0, tzinfo=NY), date(2024, 10, 18)),   # Saturday
+    (datetime(2024, 10, 21, 9, 30, tzinfo=NY), date(2024, 10, 18)),   # Monday morning
+])
+def test_expected_last_bar_skips_weekends_and_open_sessions(now, expected):
+    assert change_detect.expected_last_bar("2030-01-01", now) == expected
+
+
+def test_expected_last_bar_respects_the_exclusive_end():
+    now = datetime(2024, 10, 23, 18, 0, tzinfo=NY)
+    assert change_detect.expected_last_bar("2024-10-21", now) == date(2024, 10, 18)  # end is a Monday
+
+
+def _frame(closes, end="2024-10-18"):
+    return pd.DataFrame({"Close": closes}, index=pd.bdate_range(end=end, periods=len(closes)))
+
+
+def test_fingerprint_sees_a_revised_last_bar_but_not_the_dtype():
+    df = _frame(np.linspace(10, 20, 30))
+    revised = df.copy()
+    revised.iloc[-1, 0] += 0.25
+    assert change_detect.fingerprint(df) != change_detect.fingerprint(revised)
+    assert change_detect.fingerprint(df) == change_detect.fingerprint(df.astype("float32"))
+
+
+def _stored(last_bar, start="2023-01-02", golden=(), death=()):
+    return {"start_date": start, "last_bar": last_bar, "fingerprint": "x",
+            "golden_crosses": list(golden), "death_crosses": list(death)}
+
+
+def test_split_unchanged_over_a_weekend_and_a_holiday():
+    saturday = datetime(2024, 10, 19, 12, 0, tzinfo=NY)
+    stored = {
+        "CURRENT": _stored("2024-10-18"),
+        "BEHIND": _stored("2024-10-17"),
+        "OTHER_START": _stored("2024-10-18", start="2022-01-03"),
+    }
+    unchanged, to_scan = change_detect.split_unchanged(
+        ["CURRENT", "BEHIND", "OTHER_START", "NEW"], stored, "2023-01-02", "2024-10-21", saturday)
+    assert list(unchanged) == ["CURRENT"]
+    assert to_scan == ["BEHIND", "OTHER_START", "NEW"]
+
+    # Thanksgiving: the calendar expects a Thursday bar that never comes, so the
+    # symbol is fetched, and the fingerprint is what says nothing changed
+    friday = datetime(2024, 11, 29, 18, 0, tzinfo=NY)
+    _, to_scan = change_detect.split_unchanged(["CURRENT"], {"CURRENT": _stored("2024-11-27")}, "2023-01-02",
+                                               "2024-12-02", friday)
+    assert to_scan == ["CURRENT"]
+
+
+def test_new_crosses_against_the_stored_entry():
+    previous = _stored("2024-10-11", golden=["2024-03-01"], death=["2024-06-03"])
+    dates = ["2024-03-01", "2024-05-02", "2024-10-15"]
+    # Same window: a revised history's new cross counts too
+    assert change_detect.new_crosses(dates, previous, "golden_crosses", "2023-01-02") == ["2024-05-02", "2024-10-15"]
+    # Wider window: only crosses on bars the last run didn't have
+    assert change_detect.new_crosses(dates, previous, "golden_crosses", "2022-01-03") == ["2024-10-15"]
+    assert change_detect.new_crosses(dates, None, "golden_crosses", "2023-01-02") == []
+
+
+@pytest.fixture
+def scan_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(golden_cross, "USE_PRICE_CACHE", False)
+    monkeypatch.setattr(scan_pipeline, "COMPUTE_WORKERS", 0)
+    previous = golden_cross.get_data_provider()
+    provider = SyntheticProvider(years=3)
+    golden_cross.set_data_provider(provider)
+    yield provider
+    golden_cross.set_data_provider(previous)
+    state_store.close()
+
+
+def _scan(symbols, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {row["symbol"]: row for row in golden_cross.check_stocks_for_crossovers(
+            symbols, "2023-01-02", HISTORY_END, render_charts=False, **kwargs)}
+
+
+def test_rescan_without_a_new_bar_reuses_stored_results(scan_dir):
+    symbols = synthetic_universe(6)
+    first = _scan(symbols)
+    calls = scan_dir.calls
+    second = _scan(symbols)
+    assert scan_dir.calls == calls  # nothing fetched
+    assert all(row["unchanged"] for row in second.values())
+    assert ({s: r["last_golden_cross"] for s, r in second.items()} ==
+            {s: r["last_golden_cross"] for s, r in first.items()})
+
+    # Forced rescan over identical bars: fetched, but the fingerprint says unchanged and nothing is new
+    state_store.connect().execute("UPDATE symbol_results SET last_bar = '2024-12-30'")
+    third = _scan(symbols)
+    assert scan_dir.calls > calls
+    assert all(row["unchanged"] and row["new_golden_cross"] is None for row in third.values())
+
+
+def test_revised_last_bar_is_not_unchanged(scan_dir):
+    symbol = synthetic_universe(1)[0]
+    _scan([symbol])
+    history = scan_dir.history(symbol)
+    last_scanned = history.index[history.index < HISTORY_END][-1]  # end is exclusive
+    history.loc[last_scanned, "Close"] *= 1.01
+    state_store.connect().execute("UPDATE symbol_results SET last_bar = '2024-12-30'")
+    row = _scan([symbol])[symbol]
+    assert row["unchanged"] is False
@@ -0,0 +1,39 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import chart_renderer
+
+
+def _frame():
+    index = pd.bdate_range("2024-01-01", periods=300)
+    return pd.DataFrame({"Close": np.linspace(100, 130, len(index))}, index=index)
+
+
+def test_key_changes_when_the_last_close_is_revised():
+    df = _frame()
+    revised = df.copy()
+    revised.iloc[-1, 0] += 1.5
+    assert chart_renderer.chart_key(df, "AAA") != chart_renderer.chart_key(revised, "AAA")
+    assert chart_renderer.chart_key(df, "AAA") == chart_renderer.chart_key(df.copy(), "AAA")
+
+
+def test_key_includes_max_points():
+    df = _frame()
+    assert chart_renderer.chart_key(df, "AAA", max_points=300) != chart_renderer.chart_key(df, "AAA", max_points=1500)
+
+
+def test_prune_drops_stale_and_least_recently_used(tmp_path):
+    now = time.time()
+    for i in range(5):
+        path = tmp_path / f"chart{i}.png"
+        path.write_bytes(b"x")
+        os.utime(path, (now - i * 3600, now - i * 3600))
+    old = tmp_path / "old.png"
+    old.write_bytes(b"x")
+    os.utime(old, (now - 40 * 86400, now - 40 * 86400))
+
+    assert chart_renderer.prune_chart_cache(str(tmp_path), max_files=3, max_days=30) == 3
+    assert sorted(os.listdir(tmp_path)) == ["chart0.png", "chart1.png", "chart2.png"]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+import indicator_engine
+
+
+def _closes(n=900):
+    index = pd.bdate_range("2015-01-01", periods=n)
+    return pd.Series(100 + np.cumsum(np.random.default_rng(1).normal(0.05, 1, n)), index=index)
+
+
+def test_update_with_only_the_new_bar_appends():
+    close = _closes()
+    engine = indicator_engine.IndicatorEngine(state_file=None)
+    engine.update("A", close.iloc[:800].to_frame("Close"))
+    row = engine.update("A", close.iloc[800:801].to_frame("Close")).iloc[-1]
+    expected = indicator_engine.batch_indicators(close.iloc[:801]).iloc[-1]
+    np.testing.assert_allclose(row.to_numpy(), expected.to_numpy(), rtol=1e-9)
+
+
+def test_frame_extends_incrementally_and_matches_batch():
+    close = _closes()
+    engine = indicator_engine.IndicatorEngine(state_file=None)
+    engine.frame("A", close.iloc[:700].to_frame("Close"))
+    values = engine.frame("A", close.to_frame("Close"))
+    np.testing.assert_allclose(values.to_numpy(), indicator_engine.batch_indicators(close).to_numpy(), rtol=1e-9)
+
+
+def test_update_with_missing_bars_starts_over():
+    close = _closes()
+    engine = indicator_engine.IndicatorEngine(state_file=None)
+    engine.update("A", close.iloc[:800].to_frame("Close"))
+    # Bars 800-809 never reach the engine; appending after the gap would corrupt the windows
+    gapped = close.iloc[810:].to_frame("Close")
+    values = engine.update("A", gapped)
+    np.testing.assert_allclose(values.to_numpy(), indicator_engine.batch_indicators(gapped["Close"]).to_numpy(),
+                               rtol=1e-9)
+
+
+def test_saved_state_survives_a_restart(tmp_path):
+    close = _closes()
+    path = str(tmp_path / "state.json")
+    engine = indicator_engine.IndicatorEngine(path)
+    engine.update("A", close.iloc[:800].to_frame("Close"))
+    engine.save()
+    restarted = indicator_engine.IndicatorEngine(path)
+    row = restarted.update("A", close.iloc[800:801].to_frame("Close")).iloc[-1]
+    expected = indicator_engine.batch_indicators(close.iloc[:801]).iloc[-1]
+    np.testing.assert_allclose(row.to_numpy(), expected.to_numpy(), rtol=1e-9)
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import price_cache
+from synthetic_data import SyntheticProvider
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_cache, "PRICE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(price_cache, "COVERAGE_FILE", str(tmp_path / "coverage.json"))
+    return tmp_path
+
+
+def test_missing_ranges_disjoint_requests_reach_the_covered_range():
+    covered = (pd.Timestamp("2023-01-01"), pd.Timestamp("2024-01-01"))
+    assert price_cache.missing_ranges(covered, pd.Timestamp("2020-01-01"), pd.Timestamp("2021-01-01")) == [
+        (pd.Timestamp("2020-01-01"), pd.Timestamp("2023-01-01"))]
+    assert price_cache.missing_ranges(covered, pd.Timestamp("2024-06-01"), pd.Timestamp("2025-01-01")) == [
+        (pd.Timestamp("2024-01-01"), pd.Timestamp("2025-01-01"))]
+
+
+def test_disjoint_fetch_leaves_no_uncached_hole(cache_dir):
+    provider = SyntheticProvider(years=6, missing=())
+    symbol = "HOLE"
+    while len(provider.history(symbol)) < 6 * 250:  # avoid a late-listed symbol
+        symbol += "X"
+
+    price_cache.load_prices([symbol], "2023-01-01", "2024-01-01", provider)
+    price_cache.load_prices([symbol], "2020-01-01", "2021-01-01", provider)
+    calls = provider.calls
+    window = price_cache.load_prices([symbol], "2021-06-01", "2022-06-01", provider)[symbol]
+
+    expected = provider([symbol], "2021-06-01", "2022-06-01")[symbol]
+    assert provider.calls == calls + 1  # served from the cache, not refetched
+    assert window is not None
+    assert len(window) == len(expected)
+    coverage = price_cache.load_coverage()[symbol]
+    assert coverage == (pd.Timestamp("2020-01-01"), pd.Timestamp("2024-01-01"))
+
+
+def _load_in_process(cache_dir, symbols):
+    price_cache.PRICE_CACHE_DIR = str(cache_dir)
+    price_cache.COVERAGE_FILE = str(cache_dir / "coverage.json")
+    for symbol in symbols:
+        price_cache.load_prices([symbol], "2023-01-01", "2024-01-01", SyntheticProvider(years=3))
+
+
+def test_worker_processes_keep_each_others_coverage(cache_dir):
+    import multiprocessing
+
+    symbols = [f"P{i:02d}" for i in range(24)]
+    workers = [multiprocessing.Process(target=_load_in_process, args=(cache_dir, symbols[i::4])) for i in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert all(process.exitcode == 0 for process in workers)
+    assert sorted(price_cache.load_coverage()) == symbols
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+import golden_cross
+import rate_limiter
+
+DELISTED = "$ZZZQ: possibly delisted; no price data found  (1d 1735002000 -> 1735606800)"
+
+
+@pytest.mark.parametrize("message, kind", [
+    (DELISTED, "permanent"),
+    ("No data found for this date range, symbol may be delisted (period=1735429000)", "permanent"),
+    ("HTTP Error 503: Service Unavailable", "transient"),
+    ("502 Server Error: Bad Gateway", "transient"),
+    ("Read timed out.", "transient"),
+    ("429 Client Error: Too Many Requests", "throttle"),
+    ("YFRateLimitError('Rate limited. Try after a while.')", "throttle"),
+])
+def test_classify_message(message, kind):
+    assert rate_limiter.classify_message(message) == kind
+
+
+def test_delisted_symbol_is_not_retried(monkeypatch):
+    yf = pytest.importorskip("yfinance")
+    calls = []
+
+    def download(symbols, **kwargs):
+        calls.append(symbols)
+        yf.shared._ERRORS = {"ZZZQ": DELISTED}
+        return pd.DataFrame()
+
+    monkeypatch.setattr(yf, "download", download)
+    limiter = rate_limiter.AdaptiveRateLimiter("test", rate=1000, burst=10)
+    result = limiter.call(golden_cross.yahoo_provider, ["ZZZQ"], "2024-12-24", "2025-01-01")
+    assert result.empty
+    assert len(calls) == 1
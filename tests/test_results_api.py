@@ -0,0 +1,83 @@
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+import results_api
+import state_store
+
+
+def _entry(symbol, golden=("2024-03-01",)):
+    return {"symbol": symbol, "start_date": "2023-01-01", "last_bar": "2024-06-28", "fingerprint": symbol.lower(),
+            "golden_crosses": list(golden), "death_crosses": [], "chart": None}
+
+
+@pytest.fixture
+def api(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    # Enough symbols that /results is worth gzipping
+    state_store.save_symbol_results([_entry(f"SYM{i:03d}") for i in range(40)], db_path)
+    server = results_api.make_server(port=0, db_path=db_path, chart_dir=str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def get(path, **headers):
+        conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        return response, body
+
+    yield get, db_path, server.cache
+    server.shutdown()
+    server.server_close()
+    state_store.close(db_path)
+
+
+def test_etag_revalidates_to_304(api):
+    get, _, _ = api
+    response, body = get("/results")
+    etag = response.getheader("ETag")
+    assert response.status == 200 and etag
+    assert json.loads(body)["count"] == 40
+
+    response, body = get("/results", **{"If-None-Match": etag})
+    assert response.status == 304 and body == b""
+
+
+def test_gzip_only_when_accepted(api):
+    get, _, _ = api
+    plain, plain_body = get("/results")
+    zipped, zipped_body = get("/results", **{"Accept-Encoding": "gzip"})
+    assert plain.getheader("Content-Encoding") is None
+    assert zipped.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(zipped_body) == plain_body
+    assert zipped.getheader("ETag") == plain.getheader("ETag")
+
+
+def test_db_write_invalidates_cached_bodies(api):
+    get, db_path, cache = api
+    first, _ = get("/results/SYM001")
+    again, _ = get("/results/SYM001")
+    assert cache.hits == 1 and again.getheader("ETag") == first.getheader("ETag")
+    state_store.save_symbol_results([_entry("SYM001", golden=("2024-03-01", "2024-06-03"))], db_path)
+    second, body = get("/results/SYM001")
+    assert second.getheader("ETag") != first.getheader("ETag")
+    assert json.loads(body)["last_golden_cross"] == "2024-06-03"
+
+
+@pytest.mark.parametrize("query", ["/signals?days=99999999", "/results?days=-1", "/signals?days=abc"])
+def test_bad_days_is_a_400(api, query):
+    get, _, _ = api
+    response, body = get(query)
+    assert response.status == 400
+    assert "error" in json.loads(body)
+
+
+def test_unknown_symbol_is_a_404(api):
+    get, _, _ = api
+    response, _ = get("/results/NOPE")
+    assert response.status == 404
@@ -0,0 +1,42 @@
+import pytest
+
+import golden_cross
+import scan_cache
+import signal_index
+import state_store
+from synthetic_data import HISTORY_END, SyntheticProvider
+
+
+@pytest.fixture
+def app_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(golden_cross, "USE_PRICE_CACHE", False)
+    previous = golden_cross.get_data_provider()
+    golden_cross.set_data_provider(SyntheticProvider(years=3, missing=("GONE",)))
+    scan_cache.clear_scan_cache()
+    yield
+    scan_cache.clear_scan_cache()
+    golden_cross.set_data_provider(previous)
+    state_store.close()
+
+
+def test_app_scans_are_recorded_like_cli_scans(app_state):
+    start = "2023-01-01"
+    results = {r["symbol"]: r for r in scan_cache.scan_cached(["SYN0001", "GONE"], start, HISTORY_END, workers=0)}
+    assert results["SYN0001"]["error"] is None
+
+    stored = state_store.load_symbol_results()
+    assert list(stored) == ["SYN0001"]
+    assert stored["SYN0001"]["golden_crosses"] == [d.strftime("%Y-%m-%d") for d in results["SYN0001"]["golden_crosses"]]
+    assert "GONE" in golden_cross.load_skipped_symbols()
+    assert state_store.load_snapshots(["SYN0001"])
+    if results["SYN0001"]["golden_crosses"]:
+        assert signal_index.recent_signals(10_000)
+
+
+def test_prefetch_membership_check_is_not_a_miss(app_state):
+    start = "2023-01-01"
+    list(scan_cache.scan_cached(["SYN0002"], start, HISTORY_END, workers=0))
+    hits, misses = scan_cache._scan_cache.hits, scan_cache._scan_cache.misses
+    assert scan_cache.prefetch(["SYN0002"], start, HISTORY_END, workers=0) is None
+    assert (scan_cache._scan_cache.hits, scan_cache._scan_cache.misses) == (hits, misses)
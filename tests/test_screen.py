@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import screen
+from screen import ScreenError
+
+
+@pytest.mark.parametrize("text, message", [
+    ("close", "must be a condition"),
+    ("rsi(14) < 30 and close", "needs"),
+    ("rsi(14) < 30 and", "end of expression"),
+    ("rsi(14 < 30", "expected"),
+    ("foo > 3", "unknown term"),
+    ("sma(0) > close", "positive"),
+    ("sma(1, 2, 3) > close", "at most"),
+    ("crosses_above(close) ", "two values"),
+    ("close > 3 $", "unexpected character"),
+])
+def test_parser_errors(text, message):
+    with pytest.raises(ScreenError, match=message):
+        screen.compile_screen(text)
+
+
+def test_shared_sub_expressions_are_one_step():
+    compiled = screen.compile_screen("close > sma(50) and sma(50) > sma(200)")
+    assert sum(1 for step in compiled.steps if step[0] == "sma" and step[2] == 50) == 1
+
+
+def _frames(n_symbols=30, n_bars=320, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=n_bars)
+    frames = {}
+    for i in range(n_symbols):
+        # Some symbols are too young for sma(200), a few for rsi(14)
+        bars = int(rng.choice([5, 12, 150, n_bars]))
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        frames[f"S{i:02d}"] = pd.DataFrame({"Close": close}, index=dates[-bars:])
+    return frames
+
+
+def _rsi(close, window=14):
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+def _reference(df):
+    """The same screens per symbol in pandas; None where an input is NaN."""
+    close = df["Close"]
+    sma50, sma200, rsi = close.rolling(50).mean(), close.rolling(200).mean(), _rsi(close)
+
+    def known(*series):
+        return all(not np.isnan(s.iloc[-1]) for s in series)
+
+    spread = sma50 - sma200
+    crossed = ((spread.shift() < 0) & (spread >= 0))[df.index >= df.index[-1] - pd.Timedelta(days=60)]
+    return {
+        "rsi(14) < 50 and close > sma(50)":
+            bool(rsi.iloc[-1] < 50 and close.iloc[-1] > sma50.iloc[-1]),
+        "not rsi(14) < 50": known(rsi) and not rsi.iloc[-1] < 50,
+        "not (close > sma(50) or rsi(14) > 60)":
+            known(sma50, rsi) and not (close.iloc[-1] > sma50.iloc[-1] or rsi.iloc[-1] > 60),
+        "golden_cross(50,200) within 60d": bool(crossed.any()),
+        "not golden_cross(50,200) within 60d": known(sma200) and not crossed.any(),
+    }
+
+
+def test_matches_agree_with_pandas():
+    frames = _frames()
+    context = screen.Context.from_frames(frames)
+    expected = {symbol: _reference(df) for symbol, df in frames.items()}
+    for text in next(iter(expected.values())):
+        matched = {row["symbol"]: row["match"] for row in screen.run_screen(text, context=context)}
+        assert matched == {symbol: ref[text] for symbol, ref in expected.items()}, text
+
+
+def test_not_of_an_undefined_indicator_does_not_match():
+    df = pd.DataFrame({"Close": [10.0, 11.0, 10.5, 10.8, 11.2]}, index=pd.bdate_range("2024-06-03", periods=5))
+    (row,) = screen.run_screen("not rsi(14) < 30", frames={"NEW": df})
+    assert row["rsi(14)"] is None
+    assert row["match"] is False
+    (row,) = screen.run_screen("not close < 5", frames={"NEW": df})
+    assert row["match"] is True
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+import golden_cross
+import indicator_engine
+import scan_pipeline
+import shard_scan
+import state_store
+from synthetic_data import HISTORY_END, SyntheticProvider, synthetic_universe
+
+START = "2023-01-01"
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(golden_cross, "USE_PRICE_CACHE", False)
+    monkeypatch.setattr(scan_pipeline, "COMPUTE_WORKERS", 0)
+    monkeypatch.setattr(indicator_engine, "_engine", None)
+    previous = golden_cross.get_data_provider()
+    golden_cross.set_data_provider(SyntheticProvider(years=2))
+    yield str(tmp_path / "work")
+    golden_cross.set_data_provider(previous)
+    state_store.close()
+
+
+def _job(work_dir, symbols, shards=2):
+    conn = shard_scan.connect(work_dir)
+    options = {"panel": False, "compact": True, "charts": False}
+    job_id = shard_scan.create_job(conn, symbols, START, HISTORY_END, shards, None, options, "job")
+    return conn, shard_scan.load_job(conn, job_id)
+
+
+def _symbols_in_every_shard(n, shards=2):
+    symbols = synthetic_universe(n)
+    assert {shard_scan.shard_of(symbol, shards) for symbol in symbols} == set(range(shards))
+    return symbols
+
+
+def test_claim_heartbeat_and_release(work_dir):
+    conn, job = _job(work_dir, _symbols_in_every_shard(8))
+    first = shard_scan.claim_shard(conn, "job", "w1")
+    second = shard_scan.claim_shard(conn, "job", "w2")
+    assert {first, second} == {0, 1}
+    assert shard_scan.claim_shard(conn, "job", "w3") is None
+    # A worker restarting under the same name gets its own shard back
+    assert shard_scan.claim_shard(conn, "job", "w1") == first
+
+    conn.execute("UPDATE shards SET heartbeat = 0 WHERE shard = ?", (second,))
+    shard_scan.checkpoint(conn, "job", second, "w2", {})
+    assert shard_scan.claim_shard(conn, "job", "w3") is None  # heartbeat refreshed, so not stale
+
+    conn.execute("UPDATE shards SET heartbeat = 0 WHERE shard = ?", (second,))
+    assert shard_scan.claim_shard(conn, "job", "w3") == second  # stale: taken over
+
+    shard_scan.release_shard(conn, "job", first, "w1")
+    assert shard_scan.claim_shard(conn, "job", "w4") == first
+
+
+def test_killed_worker_resumes_from_its_last_checkpoint(work_dir, monkeypatch):
+    symbols = synthetic_universe(12)
+    conn, job = _job(work_dir, symbols, shards=1)
+    shard = shard_scan.claim_shard(conn, "job", "w1")
+
+    saved = shard_scan.checkpoint
+    finished = []
+
+    def dies_after_three(conn, job_id, shard, worker, outcomes):
+        if len(finished) == 3:
+            raise SystemExit("killed")
+        finished.extend(outcomes)
+        saved(conn, job_id, shard, worker, outcomes)
+
+    monkeypatch.setattr(shard_scan, "checkpoint", dies_after_three)
+    with pytest.raises(SystemExit):
+        shard_scan.scan_shard(conn, job, shard, "w1", batch_size=5)
+    monkeypatch.setattr(shard_scan, "checkpoint", saved)
+    assert shard_scan.job_status(conn, "job")["symbols"] == {"done": 3, "pending": 9}
+
+    # Killed, so the shard was never released: it's taken over once its heartbeat is stale
+    conn.execute("UPDATE shards SET heartbeat = 0")
+    scanned = []
+    scan = golden_cross.check_stocks_for_crossovers
+    monkeypatch.setattr(golden_cross, "check_stocks_for_crossovers",
+                        lambda batch, *a, **k: scanned.extend(batch) or scan(batch, *a, **k))
+    assert shard_scan.work("job", work_dir, worker="w2", batch_size=5) == 9
+    assert sorted(scanned + finished) == sorted(symbols)
+    assert shard_scan.job_status(conn, "job") == {"symbols": {"done": 12}, "shards": {"done": 1}}
+
+
+def test_merge_writes_every_finished_symbol(work_dir, tmp_path):
+    symbols = _symbols_in_every_shard(8)
+    conn, _ = _job(work_dir, symbols)
+    assert shard_scan.work("job", work_dir, worker="w1") == len(symbols)
+
+    path = shard_scan.merge("job", work_dir, str(tmp_path / "out"), "json")
+    with open(path) as f:
+        rows = json.load(f)["results"]
+    assert sorted(row["symbol"] for row in rows) == sorted(symbols)
+    assert all(row["error"] is None for row in rows)
@@ -0,0 +1,66 @@
+import pytest
+
+import golden_cross
+import indicator_engine
+import panel
+import signal_index
+import state_store
+from synthetic_data import HISTORY_END, SyntheticProvider, synthetic_universe
+
+
+def _frames(n=24):
+    provider = SyntheticProvider(years=3)
+    frames = {}
+    for i, symbol in enumerate(synthetic_universe(n)):
+        history = provider.history(symbol)[["Close"]]
+        # Different listing dates: some never reach 200 bars, a few not even the MACD warm-up
+        frames[symbol] = history[history.index < HISTORY_END].iloc[-[760, 400, 150, 30][i % 4]:]
+    return frames
+
+
+def _approx(events):
+    return [(date, kind, pytest.approx(value, rel=1e-6, abs=1e-6)) for date, kind, value in events]
+
+
+@pytest.mark.parametrize("engine", [False, True])
+def test_panel_events_match_per_symbol_events(monkeypatch, engine):
+    monkeypatch.setattr(indicator_engine, "_engine", indicator_engine.IndicatorEngine(state_file=None))
+    frames = _frames()
+    panel_results = {result["symbol"]: result for result in panel.scan_panel(frames, with_events=True)}
+
+    for symbol, df in frames.items():
+        golden, death = golden_cross.detect_crossovers(df)
+        # As a scan does it: through the indicator engine, or straight from Close
+        indicators = signal_index.indicator_frame(df, symbol if engine else None)
+        events = signal_index.symbol_events(indicators, golden, death)
+        result = panel_results[symbol]
+        assert [event[:2] for event in result["events"]] == [event[:2] for event in events], symbol
+        assert result["events"] == _approx(events), symbol
+        expected = signal_index.snapshot(indicators)
+        assert result["snapshot"] == {name: value if value is None or name == "as_of" else pytest.approx(value, abs=2e-4)
+                                      for name, value in expected.items()}, symbol
+    assert any(kind == "golden_cross" for result in panel_results.values() for _, kind, _ in result["events"])
+
+
+def test_replace_signals_rewrites_only_what_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # no JSON state to migrate
+    db_path = str(tmp_path / "state.db")
+    events = {result["symbol"]: result["events"] for result in panel.scan_panel(_frames(8), with_events=True)}
+    signal_index.update(events, db_path=db_path)
+    conn = state_store.connect(db_path)
+    try:
+        before = conn.total_changes
+        signal_index.update(events, db_path=db_path)
+        assert conn.total_changes == before  # identical rescan: nothing written
+
+        symbol, other = sorted(events)[:2]
+        date, kind, value = events[symbol][-1]
+        changed = {symbol: events[symbol][1:-1] + [(date, kind, value + 1), ("2024-12-31", "rsi_oversold", 29.5)]}
+        before = conn.total_changes
+        signal_index.update(changed, db_path=db_path)
+        # The dropped row and the old value deleted; the new value and the new event inserted
+        assert conn.total_changes - before == 4
+        assert sorted(state_store.symbol_signals(symbol, db_path)) == sorted(changed[symbol])
+        assert sorted(state_store.symbol_signals(other, db_path)) == sorted(events[other])
+    finally:
+        state_store.close(db_path)
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+import state_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    state_store.close()
+
+
+def _write(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def test_set_skipped_leaves_out_unreadable_times(state_dir):
+    state_store.set_skipped({"GOOD": "2024-05-01", "BAD": "not a date", "NOW": datetime(2024, 5, 2, 9, 30)})
+    rows = dict(state_store.connect().execute("SELECT symbol, skipped_at FROM skipped"))
+    assert rows == {"GOOD": "2024-05-01 00:00:00", "NOW": "2024-05-02 09:30:00"}
+
+
+def test_json_state_is_migrated_once(state_dir):
+    # Old cooldowns were sale times checked against 24 hours; they become end times
+    _write(state_store.LEGACY_COOLDOWN_FILE, {"AAA": "2024-05-01 10:00:00", "BBB": "2024-05-03", "BAD": "soon"})
+    _write(state_store.LEGACY_SKIPPED_FILES[0], {"CCC": "2024-05-01", "DDD": "?"})
+    _write(state_store.LEGACY_SKIPPED_FILES[1], {"EEE": "2024-05-02 08:00:00"})
+    _write(state_store.LEGACY_TRENDING_FILE, {"timestamp": 1714557600, "symbols": ["TSLA", "NVDA"]})
+
+    conn = state_store.connect()
+    assert dict(conn.execute("SELECT symbol, until FROM cooldown")) == {
+        "AAA": "2024-05-02 10:00:00", "BBB": "2024-05-04 00:00:00"}
+    assert dict(conn.execute("SELECT symbol, skipped_at FROM skipped")) == {
+        "CCC": "2024-05-01 00:00:00", "EEE": "2024-05-02 08:00:00"}
+    assert state_store.load_trending(None) == ["TSLA", "NVDA"]
+
+    # Later connections (even after the DB was emptied) don't import the files again
+    state_store.reset(("trending", "skipped", "cooldown"))
+    state_store.close()
+    state_store._initialised.clear()
+    conn = state_store.connect()
+    assert conn.execute("SELECT COUNT(*) FROM cooldown").fetchone()[0] == 0
+    assert state_store.load_trending(None) is None
+
+
+def test_menu_state_options_do_not_import_pandas(state_dir):
+    # golden_cross's cooldown/reset options only need the state helpers
+    code = ("import sys, golden_cross; golden_cross.add_to_cooldown(['AAPL'], 2); golden_cross.reset_cached_data(); "
+            "print(sorted(m for m in ('numpy', 'pandas', 'scan_pipeline') if m in sys.modules))")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")])}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env).stdout
+    assert out.splitlines()[-1] == "[]"
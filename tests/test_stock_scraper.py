@@ -0,0 +1,92 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import stock_scraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "spark")
+MARKET_TIME = datetime.fromtimestamp(1729195200).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class FakeSession:
+    """Answers every request with one fixture payload; records the params."""
+
+    def __init__(self, name):
+        with open(os.path.join(FIXTURES, name)) as f:
+            self.payload = json.load(f)
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(params)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.mark.parametrize("fixture", ["result_list.json", "by_symbol.json"])
+def test_spark_payload_shapes(fixture):
+    session = FakeSession(fixture)
+    quotes = stock_scraper._fetch_spark(["AAPL", "MSFT", "HALTED", "NOPE"], session)
+    assert session.requests[0]["symbols"] == "AAPL,MSFT,HALTED,NOPE"
+    # No price (halted) or not in the payload at all: left for the quote-page fallback
+    assert quotes == {
+        "AAPL": {"Stock": "AAPL", "Price": 227.52, "Previous Close": 225.0, "Market Time": MARKET_TIME},
+        "MSFT": {"Stock": "MSFT", "Price": 416.72, "Previous Close": 412.1, "Market Time": MARKET_TIME},
+    }
+
+
+def test_spark_quote_without_a_market_time():
+    quote = stock_scraper._spark_quote("X", {"response": [{"meta": {"regularMarketPrice": 10}}]})
+    assert quote == {"Stock": "X", "Price": 10.0, "Previous Close": None, "Market Time": None}
+    assert stock_scraper._spark_quote("X", {"response": []}) is None
+
+
+def _quotes(prices, fetched="2024-10-17 16:00:00"):
+    return pd.DataFrame([{"Stock": symbol, "Price": price, "Previous Close": None, "Market Time": None,
+                          "Time Fetched": fetched} for symbol, price in prices.items()],
+                        columns=stock_scraper.QUOTE_COLUMNS)
+
+
+def test_changed_quotes_reports_only_moves_past_the_threshold():
+    last_prices = {}
+    first = stock_scraper.changed_quotes(_quotes({"AAPL": 100.0, "MSFT": 400.0}), last_prices, 0.05)
+    assert list(first["Stock"]) == ["AAPL", "MSFT"]
+
+    moved = stock_scraper.changed_quotes(_quotes({"AAPL": 100.04, "MSFT": 400.5, "NVDA": 130.0}), last_prices, 0.05)
+    assert list(moved["Stock"]) == ["MSFT", "NVDA"]
+    # A move too small to report doesn't reset the baseline, so small moves still add up
+    assert last_prices == {"AAPL": 100.0, "MSFT": 400.5, "NVDA": 130.0}
+    assert list(stock_scraper.changed_quotes(_quotes({"AAPL": 100.08}), last_prices, 0.05)["Stock"]) == ["AAPL"]
+
+
+def _write_two_batches(directory):
+    with stock_scraper.QuoteWriter(directory) as writer:
+        first = writer.write(_quotes({"AAPL": 100.0, "MSFT": 400.0}))
+        assert writer.write(_quotes({}, fetched="x")) == first  # nothing to write
+        second = writer.write(_quotes({"AAPL": 101.0}, fetched="2024-10-17 16:00:30"))
+    assert first == second
+    return stock_scraper.read_quotes(directory)
+
+
+def test_quote_writer_csv_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_scraper, "pq", None)
+    quotes = _write_two_batches(str(tmp_path))
+    assert os.listdir(tmp_path) == ["quotes.csv"]
+    assert list(quotes["Stock"]) == ["AAPL", "MSFT", "AAPL"]
+    assert list(quotes["Price"]) == [100.0, 400.0, 101.0]
+
+
+def test_quote_writer_parquet_session_file(tmp_path):
+    pytest.importorskip("pyarrow")
+    quotes = _write_two_batches(str(tmp_path))
+    (name,) = os.listdir(tmp_path)
+    assert name.startswith("quotes_") and name.endswith(".parquet")
+    assert list(quotes["Stock"]) == ["AAPL", "MSFT", "AAPL"]
+    assert quotes["Market Time"].isna().all()
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import rate_limiter
+import update_stocks
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "listings")
+PAGES = ["most_active", "trending", "gainers", "losers"]
+PAGE_DELAY = 0.4  # seconds each page takes to serve
+
+
+@pytest.fixture
+def listing_server():
+    """Serves the fixture pages with ETags; records (path, status) per request."""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = os.path.join(FIXTURES, self.path.strip("/") + ".html")
+            if not os.path.exists(path):
+                self.send_error(404)
+                return
+            with open(path, "rb") as f:
+                body = f.read()
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            time.sleep(PAGE_DELAY)
+            if self.headers.get("If-None-Match") == etag:
+                requests_seen.append((self.path, 304))
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            requests_seen.append((self.path, 200))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield {page: f"{base}/{page}" for page in PAGES}, requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(update_stocks, "LISTING_CACHE_FILE", str(tmp_path / "listing_cache.json"))
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+
+
+def test_parse_symbols_reads_first_cell_of_each_row():
+    with open(os.path.join(FIXTURES, "losers.html")) as f:
+        assert update_stocks.parse_symbols(f.read()) == ["INTC", "^GSPC"]
+
+
+def test_pages_are_fetched_concurrently_and_merged(listing_server):
+    urls, seen = listing_server
+    started = time.perf_counter()
+    symbols = update_stocks.load_stock_symbols(urls)
+    elapsed = time.perf_counter() - started
+
+    assert symbols == ["AAPL", "NVDA", "TSLA", "PLTR", "BRK-B", "SMCI", "INTC", "^GSPC"]
+    assert sorted(status for _, status in seen) == [200] * len(PAGES)
+    # One after another would take len(PAGES) * PAGE_DELAY
+    assert elapsed < 2 * PAGE_DELAY
+
+
+def test_unchanged_pages_come_back_304_from_cache(listing_server):
+    urls, seen = listing_server
+    rate_limiter.get_limiter("listings", rate=100, burst=len(PAGES))  # no pacing between the two rounds
+    first = update_stocks.load_stock_symbols(urls)
+    seen.clear()
+    second = update_stocks.load_stock_symbols(urls)
+
+    assert second == first
+    assert [status for _, status in seen] == [304] * len(PAGES)
@@ -1,48 +1,173 @@
 import requests
-from bs4 import BeautifulSoup
-import time
-import random
-
-def load_stock_symbols():
-    urls = {
-        "Most Active": "https://finance.yahoo.com/most-active",
-        "Trending": "https://finance.yahoo.com/trending-tickers",
-        "Gainers": "https://finance.yahoo.com/gainers",
-        "Losers": "https://finance.yahoo.com/losers",
-    }
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import threading
 
-    stock_symbols = set()
+from rate_limiter import get_limiter
 
-    for category, url in urls.items():
-        try:
-            print(f"\nFetching stock symbols for: {category} ({url})...")
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raise error for HTTP issues
+try:
+    import lxml  # noqa: F401  (much faster BeautifulSoup backend)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+LISTING_URLS = {
+    "Most Active": "https://finance.yahoo.com/most-active",
+    "Trending": "https://finance.yahoo.com/trending-tickers",
+    "Gainers": "https://finance.yahoo.com/gainers",
+    "Losers": "https://finance.yahoo.com/losers",
+}
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+}
+
+# ETag / Last-Modified and the symbols parsed from each page, so an
+# unchanged page costs a 304 and no parsing.
+LISTING_CACHE_FILE = "listing_cache.json"
+REQUEST_TIMEOUT = 15
+
+_session = None
+_session_lock = threading.Lock()
+_cache_lock = threading.Lock()
+
+
+def get_session():
+    """One keep-alive session (pooled connections) shared by every listing fetch."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=len(LISTING_URLS), pool_maxsize=len(LISTING_URLS))
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def load_listing_cache():
+    try:
+        with open(LISTING_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_listing_cache(cache):
+    with _cache_lock:
+        tmp = LISTING_CACHE_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, LISTING_CACHE_FILE)
 
-            soup = BeautifulSoup(response.text, "html.parser")
-            table_rows = soup.select("table tbody tr")
 
-            symbols = []
-            for row in table_rows:
-                columns = row.find_all("td")
-                if columns:
-                    symbol = columns[0].text.strip()
-                    stock_symbols.add(symbol)
-                    symbols.append(symbol)
+def parse_symbols(html):
+    """First cell of every table body row; only <table> markup is parsed."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer("table"))
+    symbols = []
+    for row in soup.select("tbody tr"):
+        columns = row.find_all("td")
+        if columns:
+            symbols.append(columns[0].text.strip())
+    return symbols
 
-            print(f"Fetched {len(symbols)} symbols: {symbols}")
 
-            # Delay between requests to prevent getting blocked
-            # time.sleep(random.uniform(3, 6))
+def fetch_listing(category, url, cached=None):
+    """
+    Fetch one listing page, sending the validators from `cached` so an
+    unchanged page comes back as 304. Returns (symbols, cache_entry).
+    """
+    print(f"\nFetching stock symbols for: {category} ({url})...")
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
 
+    response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304 and cached:
+        print(f"{category}: not modified, reusing {len(cached['symbols'])} symbols")
+        return cached["symbols"], cached
+    response.raise_for_status()  # Raise error for HTTP issues
+
+    symbols = parse_symbols(response.text)
+    print(f"Fetched {len(symbols)} symbols: {symbols}")
+    entry = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "symbols": symbols,
+    }
+    return symbols, entry
+
+
+def load_stock_symbols(urls=None):
+    urls = urls or LISTING_URLS
+    cache = load_listing_cache()
+
+    # Burst covers every page, so they really go out together
+    limiter = get_limiter("listings", burst=len(LISTING_URLS))
+
+    def fetch(item):
+        category, url = item
+        try:
+            # Paced, and retried with backoff on 429s / timeouts
+            return url, limiter.call(fetch_listing, category, url, cache.get(url))
         except Exception as e:
             print(f"Error fetching data from {url}: {e}")
+            return url, None
+
+    # All pages at once over the shared session
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        fetched = list(pool.map(fetch, urls.items()))
 
-    
+    stock_symbols = []
+    for url, outcome in fetched:
+        if outcome is None:
+            continue
+        symbols, entry = outcome
+        cache[url] = entry
+        stock_symbols.extend(symbols)
+    save_listing_cache(cache)
 
-    final_symbols = list(stock_symbols)
+    final_symbols = list(dict.fromkeys(stock_symbols))
     print(f"\nTotal unique stock symbols collected: {len(final_symbols)}\n{final_symbols}")  # Final summary
     return final_symbols
+
+
+def load_symbol_file(path):
+    """
+    Tickers from a local exchange list. Accepts one symbol per line (# starts
+    a comment), or a delimited file (',', '|' or tab) with a 'Symbol' /
+    'ACT Symbol' / 'Ticker' header, e.g. NASDAQ's nasdaqlisted.txt and
+    otherlisted.txt. Test issues and trailer lines are left out.
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        lines = [line.split("#")[0].strip() for line in f]
+    lines = [line for line in lines if line]
+    if not lines:
+        return []
+
+    delimiter = next((d for d in ("|", "\t", ",") if d in lines[0]), None)
+    symbols = []
+    if delimiter is None:
+        symbols = [line.split()[0] for line in lines]
+        if symbols[0].lower() in ("symbol", "ticker"):
+            symbols = symbols[1:]
+    else:
+        header = [name.strip().lower() for name in lines[0].split(delimiter)]
+        column = next((header.index(name) for name in ("symbol", "act symbol", "ticker") if name in header), None)
+        test_column = header.index("test issue") if "test issue" in header else None
+        rows = [line.split(delimiter) for line in (lines[1:] if column is not None else lines)]
+        for row in rows:
+            # nasdaqlisted.txt ends with "File Creation Time: ..."
+            if row[0].startswith("File Creation Time"):
+                continue
+            if test_column is not None and len(row) > test_column and row[test_column].strip() == "Y":
+                continue
+            symbols.append(row[column or 0].strip())
+
+    return list(dict.fromkeys(symbol.upper() for symbol in symbols if symbol))